@@ -4,15 +4,32 @@
 Инициализирует приложение, регистрирует расширения и маршруты.
 """
 
+import time
+
+# Начало импорта модулей приложения (для отчета о времени запуска)
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import logging
+import multiprocessing
 from logging.handlers import RotatingFileHandler
 from flask import Flask, render_template, redirect, url_for, send_from_directory
 from flask_login import current_user
 
 from config import get_config
 from models import db, login_manager
+from models.engine import configure_engine, engine_options
+from models.schema import upgrade_schema
 from routes import register_blueprints
+from commands import register_commands
+from services.ocr_queue import start_background_worker
+from services.search_service import SearchIndex
+from services.counter_service import CounterService
+from services.stats_service import StatsService
+from services.upload_ingest import IngestRequest
+from services.upload_sessions import UploadSessionService
+from services.capture_sessions import CaptureSessionService
+from services.warmup import record_startup, start_warmup
 
 
 def create_app(config_name="default"):
@@ -26,9 +43,16 @@ def create_app(config_name="default"):
     Returns:
         Сконфигурированное Flask приложение
     """
+    # Длительность этапов запуска (для отчета)
+    phases = {"imports": time.perf_counter() - _IMPORT_STARTED}
+    phase_started = time.perf_counter()
+
     # Создаем экземпляр Flask
     app = Flask(__name__)
 
+    # Файлы из запросов пишутся сразу в хранилище (хэш и размер - при записи)
+    app.request_class = IngestRequest
+
     # Загружаем конфигурацию
     config_class = get_config(config_name)
     app.config.from_object(config_class)
@@ -39,14 +63,41 @@ def create_app(config_name="default"):
     # Настраиваем логирование
     setup_logging(app)
 
+    # Параметры подключения к базе данных (если не заданы в конфигурации)
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+
     # Инициализируем расширения
     db.init_app(app)
     login_manager.init_app(app)
 
+    phases["config"] = time.perf_counter() - phase_started
+    phase_started = time.perf_counter()
+
     # Создаем таблицы базы данных
     with app.app_context():
+        # PRAGMA SQLite (WAL и др.) для каждого соединения
+        configure_engine(app, db.engine)
+
         db.create_all()
 
+        # Добавляем новые колонки и индексы в существующую базу данных
+        schema_changes = upgrade_schema()
+
+        # Новые колонки счетчиков документов заполняются по таблице документов
+        if CounterService.needs_repair(schema_changes):
+            CounterService.repair()
+
+        # Дневная статистика для базы, созданной до ее появления
+        if StatsService.daily_stats_missing():
+            StatsService.rebuild_daily()
+
+        # Брошенные загрузки по частям и съемки
+        UploadSessionService.expire()
+        CaptureSessionService.expire()
+
+        # Полнотекстовый индекс документов (создается и заполняется один раз)
+        SearchIndex.create_index()
+
         # Создаем администратора по умолчанию, если его нет
         from models.user import User
 
@@ -59,6 +110,9 @@ def create_app(config_name="default"):
             )
             app.logger.info("Создан администратор по умолчанию")
 
+    phases["database"] = time.perf_counter() - phase_started
+    phase_started = time.perf_counter()
+
     # Регистрируем blueprints (маршруты)
     register_blueprints(app)
 
@@ -71,6 +125,12 @@ def create_app(config_name="default"):
     # Регистрируем контекстные процессоры для шаблонов
     register_template_context(app)
 
+    # Регистрируем команды командной строки (flask ...)
+    register_commands(app)
+
+    # Запускаем фоновый обработчик очереди OCR
+    start_background_worker(app)
+
     # Главная страница
     @app.route("/")
     def index():
@@ -81,6 +141,11 @@ def create_app(config_name="default"):
 
     app.logger.info(f"Приложение запущено в режиме: {config_name}")
 
+    # Отчет о времени запуска и фоновый прогрев OCR
+    phases["routes"] = time.perf_counter() - phase_started
+    record_startup(app, phases)
+    start_warmup(app)
+
     return app
 
 
@@ -209,8 +274,19 @@ def load_user(user_id):
 
 # Создаем экземпляр приложения
 # Режим берется из переменной окружения FLASK_ENV или используется 'development'
+# В собранном приложении (PyInstaller) дочерний процесс пула OCR
+# запускается через этот же файл: freeze_support() выполняет его задачу
+# и завершает процесс до создания приложения
+multiprocessing.freeze_support()
+
+# При запуске через "python app.py" дочерние процессы пула OCR (spawn)
+# повторно выполняют этот файл под именем __mp_main__ - parent_process()
+# в этот момент еще не установлен, поэтому проверяем имя модуля.
+# Приложение там не нужно: иначе каждый процесс пула запустил бы свой
+# обработчик очереди, прогрев и собственный пул OCR
 config_name = os.environ.get("FLASK_ENV", "development")
-app = create_app(config_name)
+if __name__ != "__mp_main__":
+    app = create_app(config_name)
 
 
 if __name__ == "__main__":
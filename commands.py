@@ -0,0 +1,206 @@
+# commands.py
+"""
+Команды командной строки приложения (flask <команда>).
+Служебные операции, которые не нужны в веб-интерфейсе.
+"""
+
+from datetime import datetime
+
+import click
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+
+from models import db
+from models.document import Document, FILE_SIZE_SORT
+from services.search_service import SearchIndex
+from services.counter_service import CounterService
+from services.stats_service import StatsService
+from services.blob_store import BlobStore
+from services.upload_sessions import UploadSessionService
+from services.capture_sessions import CaptureSessionService
+from utils.pagination import keyset_query
+
+
+def _hot_document_queries() -> list:
+    """
+    Частые запросы к документам и индексы, которые они должны использовать.
+    Запросы строятся так же, как в маршрутах (библиотека, папка, панель
+    администратора).
+
+    Returns:
+        list: кортежи (название, запрос, имя индекса)
+    """
+    sort_fields = {
+        "created_at": (Document.created_at, "ix_documents_user_created"),
+        "updated_at": (Document.updated_at, "ix_documents_user_updated"),
+        "title": (Document.title, "ix_documents_user_title"),
+        "file_size": (FILE_SIZE_SORT, "ix_documents_user_file_size"),
+    }
+    sample_values = {
+        "created_at": datetime(2024, 1, 1),
+        "updated_at": datetime(2024, 1, 1),
+        "title": "м",
+        "file_size": 1024,
+    }
+
+    library = Document.query.options(Document.listing_options()).filter_by(
+        user_id=1, is_archived=False
+    )
+
+    checks = []
+    for field, (column, index_name) in sort_fields.items():
+        for descending in (True, False):
+            direction = "desc" if descending else "asc"
+            checks.append(
+                (
+                    f"библиотека, {field} {direction}",
+                    keyset_query(library, column, Document.id, None, descending),
+                    index_name,
+                )
+            )
+            checks.append(
+                (
+                    f"библиотека, {field} {direction}, следующая страница",
+                    keyset_query(
+                        library,
+                        column,
+                        Document.id,
+                        [sample_values[field], 100],
+                        descending,
+                    ),
+                    index_name,
+                )
+            )
+
+    checks.append(
+        (
+            "папка, created_at desc",
+            Document.query.options(Document.listing_options())
+            .filter_by(folder_id=1, is_archived=False)
+            .order_by(Document.created_at.desc()),
+            "ix_documents_folder_created",
+        )
+    )
+    checks.append(
+        (
+            "статус OCR, количество",
+            Document.query.filter_by(ocr_status="completed").with_entities(
+                db.func.count(Document.id)
+            ),
+            "ix_documents_ocr_status",
+        )
+    )
+    return checks
+
+
+def _query_plan(query) -> list:
+    """
+    Возвращает план выполнения запроса в SQLite (EXPLAIN QUERY PLAN).
+
+    Args:
+        query: запрос SQLAlchemy
+
+    Returns:
+        list: строки плана
+    """
+    compiled = query.limit(50).statement.compile(
+        dialect=sqlite.dialect(paramstyle="named"),
+        compile_kwargs={"render_postcompile": True},
+    )
+    params = {
+        name: value.isoformat(" ") if isinstance(value, datetime) else value
+        for name, value in compiled.params.items()
+    }
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"), params)
+    return [row[-1] for row in rows]
+
+
+def register_commands(app):
+    """
+    Регистрирует команды командной строки.
+
+    Args:
+        app: экземпляр Flask приложения
+    """
+
+    @app.cli.command("search-reindex")
+    def search_reindex():
+        """Перестраивает полнотекстовый индекс документов."""
+        if not SearchIndex.is_enabled():
+            click.echo("Полнотекстовый индекс используется только с SQLite")
+            return
+
+        count = SearchIndex.rebuild()
+        click.echo(f"Проиндексировано документов: {count}")
+
+    @app.cli.command("repair-counters")
+    def repair_counters():
+        """Пересчитывает счетчики документов папок и пользователей."""
+        fixed = CounterService.repair()
+        for table, count in fixed.items():
+            click.echo(f"{table}: исправлено строк {count}")
+
+    @app.cli.command("check-counters")
+    def check_counters():
+        """Проверяет, что счетчики документов совпадают с таблицей документов."""
+        mismatched = CounterService.check()
+        for table, count in mismatched.items():
+            click.echo(f"{table}: неверных строк {count}")
+
+        if any(mismatched.values()):
+            raise click.ClickException(
+                "Счетчики расходятся с документами (flask repair-counters)"
+            )
+
+    @app.cli.command("rebuild-daily-stats")
+    def rebuild_daily_stats():
+        """Пересчитывает дневную статистику по документам и заданиям OCR."""
+        count = StatsService.rebuild_daily()
+        click.echo(f"Строк дневной статистики: {count}")
+
+    @app.cli.command("gc-blobs")
+    def gc_blobs():
+        """Удаляет из хранилища файлы, на которые нет ссылок документов."""
+        removed = BlobStore.collect_garbage()
+        click.echo(
+            f"Удалено записей: {removed['blobs']}, файлов: {removed['files']}"
+        )
+
+    @app.cli.command("expire-uploads")
+    def expire_uploads():
+        """Удаляет незавершенные загрузки по частям с истекшим сроком."""
+        count = UploadSessionService.expire()
+        click.echo(f"Удалено загрузок: {count}")
+
+    @app.cli.command("expire-captures")
+    def expire_captures():
+        """Завершает брошенные многостраничные съемки с истекшим сроком."""
+        count = CaptureSessionService.expire()
+        click.echo(f"Обработано съемок: {count}")
+
+    @app.cli.command("check-query-plans")
+    def check_query_plans():
+        """Проверяет, что частые запросы к документам используют индексы."""
+        if db.engine.dialect.name != "sqlite":
+            click.echo("Проверка планов запросов выполняется только для SQLite")
+            return
+
+        failed = 0
+        for name, query, index_name in _hot_document_queries():
+            plan = _query_plan(query)
+            uses_index = any(index_name in line for line in plan)
+            sorts = any("TEMP B-TREE" in line for line in plan)
+
+            if uses_index and not sorts:
+                click.echo(f"OK      {name}: {index_name}")
+                continue
+
+            failed += 1
+            click.echo(f"ОШИБКА  {name}: ожидался {index_name} без сортировки")
+            for line in plan:
+                click.echo(f"          {line}")
+
+        if failed:
+            raise click.ClickException(f"Запросов без нужного индекса: {failed}")
+
+        click.echo("Все запросы используют индексы")
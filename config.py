@@ -47,10 +47,50 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
 
+    # Подключение к SQLite: PRAGMA выполняются для каждого соединения.
+    # WAL позволяет читать базу, пока обработчик OCR записывает статусы
+    SQLITE_WAL = os.environ.get("SQLITE_WAL", "1") == "1"  # 0 - для сетевых ФС
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",  # В режиме WAL безопасно и намного быстрее FULL
+        "busy_timeout": 10000,  # Ждать освобождения блокировки (мс)
+        "cache_size": -64000,  # Кэш страниц, КБ (отрицательное значение)
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    }
+
+    # Пул соединений для серверных СУБД (DATABASE_URL=postgresql://...)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT = 30  # Сколько ждать свободного соединения (сек)
+    DB_POOL_RECYCLE = 1800  # Переоткрывать соединения старше (сек)
+
     # Загрузка файлов
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
     ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg", "gif", "tiff", "bmp"}
+    UPLOAD_MAX_FILE_SIZE = MAX_CONTENT_LENGTH  # Один файл (проверяется при записи)
+    UPLOAD_CHECK_SIGNATURE = True  # Сверять первые байты файла с расширением
+
+    # Загрузка по частям (с продолжением после обрыва соединения)
+    UPLOAD_SESSION_FOLDER = os.path.join(UPLOAD_FOLDER, "sessions")
+    UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024  # Размер части, который предлагается клиенту
+    UPLOAD_RESUMABLE_MAX_SIZE = 500 * 1024 * 1024  # 500MB - весь файл
+    UPLOAD_SESSION_TTL = 24 * 60 * 60  # Незавершенная загрузка хранится (сек)
+
+    # Многостраничная съемка камерой (страницы собираются в один PDF)
+    CAPTURE_FOLDER = os.path.join(UPLOAD_FOLDER, "captures")
+    CAPTURE_PAGE_DPI = 200  # Размер страницы PDF: пиксели снимка при этом DPI
+    CAPTURE_MAX_PAGES = 200
+    CAPTURE_SESSION_TTL = 6 * 60 * 60  # Брошенная съемка завершается (сек)
+
+    # Как часто обработчик очереди OCR в простое удаляет брошенные загрузки
+    # по частям и завершает брошенные съемки (сек)
+    SESSION_EXPIRE_INTERVAL = 15 * 60
+
+    # Хранилище файлов по содержимому (одинаковые файлы хранятся один раз)
+    BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, "blobs")
+    BLOB_CHUNK_SIZE = 1024 * 1024  # Размер блока при записи и хэшировании
 
     # Миниатюры
     THUMBNAIL_SIZE = (300, 300)
@@ -74,9 +114,57 @@ class Config:
     OCR_LANGUAGES = ["ru", "en"]
     OCR_GPU = False
 
+    # Очередь OCR
+    # 'thread' - обработчик в потоке веб-приложения,
+    # 'external' - отдельный процесс (python ocr_worker.py)
+    OCR_WORKER_MODE = os.environ.get("OCR_WORKER_MODE", "thread")
+    OCR_WORKER_POLL_INTERVAL = 1.0  # Интервал опроса очереди (сек)
+    OCR_JOB_TIMEOUT = 30 * 60  # Задание в обработке дольше - считается зависшим
+    OCR_REQUEUE_INTERVAL = 60  # Как часто искать зависшие задания (сек)
+    OCR_JOB_MAX_ATTEMPTS = 3
+
+    # Фоновый прогрев OCR после запуска (torch/EasyOCR не загружаются при старте)
+    OCR_WARMUP = os.environ.get("OCR_WARMUP", "1") == "1"
+    OCR_WARMUP_DELAY = 2.0  # Через сколько секунд после запуска начинать (сек)
+
+    # Пул процессов OCR (в каждом процессе свой прогретый EasyOCR Reader)
+    # 0 - автоматически: физические ядра / потоки на один Reader
+    OCR_POOL_WORKERS = int(os.environ.get("OCR_POOL_WORKERS", 0))
+    OCR_THREADS_PER_READER = int(os.environ.get("OCR_THREADS_PER_READER", 4))
+
+    # Пакетное распознавание
+    OCR_BATCH_SIZE = 16  # Областей текста одной страницы за проход распознавателя
+    OCR_BATCH_PAGES = 4  # Изображений (страниц) за один проход детектора
+    OCR_BATCH_MAX_WAIT = 0.05  # Сколько ждать заполнения пакета (сек)
+
+    # Кэш результатов OCR (ключ - хэш изображения страницы)
+    OCR_CACHE_ENABLED = True
+    OCR_CACHE_FOLDER = os.path.join(BASE_DIR, "cache", "ocr")
+    OCR_CACHE_MAX_SIZE = 500 * 1024 * 1024  # 500MB, старые записи удаляются
+
+    # Разметка OCR (слова, рамки, уверенность) - отдельный файл на документ.
+    # Хранится вне UPLOAD_FOLDER: папка загрузок раздается маршрутом /uploads
+    # без проверки владельца, а разметка доступна только через /scanner/ocr_layout
+    OCR_LAYOUT_FOLDER = os.path.join(BASE_DIR, "data", "layouts")
+
+    # Библиотека: документов на странице (следующие подгружаются при прокрутке)
+    LIBRARY_PAGE_SIZE = 60
+
+    # Нечеткий поиск (текст с ошибками OCR)
+    SEARCH_FUZZY_THRESHOLD = 0.4  # Минимальная доля общих триграмм слов
+    SEARCH_FUZZY_TERMS = 10  # Похожих слов словаря на одно слово запроса
+    SEARCH_FUZZY_MAX_RESULTS = 500  # Максимум документов в результатах
+
     # PDF настройки
     PDF_DPI = 300  # Качество при генерации PDF
     PDF_TO_IMAGE_DPI = 300  # Качество при конвертации PDF → изображение
+    PDF_RENDER_LOOKAHEAD = 2  # Сколько страниц рендерить заранее при OCR
+    PDF_OCR_GRAYSCALE = True  # Рендерить страницы для OCR в оттенках серого
+    PDF_TEXT_MIN_CHARS = 30  # Меньше символов в текстовом слое - страница для OCR
+    PDF_IMAGE_COVERAGE_THRESHOLD = 0.5  # Доля площади под изображениями - скан
+
+    # Статистика панели администратора кэшируется на (сек)
+    ADMIN_STATS_TTL = 60
 
     # Администратор
     ADMIN_USERNAME = "admin"
@@ -88,11 +176,26 @@ class Config:
         """Инициализация приложения"""
         # Создаем необходимые директории
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+        os.makedirs(Config.BLOB_FOLDER, exist_ok=True)
+        os.makedirs(Config.UPLOAD_SESSION_FOLDER, exist_ok=True)
+        os.makedirs(Config.CAPTURE_FOLDER, exist_ok=True)
         os.makedirs(Config.THUMBNAIL_FOLDER, exist_ok=True)
         os.makedirs(Config.EXPORT_TEMP_FOLDER, exist_ok=True)  # ← НОВОЕ
         os.makedirs(Config.LOG_FOLDER, exist_ok=True)
+        os.makedirs(Config.OCR_CACHE_FOLDER, exist_ok=True)
+        os.makedirs(Config.OCR_LAYOUT_FOLDER, exist_ok=True)
         os.makedirs(os.path.join(Config.BASE_DIR, "data"), exist_ok=True)
 
+        # Разметка раньше хранилась в папке загрузок - переносим
+        old_layout_folder = os.path.join(Config.UPLOAD_FOLDER, "layouts")
+        if os.path.isdir(old_layout_folder):
+            for filename in os.listdir(old_layout_folder):
+                os.replace(
+                    os.path.join(old_layout_folder, filename),
+                    os.path.join(Config.OCR_LAYOUT_FOLDER, filename),
+                )
+            os.rmdir(old_layout_folder)
+
 
 class DevelopmentConfig(Config):
     """Конфигурация для разработки"""
@@ -23,6 +23,22 @@ login_manager.login_message_category = "info"
 from models.user import User
 from models.folder import Folder
 from models.document import Document
+from models.ocr_job import OCRJob
+from models.daily_stat import DailyStat
+from models.blob import Blob
+from models.upload_session import UploadSession
+from models.capture_session import CaptureSession
 
 # Экспортируем все для удобного импорта в других модулях
-__all__ = ["db", "login_manager", "User", "Folder", "Document"]
+__all__ = [
+    "db",
+    "login_manager",
+    "User",
+    "Folder",
+    "Document",
+    "OCRJob",
+    "DailyStat",
+    "Blob",
+    "UploadSession",
+    "CaptureSession",
+]
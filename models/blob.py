@@ -0,0 +1,68 @@
+# models/blob.py
+"""
+Модель файла в хранилище по содержимому.
+Файл хранится один раз под именем SHA-256 своего содержимого,
+документы ссылаются на него через Document.content_hash.
+"""
+
+from datetime import datetime
+from models import db
+
+
+class Blob(db.Model):
+    """
+    Файл хранилища (services/blob_store.py).
+    Удаляется вместе с миниатюрой, когда на него не остается ссылок.
+    """
+
+    # Название таблицы в базе данных
+    __tablename__ = "blobs"
+
+    # === ОСНОВНЫЕ ПОЛЯ ===
+
+    # Уникальный идентификатор файла (первичный ключ)
+    id = db.Column(db.Integer, primary_key=True)
+
+    # SHA-256 содержимого (hex)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+
+    # Размер файла в байтах
+    size = db.Column(db.BigInteger, nullable=False)
+
+    # Путь к файлу
+    storage_path = db.Column(db.String(512), nullable=False)
+
+    # Путь к миниатюре (создается один раз для всех документов с этим файлом)
+    thumbnail_path = db.Column(db.String(512), nullable=True)
+
+    # Количество документов, ссылающихся на файл
+    ref_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # === ВРЕМЕННЫЕ МЕТКИ ===
+
+    # Дата и время первой загрузки
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # === МЕТОДЫ ===
+
+    def to_dict(self):
+        """
+        Преобразует файл хранилища в словарь.
+
+        Returns:
+            Словарь с данными файла
+        """
+        return {
+            "id": self.id,
+            "sha256": self.sha256,
+            "size": self.size,
+            "ref_count": self.ref_count,
+            "has_thumbnail": self.thumbnail_path is not None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        """
+        Строковое представление объекта для отладки.
+        """
+        return f"<Blob {self.sha256[:12]} (refs: {self.ref_count})>"
@@ -0,0 +1,112 @@
+# models/capture_session.py
+"""
+Модель сеанса многостраничной съемки камерой.
+Снимки добавляются в один PDF по мере съемки, а страницы распознаются
+в фоне, не дожидаясь конца съемки.
+"""
+
+from datetime import datetime
+from models import db
+
+
+class CaptureSession(db.Model):
+    """
+    Сеанс съемки многостраничного документа (services/capture_sessions.py).
+    Документ создается при начале съемки; каждая страница дописывается
+    в его PDF и получает отдельное задание OCR (OCRJob.page_number).
+    """
+
+    # Название таблицы в базе данных
+    __tablename__ = "capture_sessions"
+
+    # === ОСНОВНЫЕ ПОЛЯ ===
+
+    # Идентификатор сеанса (случайная строка, передается клиенту)
+    id = db.Column(db.String(32), primary_key=True)
+
+    # ID пользователя, который снимает документ
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=False, index=True
+    )
+
+    # ID собираемого документа
+    document_id = db.Column(
+        db.Integer, db.ForeignKey("documents.id"), nullable=False, index=True
+    )
+
+    # Статус сеанса:
+    #   active - можно добавлять страницы
+    #   appending - добавляется страница (другие запросы ждут)
+    #   finishing - съемка закончена, распознаются последние страницы
+    #   completed - текст страниц собран в документ
+    status = db.Column(db.String(20), default="active", nullable=False)
+
+    # Количество страниц в PDF
+    page_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Распознавать страницы
+    auto_ocr = db.Column(db.Boolean, default=True, nullable=False)
+
+    # === ВРЕМЕННЫЕ МЕТКИ ===
+
+    # Дата и время начала съемки
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Дата и время последней страницы
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    # Брошенная съемка завершается после этого времени
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    # === СВЯЗИ С ДРУГИМИ ТАБЛИЦАМИ ===
+
+    # Связь с пользователем (при удалении пользователя сеансы удаляются)
+    user = db.relationship(
+        "User",
+        backref=db.backref(
+            "capture_sessions", lazy="dynamic", cascade="all, delete-orphan"
+        ),
+    )
+
+    # Связь с документом (при удалении документа сеанс удаляется)
+    document = db.relationship(
+        "Document",
+        backref=db.backref(
+            "capture_sessions", lazy="dynamic", cascade="all, delete-orphan"
+        ),
+    )
+
+    # === МЕТОДЫ ===
+
+    def is_expired(self):
+        """
+        Проверяет, истек ли срок сеанса.
+
+        Returns:
+            True если сеанс просрочен, False в противном случае
+        """
+        return self.expires_at <= datetime.utcnow()
+
+    def to_dict(self):
+        """
+        Преобразует сеанс в словарь (ответ API).
+
+        Returns:
+            Словарь с состоянием съемки
+        """
+        return {
+            "capture_id": self.id,
+            "document_id": self.document_id,
+            "status": self.status,
+            "page_count": self.page_count,
+            "auto_ocr": self.auto_ocr,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+    def __repr__(self):
+        """
+        Строковое представление объекта для отладки.
+        """
+        return f"<CaptureSession {self.id} ({self.page_count} стр., {self.status})>"
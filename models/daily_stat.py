@@ -0,0 +1,87 @@
+# models/daily_stat.py
+"""
+Модель дневной статистики.
+Одна строка - показатели одного пользователя за один день (UTC).
+Строки пополняются при загрузке документов и выполнении OCR,
+поэтому аналитика за месяцы не читает таблицу документов.
+"""
+
+from datetime import date
+from models import db
+
+
+class DailyStat(db.Model):
+    """
+    Показатели пользователя за день: загрузки, объем, страницы OCR,
+    время распознавания и ошибки.
+    """
+
+    # Название таблицы в базе данных
+    __tablename__ = "daily_stats"
+
+    # Счетчики, которые увеличиваются при событиях
+    COUNTERS = ("uploads", "upload_bytes", "ocr_pages", "ocr_seconds", "ocr_failures")
+
+    # === ОСНОВНЫЕ ПОЛЯ ===
+
+    # Уникальный идентификатор строки (первичный ключ)
+    id = db.Column(db.Integer, primary_key=True)
+
+    # День (UTC)
+    day = db.Column(db.Date, nullable=False)
+
+    # ID пользователя (без внешнего ключа: история сохраняется
+    # и после удаления пользователя)
+    user_id = db.Column(db.Integer, nullable=False)
+
+    # === ПОКАЗАТЕЛИ ===
+
+    # Загружено документов
+    uploads = db.Column(db.Integer, default=0, nullable=False)
+
+    # Загружено байт
+    upload_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+
+    # Распознано страниц
+    ocr_pages = db.Column(db.Integer, default=0, nullable=False)
+
+    # Время распознавания (сек)
+    ocr_seconds = db.Column(db.Float, default=0.0, nullable=False)
+
+    # Неудачных заданий OCR
+    ocr_failures = db.Column(db.Integer, default=0, nullable=False)
+
+    # === ИНДЕКСЫ ===
+
+    __table_args__ = (
+        # Одна строка на пользователя и день (ключ для INSERT ... ON CONFLICT),
+        # также используется для выборки по диапазону дней
+        db.UniqueConstraint("day", "user_id", name="uq_daily_stats_day_user"),
+        # История одного пользователя
+        db.Index("ix_daily_stats_user_day", "user_id", "day"),
+    )
+
+    # === МЕТОДЫ ===
+
+    def to_dict(self):
+        """
+        Преобразует строку статистики в словарь.
+
+        Returns:
+            Словарь с показателями
+        """
+        return {
+            "day": self.day.isoformat() if isinstance(self.day, date) else self.day,
+            "user_id": self.user_id,
+            "uploads": self.uploads,
+            "upload_bytes": self.upload_bytes,
+            "ocr_pages": self.ocr_pages,
+            "ocr_seconds": round(self.ocr_seconds or 0.0, 2),
+            "ocr_failures": self.ocr_failures,
+        }
+
+    def __repr__(self):
+        """
+        Строковое представление объекта для отладки.
+        """
+        return f"<DailyStat {self.day} (User: {self.user_id})>"
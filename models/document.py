@@ -5,6 +5,8 @@
 """
 
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import load_only
 from models import db
 import os
 
@@ -49,6 +51,10 @@ class Document(db.Model):
     # Расширение файла (pdf, jpg, png и т.д.)
     file_extension = db.Column(db.String(10), nullable=False)
 
+    # SHA-256 содержимого файла (ссылка на файл хранилища, см. models/blob.py).
+    # Пусто у документов, загруженных до появления хранилища
+    content_hash = db.Column(db.String(64), nullable=True, index=True)
+
     # === СОДЕРЖИМОЕ ДОКУМЕНТА ===
 
     # Распознанный текст из документа (OCR)
@@ -69,6 +75,9 @@ class Document(db.Model):
     # Количество страниц (для многостраничных документов)
     page_count = db.Column(db.Integer, default=1, nullable=False)
 
+    # Количество страниц, уже обработанных OCR (прогресс распознавания)
+    ocr_pages_done = db.Column(db.Integer, default=0, nullable=False)
+
     # === СВЯЗИ С ДРУГИМИ ТАБЛИЦАМИ ===
 
     # ID владельца документа (внешний ключ на таблицу users)
@@ -107,6 +116,67 @@ class Document(db.Model):
     # Дата и время последнего просмотра (для статистики)
     last_viewed = db.Column(db.DateTime, nullable=True)
 
+    # === ИНДЕКСЫ ===
+
+    # Составные индексы под запросы списков: документы пользователя
+    # (или папки) не в архиве, упорядоченные по полю сортировки и id.
+    # Запрос страницы библиотеки читает индекс по порядку, без сортировки
+    __table_args__ = (
+        db.Index(
+            "ix_documents_user_created", user_id, is_archived, created_at, id
+        ),
+        db.Index(
+            "ix_documents_user_updated", user_id, is_archived, updated_at, id
+        ),
+        db.Index("ix_documents_user_title", user_id, is_archived, title, id),
+        db.Index(
+            "ix_documents_folder_created", folder_id, is_archived, created_at, id
+        ),
+        # Счетчики статусов OCR в панели администратора
+        db.Index("ix_documents_ocr_status", ocr_status),
+    )
+
+    # === СПИСКИ ДОКУМЕНТОВ ===
+
+    # Колонки, которые загружаются в списках (библиотека, папки, админка).
+    # Большие текстовые поля (content, ocr_text, description, ocr_error)
+    # загружаются только при открытии документа
+    LISTING_COLUMNS = (
+        "title",
+        "original_filename",
+        "file_path",
+        "thumbnail_path",
+        "file_size",
+        "mime_type",
+        "file_extension",
+        "content_hash",
+        "ocr_status",
+        "ocr_pages_done",
+        "language",
+        "page_count",
+        "user_id",
+        "folder_id",
+        "tags",
+        "is_favorite",
+        "is_archived",
+        "created_at",
+        "updated_at",
+        "last_viewed",
+    )
+
+    @classmethod
+    def listing_options(cls):
+        """
+        Возвращает опцию запроса для списков документов: загружаются
+        только колонки LISTING_COLUMNS.
+
+        Пример: Document.query.options(Document.listing_options())
+
+        Returns:
+            Опция загрузки SQLAlchemy
+        """
+        return load_only(*(getattr(cls, name) for name in cls.LISTING_COLUMNS))
+
     # === МЕТОДЫ ===
 
     def get_file_size_mb(self):
@@ -195,7 +265,14 @@ class Document(db.Model):
         Returns:
             True если документ - изображение, False в противном случае
         """
-        return self.file_extension.lower() in ["jpg", "jpeg", "png", "gif", "bmp"]
+        return self.file_extension.lower().lstrip(".") in [
+            "jpg",
+            "jpeg",
+            "png",
+            "gif",
+            "bmp",
+            "tiff",
+        ]
 
     def is_pdf(self):
         """
@@ -204,7 +281,7 @@ class Document(db.Model):
         Returns:
             True если документ - PDF, False в противном случае
         """
-        return self.file_extension.lower() == "pdf"
+        return self.file_extension.lower().lstrip(".") == "pdf"
 
     def can_ocr(self):
         """
@@ -215,6 +292,36 @@ class Document(db.Model):
         """
         return self.is_image() or self.is_pdf()
 
+    def is_ocr_queued(self):
+        """
+        Проверяет, стоит ли документ в очереди OCR или обрабатывается.
+
+        Returns:
+            True если есть незавершенное задание OCR, False в противном случае
+        """
+        from models.ocr_job import OCRJob
+
+        return (
+            self.ocr_jobs.filter(
+                OCRJob.status.in_(["pending", "processing"])
+            ).count()
+            > 0
+        )
+
+    def get_ocr_layout(self):
+        """
+        Возвращает разметку распознанного текста (слова, рамки, уверенность).
+        Файл разметки загружается при первом обращении.
+
+        Returns:
+            OCRLayout или None, если разметки нет
+        """
+        if getattr(self, "_ocr_layout", None) is None:
+            from services.ocr_layout import OCRLayout
+
+            self._ocr_layout = OCRLayout.load_for(self.id)
+        return self._ocr_layout
+
     def to_dict(self):
         """
         Преобразует объект документа в словарь.
@@ -234,7 +341,9 @@ class Document(db.Model):
             "file_size_mb": self.get_file_size_mb(),
             "mime_type": self.mime_type,
             "file_extension": self.file_extension,
+            "content_hash": self.content_hash,
             "ocr_status": self.ocr_status,
+            "ocr_pages_done": self.ocr_pages_done,
             "language": self.language,
             "page_count": self.page_count,
             "user_id": self.user_id,
@@ -252,3 +361,43 @@ class Document(db.Model):
         Строковое представление объекта для отладки.
         """
         return f"<Document {self.title} (User: {self.user_id})>"
+
+
+# Размер файла для сортировки: документы без размера считаются пустыми.
+# Индекс построен по этому же выражению, поэтому запросы должны
+# использовать именно его
+FILE_SIZE_SORT = db.func.coalesce(Document.file_size, db.literal_column("0"))
+
+db.Index(
+    "ix_documents_user_file_size",
+    Document.user_id,
+    Document.is_archived,
+    FILE_SIZE_SORT,
+    Document.id,
+)
+
+
+# Поля, прежние значения которых нужны обработчикам after_update:
+# счетчики (services/counter_service.py), дневная статистика
+# (services/stats_service.py) и ссылки на файлы (services/blob_store.py)
+TRACKED_FIELDS = ("user_id", "folder_id", "is_archived", "file_size", "content_hash")
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    """
+    Пустой обработчик: active_history=True заставляет SQLAlchemy загрузить
+    старое значение поля перед присваиванием. Без этого поле, не загруженное
+    после коммита (expire_on_commit), не попадает в history.deleted.
+    """
+
+
+def track_previous_values():
+    """
+    Включает загрузку прежних значений полей TRACKED_FIELDS перед
+    присваиванием. Вызывается каждым сервисом, который читает их history;
+    повторный вызов ничего не меняет.
+    """
+    for field in TRACKED_FIELDS:
+        attribute = getattr(Document, field)
+        if not event.contains(attribute, "set", _load_previous_value):
+            event.listen(attribute, "set", _load_previous_value, active_history=True)
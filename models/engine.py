@@ -0,0 +1,95 @@
+# models/engine.py
+"""
+Настройка подключения к базе данных.
+Для SQLite при каждом подключении выполняются PRAGMA (WAL, ожидание
+блокировки, кэш и mmap), чтобы обработчик OCR, записывающий статусы,
+не блокировал чтение библиотеки и параллельные загрузки.
+Для серверных СУБД (PostgreSQL и др.) задаются параметры пула соединений.
+"""
+
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+
+def engine_options(config) -> dict:
+    """
+    Возвращает параметры create_engine для адреса базы данных.
+
+    Args:
+        config: конфигурация приложения (app.config)
+
+    Returns:
+        dict: параметры для SQLALCHEMY_ENGINE_OPTIONS
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+
+    if url.get_backend_name() == "sqlite":
+        # Соединения SQLite передаются между потоками пула,
+        # ожидание блокировки задается PRAGMA busy_timeout
+        return {"connect_args": {"check_same_thread": False}}
+
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": True,
+    }
+
+
+def sqlite_pragmas(config) -> dict:
+    """
+    Возвращает PRAGMA для подключений SQLite.
+
+    Args:
+        config: конфигурация приложения (app.config)
+
+    Returns:
+        dict: имя PRAGMA -> значение
+    """
+    pragmas = dict(config["SQLITE_PRAGMAS"])
+    if not config["SQLITE_WAL"]:
+        pragmas.pop("journal_mode", None)
+    return pragmas
+
+
+def configure_engine(app, engine):
+    """
+    Подключает PRAGMA SQLite к движку базы данных.
+    Вызывается после db.init_app(), до первого подключения.
+
+    Args:
+        app: экземпляр Flask приложения
+        engine: движок SQLAlchemy (db.engine)
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = sqlite_pragmas(app.config)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Выполняет PRAGMA для нового подключения."""
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
+
+    # Проверяем режим журнала (на некоторых ФС WAL недоступен)
+    if engine.url.database in (None, "", ":memory:"):
+        return
+
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    logger.info(f"SQLite: journal_mode={journal_mode}")
+    if pragmas.get("journal_mode", "").lower() == "wal" and journal_mode != "wal":
+        logger.warning(f"Режим WAL не включен, используется {journal_mode}")
@@ -36,6 +36,22 @@ class Folder(db.Model):
     # ID владельца папки (внешний ключ на таблицу users)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
+    # === СЧЕТЧИКИ ===
+    # Обновляются вместе с документами (services/counter_service.py),
+    # пересчитываются командой flask repair-counters
+    
+    # Количество документов в папке (включая архивные)
+    document_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Количество документов не в архиве
+    active_document_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    # Общий размер документов в байтах
+    total_size = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    # Размер документов не в архиве в байтах
+    active_total_size = db.Column(db.BigInteger, default=0, nullable=False)
+    
     # === ВРЕМЕННЫЕ МЕТКИ ===
     
     # Дата и время создания папки
@@ -62,7 +78,7 @@ class Folder(db.Model):
         Returns:
             Целое число - количество документов
         """
-        return self.documents.count()
+        return self.document_count or 0
     
     def get_total_size(self):
         """
@@ -71,11 +87,7 @@ class Folder(db.Model):
         Returns:
             Целое число - размер в байтах
         """
-        total = 0
-        for doc in self.documents:
-            if doc.file_size:
-                total += doc.file_size
-        return total
+        return self.total_size or 0
     
     def get_total_size_mb(self):
         """
@@ -0,0 +1,100 @@
+# models/ocr_job.py
+"""
+Модель задания OCR.
+Задания хранятся в базе данных и выполняются фоновым обработчиком,
+чтобы распознавание не блокировало HTTP-запросы.
+"""
+
+from datetime import datetime
+from models import db
+
+
+class OCRJob(db.Model):
+    """
+    Задание на распознавание текста документа.
+    Создается при загрузке/съемке документа и забирается обработчиком очереди.
+    """
+
+    # Название таблицы в базе данных
+    __tablename__ = "ocr_jobs"
+
+    # === ОСНОВНЫЕ ПОЛЯ ===
+
+    # Уникальный идентификатор задания (первичный ключ)
+    id = db.Column(db.Integer, primary_key=True)
+
+    # ID документа, для которого выполняется OCR
+    document_id = db.Column(
+        db.Integer, db.ForeignKey("documents.id"), nullable=False, index=True
+    )
+
+    # Номер страницы (с 0) для задания одной страницы многостраничной
+    # съемки (services/capture_sessions.py); None - весь документ
+    page_number = db.Column(db.Integer, nullable=True)
+
+    # Статус задания (pending, processing, completed, failed)
+    status = db.Column(db.String(20), default="pending", nullable=False, index=True)
+
+    # Количество попыток выполнения
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+
+    # Сообщение об ошибке, если задание не выполнено
+    error = db.Column(db.Text, nullable=True)
+
+    # Идентификатор обработчика, который забрал задание
+    worker_id = db.Column(db.String(64), nullable=True)
+
+    # === ВРЕМЕННЫЕ МЕТКИ ===
+
+    # Дата и время постановки в очередь
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Дата и время начала обработки
+    started_at = db.Column(db.DateTime, nullable=True)
+
+    # Дата и время завершения обработки
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # === СВЯЗИ С ДРУГИМИ ТАБЛИЦАМИ ===
+
+    # Связь с документом (при удалении документа задания удаляются)
+    document = db.relationship(
+        "Document",
+        backref=db.backref("ocr_jobs", lazy="dynamic", cascade="all, delete-orphan"),
+    )
+
+    # === МЕТОДЫ ===
+
+    def is_active(self):
+        """
+        Проверяет, находится ли задание в очереди или в обработке.
+
+        Returns:
+            True если задание еще не завершено, False в противном случае
+        """
+        return self.status in ("pending", "processing")
+
+    def to_dict(self):
+        """
+        Преобразует задание в словарь.
+
+        Returns:
+            Словарь с данными задания
+        """
+        return {
+            "id": self.id,
+            "document_id": self.document_id,
+            "page_number": self.page_number,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+    def __repr__(self):
+        """
+        Строковое представление объекта для отладки.
+        """
+        return f"<OCRJob {self.id} (Document: {self.document_id}, {self.status})>"
@@ -0,0 +1,115 @@
+# models/schema.py
+"""
+Обновление схемы существующей базы данных.
+db.create_all() создает только отсутствующие таблицы, поэтому новые колонки
+и индексы в уже существующих таблицах добавляются здесь.
+"""
+
+import logging
+from sqlalchemy import inspect, literal, text
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+
+def _column_default_sql(column, dialect):
+    """
+    Возвращает SQL выражение значения по умолчанию для новой колонки.
+
+    Args:
+        column: колонка SQLAlchemy
+        dialect: диалект базы данных
+
+    Returns:
+        Строка SQL или None
+    """
+    if column.server_default is not None:
+        return str(column.server_default.arg)
+
+    if column.default is not None and column.default.is_scalar:
+        return str(
+            literal(column.default.arg, type_=column.type).compile(
+                dialect=dialect, compile_kwargs={"literal_binds": True}
+            )
+        )
+
+    return None
+
+
+def _existing_indexes(connection, inspector, table_name):
+    """
+    Возвращает имена существующих индексов таблицы.
+    SQLite при чтении схемы пропускает индексы по выражениям,
+    поэтому для него имена берутся из sqlite_master.
+
+    Args:
+        connection: соединение
+        inspector: инспектор схемы
+        table_name: имя таблицы
+
+    Returns:
+        set: имена индексов
+    """
+    if connection.dialect.name == "sqlite":
+        rows = connection.execute(
+            text(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'index' AND tbl_name = :table"
+            ),
+            {"table": table_name},
+        )
+        return {row[0] for row in rows}
+
+    return {i["name"] for i in inspector.get_indexes(table_name)}
+
+
+def upgrade_schema():
+    """
+    Добавляет недостающие колонки и индексы в существующие таблицы.
+    Вызывается при запуске приложения после db.create_all().
+
+    Returns:
+        list: список выполненных изменений
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    dialect = engine.dialect
+    changes = []
+
+    with engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {c["name"] for c in inspector.get_columns(table.name)}
+
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+
+                default_sql = _column_default_sql(column, dialect)
+                if default_sql is not None:
+                    ddl += f" DEFAULT {default_sql}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+
+                connection.execute(text(ddl))
+                changes.append(f"{table.name}.{column.name}")
+
+            existing_indexes = _existing_indexes(connection, inspector, table.name)
+
+            for index in table.indexes:
+                if index.name in existing_indexes:
+                    continue
+
+                index.create(connection)
+                changes.append(index.name)
+
+    if changes:
+        logger.info(f"Схема базы данных обновлена: {', '.join(changes)}")
+
+    return changes
@@ -0,0 +1,126 @@
+# models/upload_session.py
+"""
+Модель сеанса загрузки по частям.
+Большой файл передается частями (PUT с указанием смещения), поэтому
+после обрыва соединения загрузка продолжается с последнего принятого байта.
+"""
+
+from datetime import datetime
+from models import db
+
+
+class UploadSession(db.Model):
+    """
+    Сеанс загрузки файла по частям (services/upload_sessions.py).
+    Принятые части дописываются во временный файл; после завершения
+    файл переносится в хранилище и создается документ.
+    """
+
+    # Название таблицы в базе данных
+    __tablename__ = "upload_sessions"
+
+    # === ОСНОВНЫЕ ПОЛЯ ===
+
+    # Идентификатор сеанса (случайная строка, передается клиенту)
+    id = db.Column(db.String(32), primary_key=True)
+
+    # ID пользователя, загружающего файл
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=False, index=True
+    )
+
+    # Статус сеанса (active, receiving - принимается часть,
+    # finalizing - создается документ, completed)
+    status = db.Column(db.String(20), default="active", nullable=False)
+
+    # === ФАЙЛ ===
+
+    # Имя файла (безопасное)
+    filename = db.Column(db.String(256), nullable=False)
+
+    # Расширение файла (с точкой, как у Document.file_extension)
+    file_extension = db.Column(db.String(10), nullable=False)
+
+    # MIME тип файла
+    mime_type = db.Column(db.String(128), nullable=True)
+
+    # Полный размер файла в байтах (объявлен клиентом)
+    total_size = db.Column(db.BigInteger, nullable=False)
+
+    # Сколько байтов уже принято (смещение следующей части)
+    received = db.Column(db.BigInteger, default=0, nullable=False)
+
+    # SHA-256 всего файла, если клиент его передал (проверяется при завершении)
+    sha256 = db.Column(db.String(64), nullable=True)
+
+    # === ПАРАМЕТРЫ ДОКУМЕНТА ===
+
+    # Название и описание документа
+    title = db.Column(db.String(256), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+
+    # Папка документа
+    folder_id = db.Column(db.Integer, nullable=True)
+
+    # Распознать текст после загрузки
+    auto_ocr = db.Column(db.Boolean, default=True, nullable=False)
+
+    # Созданный документ (после завершения)
+    document_id = db.Column(db.Integer, nullable=True)
+
+    # === ВРЕМЕННЫЕ МЕТКИ ===
+
+    # Дата и время начала загрузки
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # Дата и время последней принятой части
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    # Сеанс без активности удаляется после этого времени
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    # === СВЯЗИ С ДРУГИМИ ТАБЛИЦАМИ ===
+
+    # Связь с пользователем (при удалении пользователя сеансы удаляются)
+    user = db.relationship(
+        "User",
+        backref=db.backref(
+            "upload_sessions", lazy="dynamic", cascade="all, delete-orphan"
+        ),
+    )
+
+    # === МЕТОДЫ ===
+
+    def is_expired(self):
+        """
+        Проверяет, истек ли срок сеанса.
+
+        Returns:
+            True если сеанс просрочен, False в противном случае
+        """
+        return self.expires_at <= datetime.utcnow()
+
+    def to_dict(self):
+        """
+        Преобразует сеанс в словарь (ответ API).
+
+        Returns:
+            Словарь с состоянием загрузки
+        """
+        return {
+            "upload_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "size": self.total_size,
+            "offset": self.received,
+            "document_id": self.document_id,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
+
+    def __repr__(self):
+        """
+        Строковое представление объекта для отладки.
+        """
+        return f"<UploadSession {self.id} ({self.received}/{self.total_size})>"
@@ -49,6 +49,22 @@ class User(UserMixin, db.Model):
     # Флаг активности (False = пользователь заблокирован)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
 
+    # === СЧЕТЧИКИ ===
+    # Обновляются вместе с документами (services/counter_service.py),
+    # пересчитываются командой flask repair-counters
+
+    # Количество документов пользователя (включая архивные)
+    document_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Количество документов не в архиве
+    active_document_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Общий размер документов в байтах
+    total_size = db.Column(db.BigInteger, default=0, nullable=False)
+
+    # Размер документов не в архиве в байтах
+    active_total_size = db.Column(db.BigInteger, default=0, nullable=False)
+
     # === ВРЕМЕННЫЕ МЕТКИ ===
 
     # Дата и время регистрации
@@ -111,7 +127,16 @@ class User(UserMixin, db.Model):
         Returns:
             Целое число - количество документов
         """
-        return self.documents.count()
+        return self.document_count or 0
+
+    def get_total_storage(self):
+        """
+        Возвращает общий размер документов пользователя (в байтах).
+
+        Returns:
+            Целое число - размер в байтах
+        """
+        return self.total_size or 0
 
     def get_folder_count(self):
         """
@@ -0,0 +1,42 @@
+# ocr_worker.py
+"""
+Отдельный процесс-обработчик очереди OCR.
+Позволяет веб-приложению не выполнять распознавание в своих процессах.
+
+Запуск:
+    python ocr_worker.py
+Веб-приложение при этом запускается с OCR_WORKER_MODE=external,
+чтобы не запускать собственный поток-обработчик.
+"""
+
+import os
+import logging
+
+# Обработчик сам выполняет задания, поток внутри приложения не нужен
+os.environ["OCR_WORKER_MODE"] = "external"
+
+from services.ocr_queue import OCRWorker
+
+
+def main():
+    """Точка входа обработчика очереди OCR."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    # Приложение создается при импорте модуля app (режим берется из FLASK_ENV).
+    # Импорт выполняется здесь, а не на уровне модуля: дочерние процессы
+    # пула OCR (spawn) повторно выполняют этот файл и не должны создавать
+    # приложение
+    from app import app
+
+    worker = OCRWorker(app)
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
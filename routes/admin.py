@@ -6,7 +6,6 @@
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import current_user
-from datetime import datetime, timedelta
 import logging
 
 from models import db
@@ -14,6 +13,7 @@ from models.user import User
 from models.document import Document
 from models.folder import Folder
 from utils.decorators import login_required, admin_required
+from services.stats_service import StatsService
 
 # Настраиваем логирование
 logger = logging.getLogger(__name__)
@@ -30,60 +30,22 @@ def dashboard():
     Главная страница административной панели.
     Отображает статистику и общую информацию о системе.
     """
-    # Получаем общую статистику
-    total_users = User.query.count()
-    active_users = User.query.filter_by(is_active=True).count()
-    admin_users = User.query.filter_by(is_admin=True).count()
-
-    total_documents = Document.query.count()
-    total_folders = Folder.query.count()
-
-    # Вычисляем общий размер хранилища
-    total_storage = db.session.query(db.func.sum(Document.file_size)).scalar() or 0
-
-    # Статистика за последние 30 дней
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_users_30d = User.query.filter(User.created_at >= thirty_days_ago).count()
-    new_documents_30d = Document.query.filter(
-        Document.created_at >= thirty_days_ago
-    ).count()
-
-    # Статистика OCR
-    ocr_completed = Document.query.filter_by(ocr_status="completed").count()
-    ocr_processing = Document.query.filter_by(ocr_status="processing").count()
-    ocr_failed = Document.query.filter_by(ocr_status="failed").count()
+    # Общая статистика (несколько агрегирующих запросов, с кэшированием)
+    stats = StatsService.get_system_stats()
 
     # Последние пользователи
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
 
     # Последние документы
     recent_documents = (
-        Document.query.order_by(Document.created_at.desc()).limit(5).all()
-    )
-
-    # Топ пользователей по количеству документов
-    top_users = (
-        db.session.query(User, db.func.count(Document.id).label("doc_count"))
-        .join(Document)
-        .group_by(User.id)
-        .order_by(db.desc("doc_count"))
+        Document.query.options(Document.listing_options())
+        .order_by(Document.created_at.desc())
         .limit(5)
         .all()
     )
 
-    stats = {
-        "total_users": total_users,
-        "active_users": active_users,
-        "admin_users": admin_users,
-        "total_documents": total_documents,
-        "total_folders": total_folders,
-        "total_storage": total_storage,
-        "new_users_30d": new_users_30d,
-        "new_documents_30d": new_documents_30d,
-        "ocr_completed": ocr_completed,
-        "ocr_processing": ocr_processing,
-        "ocr_failed": ocr_failed,
-    }
+    # Топ пользователей по количеству документов (по счетчикам)
+    top_users = StatsService.get_top_users(5)
 
     logger.info(f"Админ-панель открыта: admin_id={current_user.id}")
 
@@ -153,17 +115,15 @@ def view_user(user_id):
 
     # Получаем статистику пользователя
     user_stats = {
-        "documents": Document.query.filter_by(user_id=user_id).count(),
+        "documents": user.document_count,
         "folders": Folder.query.filter_by(user_id=user_id).count(),
-        "storage": db.session.query(db.func.sum(Document.file_size))
-        .filter_by(user_id=user_id)
-        .scalar()
-        or 0,
+        "storage": user.total_size,
     }
 
     # Последние документы пользователя
     recent_documents = (
-        Document.query.filter_by(user_id=user_id)
+        Document.query.options(Document.listing_options())
+        .filter_by(user_id=user_id)
         .order_by(Document.created_at.desc())
         .limit(10)
         .all()
@@ -288,8 +248,8 @@ def documents():
     search_query = request.args.get("q", "").strip()
     user_filter = request.args.get("user_id", type=int)
 
-    # Базовый запрос
-    query = Document.query
+    # Базовый запрос (без больших текстовых полей)
+    query = Document.query.options(Document.listing_options())
 
     # Фильтр по пользователю
     if user_filter:
@@ -329,34 +289,24 @@ def statistics():
     """
     Детальная статистика системы.
     """
+    stats = StatsService.get_system_stats()
+
     # Общая статистика
     total_stats = {
-        "users": User.query.count(),
-        "documents": Document.query.count(),
-        "folders": Folder.query.count(),
-        "storage_bytes": db.session.query(db.func.sum(Document.file_size)).scalar()
-        or 0,
+        "users": stats["total_users"],
+        "documents": stats["total_documents"],
+        "folders": stats["total_folders"],
+        "storage_bytes": stats["total_storage"],
     }
 
     # Статистика за последние 30 дней
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-
     recent_stats = {
-        "new_users": User.query.filter(User.created_at >= thirty_days_ago).count(),
-        "new_documents": Document.query.filter(
-            Document.created_at >= thirty_days_ago
-        ).count(),
+        "new_users": stats["new_users_30d"],
+        "new_documents": stats["new_documents_30d"],
     }
 
     # Топ пользователей по количеству документов
-    top_users = (
-        db.session.query(User, db.func.count(Document.id).label("doc_count"))
-        .join(Document)
-        .group_by(User.id)
-        .order_by(db.desc("doc_count"))
-        .limit(10)
-        .all()
-    )
+    top_users = StatsService.get_top_users(10)
 
     return render_template(
         "admin/statistics.html",
@@ -364,3 +314,49 @@ def statistics():
         recent_stats=recent_stats,
         top_users=top_users,
     )
+
+
+@admin_bp.route("/api/stats/daily")
+@login_required
+@admin_required
+def api_daily_stats():
+    """
+    API: показатели по дням из дневной статистики.
+
+    Query параметры:
+        days: период в днях (по умолчанию 30)
+        user_id: только для пользователя
+    """
+    days = request.args.get("days", 30, type=int)
+    user_id = request.args.get("user_id", type=int)
+
+    try:
+        series = StatsService.get_daily_series(days, user_id=user_id)
+        return jsonify({"success": True, "user_id": user_id, **series})
+
+    except Exception as e:
+        logger.error(f"Ошибка получения дневной статистики: {e}", exc_info=True)
+        return jsonify({"success": False, "error": "Ошибка получения статистики"}), 500
+
+
+@admin_bp.route("/api/stats/users")
+@login_required
+@admin_required
+def api_users_stats():
+    """
+    API: суммарные показатели пользователей за период.
+
+    Query параметры:
+        days: период в днях (по умолчанию 30)
+        limit: количество пользователей (по умолчанию 10, не больше 100)
+    """
+    days = request.args.get("days", 30, type=int)
+    limit = min(request.args.get("limit", 10, type=int), 100)
+
+    try:
+        users = StatsService.get_daily_by_user(days, limit=limit)
+        return jsonify({"success": True, "days": days, "users": users})
+
+    except Exception as e:
+        logger.error(f"Ошибка получения статистики пользователей: {e}", exc_info=True)
+        return jsonify({"success": False, "error": "Ошибка получения статистики"}), 500
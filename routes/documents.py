@@ -21,15 +21,17 @@ import os
 import logging
 import shutil
 
+from sqlalchemy import func
+
 from models import db
-from models.document import Document
+from models.document import Document, FILE_SIZE_SORT
 from models.folder import Folder
 from utils.decorators import login_required
 from utils.validators import validate_folder_name, validate_document_title
 from utils.helpers import format_file_size, format_date
 from services.document_service import DocumentService
-from services.export_service import ExportService
-from services.pdf_service import PDFService
+from services.search_service import SearchIndex
+from utils.pagination import encode_cursor, decode_cursor, keyset_paginate
 
 # Настраиваем логирование
 logger = logging.getLogger(__name__)
@@ -38,83 +40,325 @@ logger = logging.getLogger(__name__)
 documents_bp = Blueprint("documents", __name__)
 
 
+# Поля сортировки библиотеки (файлы без размера считаются пустыми)
+LIBRARY_SORT_FIELDS = {
+    "created_at": Document.created_at,
+    "updated_at": Document.updated_at,
+    "title": Document.title,
+    "file_size": FILE_SIZE_SORT,
+}
+
+
+def _library_params() -> dict:
+    """Параметры библиотеки из query string."""
+    search_query = request.args.get("q", "").strip()
+    sort_by = request.args.get("sort_by", "relevance" if search_query else "created_at")
+    if sort_by not in LIBRARY_SORT_FIELDS and not (
+        sort_by == "relevance" and search_query
+    ):
+        sort_by = "created_at"
+
+    return {
+        "folder_id": request.args.get("folder_id", type=int),
+        "search_query": search_query,
+        "fuzzy": request.args.get("fuzzy") == "1",
+        "sort_by": sort_by,
+        "order": "asc" if request.args.get("order") == "asc" else "desc",
+    }
+
+
+def _library_query(params: dict):
+    """
+    Запрос документов библиотеки (фильтры и поиск, без сортировки).
+
+    Args:
+        params: параметры из _library_params
+
+    Returns:
+        Запрос Document.query
+    """
+    query = Document.query.options(Document.listing_options()).filter_by(
+        user_id=current_user.id, is_archived=False
+    )
+
+    # Фильтр по папке
+    if params["folder_id"]:
+        query = query.filter_by(folder_id=params["folder_id"])
+
+    # Полнотекстовый поиск (по релевантности, если не выбрана другая сортировка)
+    if params["search_query"]:
+        query = SearchIndex.apply(
+            query,
+            params["search_query"],
+            order_by_rank=(params["sort_by"] == "relevance"),
+            fuzzy=params["fuzzy"],
+            user_id=current_user.id,
+        )
+
+    return query
+
+
+def _library_sort_value(document: Document, sort_by: str):
+    """Значение сортировки документа (как в LIBRARY_SORT_FIELDS)."""
+    if sort_by == "file_size":
+        return document.file_size or 0
+    return getattr(document, sort_by)
+
+
+def _library_page(query, params: dict, cursor: dict = None):
+    """
+    Возвращает страницу документов библиотеки.
+    Для сортировки по полю используется позиция последнего документа
+    (keyset), для сортировки по релевантности - смещение: порядок
+    задает ранг поиска, который пересчитывается в каждом запросе.
+
+    Args:
+        query: запрос из _library_query
+        params: параметры из _library_params
+        cursor: позиция из курсора (None - первая страница)
+
+    Returns:
+        tuple: (документы, курсор следующей страницы или None)
+    """
+    per_page = current_app.config["LIBRARY_PAGE_SIZE"]
+    sort_by = params["sort_by"]
+    position = {"sort_by": sort_by, "order": params["order"]}
+
+    if sort_by == "relevance":
+        offset = cursor["offset"] if cursor else 0
+        documents = (
+            query.order_by(Document.id.desc())
+            .offset(offset)
+            .limit(per_page + 1)
+            .all()
+        )
+        if len(documents) <= per_page:
+            return documents, None
+        return documents[:per_page], encode_cursor(
+            {**position, "offset": offset + per_page}
+        )
+
+    documents, after = keyset_paginate(
+        query,
+        LIBRARY_SORT_FIELDS[sort_by],
+        Document.id,
+        key=lambda document: _library_sort_value(document, sort_by),
+        after=cursor["after"] if cursor else None,
+        descending=(params["order"] == "desc"),
+        per_page=per_page,
+    )
+    if after is None:
+        return documents, None
+    return documents, encode_cursor({**position, "after": after})
+
+
+def _parse_library_cursor(value: str, params: dict):
+    """
+    Проверяет курсор: он должен относиться к той же сортировке.
+
+    Returns:
+        dict или None, если курсор некорректен
+    """
+    cursor = decode_cursor(value)
+    if cursor is None:
+        return None
+
+    same_sort = (cursor.get("sort_by"), cursor.get("order")) == (
+        params["sort_by"],
+        params["order"],
+    )
+    if not same_sort:
+        return None
+
+    if params["sort_by"] == "relevance":
+        valid = isinstance(cursor.get("offset"), int) and cursor["offset"] >= 0
+    else:
+        after = cursor.get("after")
+        valid = isinstance(after, list) and len(after) == 2
+    return cursor if valid else None
+
+
 @documents_bp.route("/library")
 @login_required
 def library():
     """
     Главная страница библиотеки документов.
-    Отображает все документы пользователя с возможностью фильтрации и сортировки.
+    Отображает первую страницу документов пользователя с фильтрацией
+    и сортировкой; следующие страницы подгружаются через api_library.
     """
-    # Получаем параметры из query string
-    folder_id = request.args.get("folder_id", type=int)
-    sort_by = request.args.get("sort_by", "created_at")
-    order = request.args.get("order", "desc")
-    search_query = request.args.get("q", "").strip()
+    params = _library_params()
 
     logger.info(
-        f"Библиотека: user_id={current_user.id}, folder_id={folder_id}, sort={sort_by}"
+        f"Библиотека: user_id={current_user.id}, folder_id={params['folder_id']}, "
+        f"sort={params['sort_by']}"
     )
 
-    # Базовый запрос документов пользователя
-    query = Document.query.filter_by(user_id=current_user.id, is_archived=False)
-
-    # Фильтр по папке
-    if folder_id:
-        query = query.filter_by(folder_id=folder_id)
+    if params["folder_id"]:
         current_folder = Folder.query.filter_by(
-            id=folder_id, user_id=current_user.id
+            id=params["folder_id"], user_id=current_user.id
         ).first()
     else:
         current_folder = None
 
-    # Поиск по названию и содержимому
-    if search_query:
-        query = query.filter(
-            db.or_(
-                Document.title.contains(search_query),
-                Document.content.contains(search_query),
-                Document.description.contains(search_query),
-            )
-        )
-
-    # Сортировка
-    valid_sort_fields = ["created_at", "updated_at", "title", "file_size"]
-    if sort_by in valid_sort_fields:
-        order_column = getattr(Document, sort_by)
-        if order == "desc":
-            query = query.order_by(order_column.desc())
-        else:
-            query = query.order_by(order_column.asc())
-
-    # Выполняем запрос
-    documents = query.all()
+    query = _library_query(params)
+    documents, next_cursor = _library_page(query, params)
 
     # Получаем все папки пользователя
     folders = (
         Folder.query.filter_by(user_id=current_user.id).order_by(Folder.name).all()
     )
 
+    # Количество и размер найденных документов: без поиска - из счетчиков
+    # папки или пользователя, при поиске - считаются в базе данных
+    if params["search_query"]:
+        found = query.order_by(None).with_entities(
+            func.count(Document.id), func.coalesce(func.sum(Document.file_size), 0)
+        ).one()
+    elif params["folder_id"]:
+        if current_folder is not None:
+            found = (
+                current_folder.active_document_count,
+                current_folder.active_total_size,
+            )
+        else:
+            found = (0, 0)
+    else:
+        found = (current_user.active_document_count, current_user.active_total_size)
+
     # Статистика
     stats = {
-        "total_documents": Document.query.filter_by(
-            user_id=current_user.id, is_archived=False
-        ).count(),
+        "total_documents": current_user.active_document_count,
         "total_folders": len(folders),
-        "total_size": sum([doc.file_size or 0 for doc in documents]),
+        "total_size": found[1],
+        "found_documents": found[0],
     }
 
     return render_template(
         "documents/library.html",
         documents=documents,
+        next_cursor=next_cursor,
         folders=folders,
         current_folder=current_folder,
         stats=stats,
-        sort_by=sort_by,
-        order=order,
-        search_query=search_query,
+        sort_by=params["sort_by"],
+        order=params["order"],
+        search_query=params["search_query"],
+        fuzzy=params["fuzzy"],
     )
 
 
+@documents_bp.route("/api/library")
+@login_required
+def api_library():
+    """
+    API: следующая страница библиотеки (бесконечная прокрутка).
+
+    Query параметры: те же, что у library, и cursor - курсор
+    из предыдущего ответа (next_cursor).
+    """
+    params = _library_params()
+
+    cursor_value = request.args.get("cursor")
+    cursor = None
+    if cursor_value:
+        cursor = _parse_library_cursor(cursor_value, params)
+        if cursor is None:
+            return jsonify({"success": False, "error": "Некорректный курсор"}), 400
+
+    try:
+        query = _library_query(params)
+        documents, next_cursor = _library_page(query, params, cursor)
+
+        return jsonify(
+            {
+                "success": True,
+                "html": render_template(
+                    "documents/_document_cards.html", documents=documents
+                ),
+                "count": len(documents),
+                "next_cursor": next_cursor,
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка загрузки страницы библиотеки: {e}", exc_info=True)
+        return jsonify({"success": False, "error": "Ошибка загрузки документов"}), 500
+
+
+@documents_bp.route("/api/search")
+@login_required
+def api_search():
+    """
+    API: поиск документов пользователя.
+
+    Query параметры:
+        q: строка поиска
+        fuzzy: 1 - нечеткий поиск (допускает ошибки распознавания)
+        threshold: минимальное сходство слов для нечеткого поиска (0..1)
+        limit: максимум результатов (по умолчанию 20, не больше 100)
+    """
+    search_query = request.args.get("q", "").strip()
+    fuzzy = request.args.get("fuzzy") == "1"
+    threshold = request.args.get("threshold", type=float)
+    limit = min(request.args.get("limit", 20, type=int), 100)
+
+    if not search_query:
+        return jsonify({"success": False, "error": "Пустой запрос"}), 400
+
+    if threshold is not None and not 0 < threshold <= 1:
+        return (
+            jsonify({"success": False, "error": "threshold должен быть от 0 до 1"}),
+            400,
+        )
+
+    try:
+        scores = {}
+        terms = {}
+        if fuzzy and SearchIndex.is_enabled():
+            results = SearchIndex.fuzzy_search(
+                search_query, user_id=current_user.id, threshold=threshold, limit=limit
+            )
+            for result in results:
+                scores[result["document_id"]] = round(result["score"], 3)
+                terms[result["document_id"]] = result["terms"]
+
+            documents = (
+                Document.query.options(Document.listing_options())
+                .filter(Document.id.in_(scores))
+                .all()
+            )
+            documents.sort(key=lambda document: -scores[document.id])
+        else:
+            query = Document.query.options(Document.listing_options()).filter_by(
+                user_id=current_user.id, is_archived=False
+            )
+            documents = SearchIndex.apply(query, search_query).limit(limit).all()
+
+        return jsonify(
+            {
+                "success": True,
+                "query": search_query,
+                "fuzzy": fuzzy,
+                "results": [
+                    {
+                        "id": document.id,
+                        "title": document.title,
+                        "file_extension": document.file_extension,
+                        "created_at": format_date(document.created_at),
+                        "score": scores.get(document.id),
+                        "matched_terms": terms.get(document.id, []),
+                        "url": url_for("documents.view_document", document_id=document.id),
+                    }
+                    for document in documents
+                ],
+            }
+        )
+
+    except Exception as e:
+        logger.error(f"Ошибка поиска: {e}", exc_info=True)
+        return jsonify({"success": False, "error": "Ошибка поиска"}), 500
+
+
 @documents_bp.route("/view/<int:document_id>")
 @login_required
 def view_document(document_id):
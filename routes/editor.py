@@ -11,6 +11,7 @@ import os
 
 from models import db
 from models.document import Document
+from services.ocr_queue import OCRQueue
 from utils.decorators import login_required
 
 # Настраиваем логирование
@@ -123,7 +124,11 @@ def autosave(document_id):
 @editor_bp.route("/rerun_ocr/<int:doc_id>", methods=["POST"])
 @login_required
 def rerun_ocr(doc_id):
-    """Повторный запуск OCR для документа"""
+    """
+    Повторный запуск OCR для документа.
+    Распознавание ставится в очередь, статус опрашивается через
+    /scanner/ocr_status/<doc_id>.
+    """
     try:
         document = Document.query.filter_by(
             id=doc_id, user_id=current_user.id
@@ -133,56 +138,21 @@ def rerun_ocr(doc_id):
         if not os.path.exists(document.file_path):
             return jsonify({"success": False, "error": "Файл не найден"}), 404
 
-        # Обновляем статус
-        document.ocr_status = "processing"
+        OCRQueue.enqueue(document)
         db.session.commit()
 
-        # Запускаем OCR (БЕЗ Tesseract!)
-        from services.ocr_service import OCRService
-        from services.pdf_service import PDFService
-
-        try:
-            # Если PDF
-            if document.file_extension == ".pdf":
-                text = PDFService.extract_text_from_pdf(document.file_path)
-            else:
-                # Если изображение
-                text = OCRService.extract_text(document.file_path)
-
-            if text and text.strip():
-                document.ocr_text = text
-                document.content = text
-                document.ocr_status = "completed"
-                document.ocr_error = None
-
-                db.session.commit()
-
-                logger.info(f"OCR повторно выполнен для документа {doc_id}")
-
-                return jsonify(
-                    {"success": True, "text": text, "message": "OCR успешно выполнен"}
-                )
-            else:
-                document.ocr_status = "failed"
-                document.ocr_error = "Текст не найден"
-                db.session.commit()
+        logger.info(f"Повторный OCR поставлен в очередь: doc_id={doc_id}")
 
-                return jsonify({"success": False, "error": "Текст не распознан"}), 400
-
-        except Exception as e:
-            document.ocr_status = "failed"
-            document.ocr_error = str(e)
-            db.session.commit()
-            raise
-
-    except Exception as e:
-        logger.error(f"Ошибка при повторном OCR: {e}")
-        return jsonify({"success": False, "error": str(e)}), 500
+        return jsonify(
+            {
+                "success": True,
+                "ocr_status": document.ocr_status,
+                "status_url": url_for("scanner.ocr_status", document_id=doc_id),
+                "message": "Распознавание поставлено в очередь",
+            }
+        )
 
     except Exception as e:
-        document.ocr_status = "failed"
-        document.ocr_error = str(e)
-        db.session.commit()
-
+        db.session.rollback()
         logger.error(f"Ошибка при повторном OCR: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
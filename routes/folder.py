@@ -24,13 +24,10 @@ def list():
     folders = (
         Folder.query.filter_by(user_id=current_user.id).order_by(Folder.name).all()
     )
-    folders_with_count = []
-
-    for folder in folders:
-        doc_count = Document.query.filter_by(
-            folder_id=folder.id, is_archived=False
-        ).count()
-        folders_with_count.append({"folder": folder, "doc_count": doc_count})
+    folders_with_count = [
+        {"folder": folder, "doc_count": folder.active_document_count}
+        for folder in folders
+    ]
 
     return render_template("folders/list.html", folders=folders_with_count)
 
@@ -125,8 +122,9 @@ def view(folder_id):
     ).first_or_404()
 
     documents = (
-        Document.query.filter_by(folder_id=folder_id, is_archived=False)
-        .order_by(Document.upload_date.desc())
+        Document.query.options(Document.listing_options())
+        .filter_by(folder_id=folder_id, is_archived=False)
+        .order_by(Document.created_at.desc())
         .all()
     )
 
@@ -16,25 +16,71 @@ from flask import (
 )
 from flask_login import current_user
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
 import os
 import base64
 import logging
 from io import BytesIO
-from PIL import Image
 
 from models import db
 from models.folder import Folder
 from models.document import Document
 from utils.decorators import login_required
 from services.document_service import DocumentService
-from services.ocr_service import OCRService
-from services.pdf_service import PDFService
+from services.ocr_queue import OCRQueue
+from services.blob_store import BlobStore
+from services.upload_ingest import IngestFile
+from services.upload_sessions import UploadSessionService, UploadError
+from services.capture_sessions import (
+    CaptureSessionService,
+    CaptureError,
+    prepare_capture_image,
+)
 
 logger = logging.getLogger(__name__)
 
 scanner_bp = Blueprint("scanner", __name__, url_prefix="/scanner")
 
 
+def _create_document(
+    blob,
+    title,
+    original_filename,
+    file_extension,
+    mime_type=None,
+    description=None,
+    folder_id=None,
+    perform_ocr=True,
+):
+    """
+    Создает документ текущего пользователя для файла из хранилища
+    и ставит его в очередь OCR (если этот же файл еще не распознан).
+    Коммит выполняет вызывающий код.
+
+    Returns:
+        Document
+    """
+    document = Document(
+        user_id=current_user.id,
+        title=title,
+        description=description,
+        original_filename=original_filename,
+        file_extension=file_extension,
+        mime_type=mime_type,
+        folder_id=folder_id if folder_id else None,
+    )
+    BlobStore.attach(document, blob)
+
+    db.session.add(document)
+    db.session.flush()  # Получаем ID
+
+    # Распознавание выполняет фоновый обработчик
+    if perform_ocr and not OCRQueue.reuse_result(document):
+        OCRQueue.enqueue(document)
+
+    return document
+
+
 @scanner_bp.route("/")
 @login_required
 def index():
@@ -57,10 +103,15 @@ def upload():
         folders = (
             Folder.query.filter_by(user_id=current_user.id).order_by(Folder.name).all()
         )
-        return render_template("scanner/upload.html", folders=folders)
+        return render_template(
+            "scanner/upload.html",
+            folders=folders,
+            max_upload_size=current_app.config["UPLOAD_RESUMABLE_MAX_SIZE"],
+        )
 
     try:
-        # Проверяем файл
+        # Проверяем файл (при разборе запроса файл уже записан
+        # во временный файл, слишком большой или не того формата - отклонен)
         if "file" not in request.files:
             return jsonify({"success": False, "error": "Файл не выбран"}), 400
 
@@ -95,103 +146,20 @@ def upload():
                 400,
             )
 
-        # Создаем папки для пользователя
-        upload_folder = current_app.config["UPLOAD_FOLDER"]
-        user_folder = os.path.join(upload_folder, str(current_user.id))
-        os.makedirs(user_folder, exist_ok=True)
-
-        # Генерируем уникальное имя
-        from datetime import datetime
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename_str = f"{timestamp}_{filename}"
-        file_path = os.path.join(user_folder, safe_filename_str)
-
-        # Сохраняем файл
-        file.save(file_path)
-
-        # Получаем размер файла
-        file_size = os.path.getsize(file_path)
+        # Сохраняем файл в хранилище (одинаковые файлы хранятся один раз)
+        blob = BlobStore.store_upload(file, file_extension)
 
         # Создаем запись в БД
-        document = Document(
-            user_id=current_user.id,
+        document = _create_document(
+            blob,
             title=title,
             description=description,
             original_filename=filename,
-            file_path=file_path,
-            file_size=file_size,
             file_extension=file_extension,
             mime_type=file.content_type,
-            folder_id=folder_id if folder_id else None,
+            folder_id=folder_id,
+            perform_ocr=perform_ocr,
         )
-
-        db.session.add(document)
-        db.session.flush()  # Получаем ID
-
-        # Создаем миниатюру
-        thumbnail_folder = os.path.join(
-            current_app.config["THUMBNAIL_FOLDER"], str(current_user.id)
-        )
-        os.makedirs(thumbnail_folder, exist_ok=True)
-
-        thumbnail_filename = f"thumb_{document.id}.jpg"
-        thumbnail_path = os.path.join(thumbnail_folder, thumbnail_filename)
-
-        try:
-            if file_extension in [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"]:
-                # Для изображений
-                img = Image.open(file_path)
-                img.thumbnail(
-                    current_app.config["THUMBNAIL_SIZE"], Image.Resampling.LANCZOS
-                )
-                img.save(thumbnail_path, "JPEG", quality=85)
-
-                # ВАЖНО! Сохраняем относительный путь
-                document.thumbnail_path = os.path.join(
-                    str(current_user.id), thumbnail_filename
-                )
-
-            elif file_extension == ".pdf":
-                # Для PDF
-                thumb_path = PDFService.create_thumbnail(
-                    file_path, thumbnail_path, size=current_app.config["THUMBNAIL_SIZE"]
-                )
-                if thumb_path:
-                    document.thumbnail_path = os.path.join(
-                        str(current_user.id), thumbnail_filename
-                    )
-
-        except Exception as e:
-            logger.warning(f"Не удалось создать миниатюру: {e}")
-
-        # Запускаем OCR
-        if perform_ocr:
-            document.ocr_status = "processing"
-            db.session.commit()
-
-            try:
-                if file_extension == ".pdf":
-                    # PDF OCR
-                    text = PDFService.extract_text_from_pdf(file_path)
-                else:
-                    # Image OCR
-                    text = OCRService.extract_text(file_path)
-
-                if text and text.strip():
-                    document.ocr_text = text
-                    document.content = text
-                    document.ocr_status = "completed"
-                    logger.info(f"OCR завершен: {len(text)} символов")
-                else:
-                    document.ocr_status = "failed"
-                    document.ocr_error = "Текст не найден"
-
-            except Exception as e:
-                logger.error(f"Ошибка OCR: {e}")
-                document.ocr_status = "failed"
-                document.ocr_error = str(e)
-
         db.session.commit()
 
         logger.info(f"Документ {document.id} загружен пользователем {current_user.id}")
@@ -200,134 +168,537 @@ def upload():
             {
                 "success": True,
                 "document_id": document.id,
+                "ocr_status": document.ocr_status,
+                "status_url": url_for("scanner.ocr_status", document_id=document.id),
                 "redirect": url_for("documents.view_document", document_id=document.id),
             }
         )
 
+    except (RequestEntityTooLarge, UnsupportedMediaType) as e:
+        db.session.rollback()
+        logger.warning(f"Файл отклонен: {e.description}")
+        return jsonify({"success": False, "error": e.description}), e.code
+
     except Exception as e:
         db.session.rollback()
         logger.error(f"Ошибка загрузки: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _read_capture():
+    """
+    Читает снимок с камеры из запроса во временный файл хранилища.
+
+    Поддерживаются:
+        multipart/form-data - файл в поле image (пишется в хранилище
+            еще при разборе запроса, см. IngestRequest);
+        image/jpeg, image/png, application/octet-stream - байты снимка
+            в теле запроса;
+        application/json - поле image с base64 (старые клиенты).
+    Параметры (title, folder_id, auto_ocr) - в полях формы, строке
+    запроса или JSON.
+
+    Returns:
+        tuple: (IngestFile или None, параметры)
+    """
+    if request.is_json:
+        params = request.get_json(silent=True) or {}
+        image_data = params.get("image")
+        if not image_data:
+            return None, params
+
+        # Декодируем base64
+        if "base64," in image_data:
+            image_data = image_data.split("base64,")[1]
+        return BlobStore.write_temp(BytesIO(base64.b64decode(image_data))), params
+
+    params = request.values
+    if request.mimetype == "multipart/form-data":
+        file = request.files.get("image")
+        if file is None:
+            return None, params
+        if isinstance(file.stream, IngestFile):
+            file.stream.finish()
+            return file.stream, params
+        return BlobStore.write_temp(file.stream), params
+
+    temp = BlobStore.write_temp(
+        request.stream, max_size=current_app.config["UPLOAD_MAX_FILE_SIZE"]
+    )
+    if temp.size == 0:
+        temp.discard()
+        return None, params
+    return temp, params
+
+
 @scanner_bp.route("/capture", methods=["POST"])
 @login_required
 def capture():
-    """Обработка снимка с камеры"""
+    """
+    Обработка снимка с камеры.
+    Снимок передается байтами (multipart или тело запроса), см. _read_capture.
+    """
+    temp = None
     try:
-        # Получаем данные
-        image_data = request.json.get("image")
-        title = request.json.get("title", "Скан с камеры")
-
-        # ИСПРАВЛЕНО: убираем type=int
-        folder_id = request.json.get("folder_id")
-        if folder_id:
-            folder_id = int(folder_id)
-        else:
-            folder_id = None
-
-        perform_ocr = request.json.get("auto_ocr", True)
-
-        if not image_data:
+        temp, params = _read_capture()
+        if temp is None:
             return (
                 jsonify({"success": False, "error": "Изображение не предоставлено"}),
                 400,
             )
 
-        # ... остальной код без изменений ...
+        title = params.get("title") or "Скан с камеры"
 
-        # Декодируем base64
-        if "base64," in image_data:
-            image_data = image_data.split("base64,")[1]
-
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
+        # ИСПРАВЛЕНО: убираем type=int
+        folder_id = params.get("folder_id")
+        if folder_id:
+            folder_id = int(folder_id)
+        else:
+            folder_id = None
 
-        # Создаем папки
-        upload_folder = current_app.config["UPLOAD_FOLDER"]
-        user_folder = os.path.join(upload_folder, str(current_user.id))
-        os.makedirs(user_folder, exist_ok=True)
+        perform_ocr = params.get("auto_ocr", True)
+        if isinstance(perform_ocr, str):
+            perform_ocr = perform_ocr.lower() in ("1", "true", "on")
 
         # Генерируем имя файла
         from datetime import datetime
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"camera_{timestamp}.jpg"
-        file_path = os.path.join(user_folder, filename)
 
-        # Сохраняем
-        image.save(file_path, "JPEG", quality=85)
-        file_size = os.path.getsize(file_path)
+        # Сохраняем в хранилище (JPEG подходящего размера - без перекодирования)
+        blob = BlobStore.store_ingested(prepare_capture_image(temp), ".jpg")
 
         # Создаем документ
-        document = Document(
-            user_id=current_user.id,
+        document = _create_document(
+            blob,
             title=title,
             original_filename=filename,
-            file_path=file_path,
-            file_size=file_size,
             file_extension=".jpg",
             mime_type="image/jpeg",
-            folder_id=folder_id if folder_id else None,
+            folder_id=folder_id,
+            perform_ocr=perform_ocr,
         )
+        db.session.commit()
 
-        db.session.add(document)
-        db.session.flush()
+        logger.info(
+            f"Снимок с камеры сохранен: doc_id={document.id}, {blob.size} байт"
+        )
 
-        # Миниатюра
-        thumbnail_folder = os.path.join(
-            current_app.config["THUMBNAIL_FOLDER"], str(current_user.id)
+        return jsonify(
+            {
+                "success": True,
+                "document_id": document.id,
+                "ocr_status": document.ocr_status,
+                "status_url": url_for("scanner.ocr_status", document_id=document.id),
+                "redirect_url": url_for(
+                    "documents.view_document", document_id=document.id
+                ),
+            }
         )
-        os.makedirs(thumbnail_folder, exist_ok=True)
 
-        thumbnail_filename = f"thumb_{document.id}.jpg"
-        thumbnail_path = os.path.join(thumbnail_folder, thumbnail_filename)
+    except (RequestEntityTooLarge, UnsupportedMediaType) as e:
+        db.session.rollback()
+        logger.warning(f"Снимок отклонен: {e.description}")
+        return jsonify({"success": False, "error": e.description}), e.code
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Ошибка обработки снимка: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        # Временный файл, не перенесенный в хранилище, удаляется
+        if temp is not None:
+            temp.close()
+
+
+@scanner_bp.route("/uploads", methods=["POST"])
+@login_required
+def upload_init():
+    """
+    Начало загрузки по частям.
+
+    JSON или поля формы: filename, size, sha256 (необязательно), mime_type,
+    title, description, folder_id, auto_ocr
+    """
+    data = request.get_json(silent=True) if request.is_json else request.values
+    data = data or {}
+
+    size = data.get("size")
+    if isinstance(size, str):
+        size = int(size) if size.isdigit() else None
+
+    folder_id = data.get("folder_id")
+    try:
+        folder_id = int(folder_id) if folder_id else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Неверная папка"}), 400
+
+    auto_ocr = data.get("auto_ocr", True)
+    if isinstance(auto_ocr, str):
+        auto_ocr = auto_ocr.lower() in ("1", "true", "on")
+
+    filename = data.get("filename", "")
+    title = (data.get("title") or "").strip()
+    if not title:
+        title = os.path.splitext(secure_filename(filename))[0]
 
-        thumb_img = image.copy()
-        thumb_img.thumbnail(
-            current_app.config["THUMBNAIL_SIZE"], Image.Resampling.LANCZOS
+    try:
+        session = UploadSessionService.create(
+            current_user.id,
+            filename,
+            size,
+            mime_type=data.get("mime_type"),
+            sha256=data.get("sha256"),
+            title=title,
+            description=(data.get("description") or "").strip(),
+            folder_id=folder_id,
+            auto_ocr=auto_ocr,
         )
-        thumb_img.save(thumbnail_path, "JPEG", quality=85)
+    except UploadError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+
+    response = {"success": True, "chunk_size": current_app.config["UPLOAD_CHUNK_SIZE"]}
+    response.update(session.to_dict())
+    return jsonify(response), 201
+
+
+@scanner_bp.route("/uploads/<upload_id>", methods=["GET"])
+@login_required
+def upload_status(upload_id):
+    """Состояние загрузки по частям: сколько байтов уже принято"""
+    session = UploadSessionService.get(upload_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Загрузка не найдена"}), 404
 
-        # Сохраняем относительный путь
-        document.thumbnail_path = os.path.join(
-            "thumbnail", str(current_user.id), thumbnail_filename
+    response = {"success": True}
+    response.update(session.to_dict())
+    return jsonify(response)
+
+
+@scanner_bp.route("/uploads/<upload_id>", methods=["PUT"])
+@login_required
+def upload_chunk(upload_id):
+    """
+    Часть файла. Тело запроса - байты части.
+
+    Заголовки:
+        Upload-Offset: смещение части в файле
+        X-Chunk-SHA256: SHA-256 части (необязательно)
+    """
+    session = UploadSessionService.get(upload_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Загрузка не найдена"}), 404
+
+    offset = request.headers.get("Upload-Offset", type=int)
+    if offset is None:
+        return jsonify({"success": False, "error": "Не указано смещение"}), 400
+
+    try:
+        new_offset = UploadSessionService.write_chunk(
+            session,
+            offset,
+            request.stream,
+            checksum=request.headers.get("X-Chunk-SHA256"),
         )
+    except UploadError as e:
+        response = {"success": False, "error": e.message}
+        if e.offset is not None:
+            response["offset"] = e.offset
+        return jsonify(response), e.status
 
-        # OCR
-        if perform_ocr:
-            document.ocr_status = "processing"
-            db.session.commit()
+    return jsonify({"success": True, "upload_id": upload_id, "offset": new_offset})
 
+
+@scanner_bp.route("/uploads/<upload_id>/finalize", methods=["POST"])
+@login_required
+def upload_finalize(upload_id):
+    """Завершение загрузки по частям: файл переносится в хранилище, создается документ"""
+    session = UploadSessionService.get(upload_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Загрузка не найдена"}), 404
+
+    try:
+        blob = UploadSessionService.finish(session)
+
+        # Повторный запрос (ответ на первый не дошел) - тот же документ
+        if blob is None:
+            document = db.session.get(Document, session.document_id)
+            if document is None:
+                return jsonify({"success": False, "error": "Документ удален"}), 410
+        else:
             try:
-                text = OCRService.extract_text(file_path)
-                if text and text.strip():
-                    document.ocr_text = text
-                    document.content = text
-                    document.ocr_status = "completed"
-                else:
-                    document.ocr_status = "failed"
-                    document.ocr_error = "Текст не найден"
-            except Exception as e:
-                logger.error(f"Ошибка OCR: {e}")
-                document.ocr_status = "failed"
-                document.ocr_error = str(e)
+                document = _create_document(
+                    blob,
+                    title=session.title or session.filename,
+                    description=session.description,
+                    original_filename=session.filename,
+                    file_extension=session.file_extension,
+                    mime_type=session.mime_type,
+                    folder_id=session.folder_id,
+                    perform_ocr=session.auto_ocr,
+                )
+                UploadSessionService.complete(session, document.id)
+                db.session.commit()
+            except Exception:
+                # Сеанс снова активен - завершение можно повторить
+                db.session.rollback()
+                UploadSessionService.release(session)
+                raise
+
+            # Файл частей уже в хранилище - удаляем только после коммита
+            UploadSessionService.discard_part(session)
+
+            logger.info(
+                f"Документ {document.id} загружен по частям пользователем {current_user.id}"
+            )
 
-        db.session.commit()
+        return jsonify(
+            {
+                "success": True,
+                "document_id": document.id,
+                "ocr_status": document.ocr_status,
+                "status_url": url_for("scanner.ocr_status", document_id=document.id),
+                "redirect": url_for("documents.view_document", document_id=document.id),
+            }
+        )
+
+    except UploadError as e:
+        db.session.rollback()
+        response = {"success": False, "error": e.message}
+        if e.offset is not None:
+            response["offset"] = e.offset
+        return jsonify(response), e.status
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Ошибка завершения загрузки {upload_id}: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scanner_bp.route("/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def upload_cancel(upload_id):
+    """Отмена загрузки по частям"""
+    session = UploadSessionService.get(upload_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Загрузка не найдена"}), 404
+
+    UploadSessionService.cancel(session)
+    return jsonify({"success": True})
+
+
+@scanner_bp.route("/captures", methods=["POST"])
+@login_required
+def capture_init():
+    """
+    Начало многостраничной съемки.
+
+    JSON или поля формы: title, folder_id, auto_ocr
+    """
+    params = request.get_json(silent=True) if request.is_json else request.values
+    params = params or {}
+
+    folder_id = params.get("folder_id")
+    try:
+        folder_id = int(folder_id) if folder_id else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Неверная папка"}), 400
+
+    auto_ocr = params.get("auto_ocr", True)
+    if isinstance(auto_ocr, str):
+        auto_ocr = auto_ocr.lower() in ("1", "true", "on")
+
+    session = CaptureSessionService.create(
+        current_user.id,
+        title=(params.get("title") or "").strip(),
+        folder_id=folder_id,
+        auto_ocr=bool(auto_ocr),
+    )
+
+    response = {"success": True}
+    response.update(session.to_dict())
+    return jsonify(response), 201
+
+
+@scanner_bp.route("/captures/<capture_id>", methods=["GET"])
+@login_required
+def capture_status(capture_id):
+    """Состояние съемки: страницы и ход распознавания"""
+    session = CaptureSessionService.get(capture_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Съемка не найдена"}), 404
+
+    response = {
+        "success": True,
+        "pages_done": session.document.ocr_pages_done,
+        "pages_failed": CaptureSessionService.failed_page_count(session),
+    }
+    response.update(session.to_dict())
+    return jsonify(response)
+
+
+@scanner_bp.route("/captures/<capture_id>/pages", methods=["POST"])
+@login_required
+def capture_page(capture_id):
+    """
+    Снимок очередной страницы (как в /scanner/capture: файл image
+    в multipart или байты изображения в теле запроса).
+    """
+    session = CaptureSessionService.get(capture_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Съемка не найдена"}), 404
+
+    temp = None
+    try:
+        temp, _ = _read_capture()
+        if temp is None:
+            return (
+                jsonify({"success": False, "error": "Изображение не предоставлено"}),
+                400,
+            )
 
-        logger.info(f"Снимок с камеры сохранен: doc_id={document.id}")
+        page_number = CaptureSessionService.add_page(session, temp)
+
+        return jsonify(
+            {
+                "success": True,
+                "capture_id": capture_id,
+                "page_number": page_number + 1,
+                "page_count": session.page_count,
+            }
+        )
+
+    except CaptureError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+
+    except (RequestEntityTooLarge, UnsupportedMediaType) as e:
+        logger.warning(f"Снимок отклонен: {e.description}")
+        return jsonify({"success": False, "error": e.description}), e.code
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Ошибка добавления страницы в съемку {capture_id}: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    finally:
+        if temp is not None:
+            temp.close()
+
+
+@scanner_bp.route("/captures/<capture_id>/finish", methods=["POST"])
+@login_required
+def capture_finish(capture_id):
+    """
+    Конец съемки. Страницы к этому моменту обычно уже распознаны;
+    оставшиеся дораспознаются в фоне (см. ocr_status).
+    """
+    session = CaptureSessionService.get(capture_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Съемка не найдена"}), 404
+
+    try:
+        document = CaptureSessionService.finish(session)
 
         return jsonify(
             {
                 "success": True,
                 "document_id": document.id,
+                "page_count": document.page_count,
+                "ocr_status": document.ocr_status,
+                "status_url": url_for("scanner.ocr_status", document_id=document.id),
                 "redirect_url": url_for(
                     "documents.view_document", document_id=document.id
                 ),
             }
         )
 
+    except CaptureError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+
     except Exception as e:
         db.session.rollback()
-        logger.error(f"Ошибка обработки снимка: {e}")
+        logger.error(f"Ошибка завершения съемки {capture_id}: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+@scanner_bp.route("/captures/<capture_id>", methods=["DELETE"])
+@login_required
+def capture_cancel(capture_id):
+    """Отмена съемки (документ удаляется)"""
+    session = CaptureSessionService.get(capture_id, current_user.id)
+    if session is None:
+        return jsonify({"success": False, "error": "Съемка не найдена"}), 404
+
+    try:
+        CaptureSessionService.cancel(session)
+    except CaptureError as e:
+        return jsonify({"success": False, "error": e.message}), e.status
+
+    return jsonify({"success": True})
+
+
+@scanner_bp.route("/ocr_status/<int:document_id>")
+@login_required
+def ocr_status(document_id):
+    """Статус распознавания документа (для опроса со страницы)"""
+    document = Document.query.filter_by(
+        id=document_id, user_id=current_user.id
+    ).first()
+
+    if not document:
+        return jsonify({"success": False, "error": "Документ не найден"}), 404
+
+    job = OCRQueue.get_active_job(document.id)
+
+    response = {
+        "success": True,
+        "document_id": document.id,
+        "ocr_status": document.ocr_status,
+        "ocr_error": document.ocr_error,
+        "pages_done": document.ocr_pages_done,
+        "page_count": document.page_count,
+        "queued": job is not None,
+    }
+
+    # Текст отдается только по запросу (нужен редактору после повторного OCR)
+    if document.ocr_status == "completed" and request.args.get("include_text"):
+        response["text"] = document.ocr_text
+
+    return jsonify(response)
+
+
+@scanner_bp.route("/ocr_layout/<int:document_id>")
+@login_required
+def ocr_layout(document_id):
+    """
+    Разметка распознанного текста: слова с рамками и уверенностью.
+    ?page=N - только одна страница (с 0), ?q=текст - только найденные слова
+    (для подсветки результатов поиска)
+    """
+    document = Document.query.filter_by(
+        id=document_id, user_id=current_user.id
+    ).first()
+
+    if not document:
+        return jsonify({"success": False, "error": "Документ не найден"}), 404
+
+    layout = document.get_ocr_layout()
+    if layout is None:
+        return jsonify({"success": False, "error": "Разметка не найдена"}), 404
+
+    query = request.args.get("q", "").strip()
+    if query:
+        return jsonify(
+            {
+                "success": True,
+                "document_id": document.id,
+                "matches": layout.find(query),
+            }
+        )
+
+    page = request.args.get("page", type=int)
+    response = {"success": True, "document_id": document.id}
+    response.update(layout.to_dict(page))
+    return jsonify(response)
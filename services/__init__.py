@@ -2,18 +2,33 @@
 """
 Инициализация модуля сервисов.
 Сервисы содержат бизнес-логику приложения.
+
+Сервисы импортируются при первом обращении (PEP 562): многие из них
+тянут тяжелые библиотеки (OpenCV, PyMuPDF, NumPy, EasyOCR/torch),
+которые не нужны для запуска приложения.
 """
 
-from services.ocr_service import OCRService
-from services.document_service import DocumentService
-from services.image_processor import ImageProcessor
-from services.pdf_service import PDFService
-from services.export_service import ExportService
+import importlib
+
+# Имя сервиса -> модуль, в котором он определен
+_SERVICES = {
+    "OCRService": "services.ocr_service",
+    "DocumentService": "services.document_service",
+    "ImageProcessor": "services.image_processor",
+    "PDFService": "services.pdf_service",
+    "ExportService": "services.export_service",
+    "OCRQueue": "services.ocr_queue",
+}
+
+__all__ = list(_SERVICES)
+
+
+def __getattr__(name):
+    """Импортирует сервис при первом обращении к нему."""
+    module_name = _SERVICES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = [
-    "OCRService",
-    "DocumentService",
-    "ImageProcessor",
-    "PDFService",
-    "ExportService",
-]
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
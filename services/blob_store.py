@@ -0,0 +1,474 @@
+# services/blob_store.py
+"""
+Хранилище файлов по содержимому.
+Загруженный файл записывается во временный файл с одновременным
+вычислением SHA-256 (services/upload_ingest.py), затем переименовывается
+в BLOB_FOLDER/ab/cd/<sha256>.ext.
+Одинаковые файлы хранятся один раз: повторная загрузка только удаляет
+временный файл, а документ получает тот же путь, миниатюру и (см.
+OCRQueue.reuse_result) готовый результат OCR.
+
+Документ ссылается на файл через Document.content_hash. Количество
+ссылок (Blob.ref_count) обновляется событиями модели Document в той же
+транзакции; файл и миниатюра удаляются после коммита, когда ссылок
+не остается. Файлы без записи в базе (после сбоев) удаляет
+команда flask gc-blobs.
+"""
+
+import os
+import time
+import logging
+from typing import Optional
+
+from flask import current_app
+from PIL import Image
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session, object_session
+
+from models import db
+from models.blob import Blob
+from models.document import Document, track_previous_values
+from services.upload_ingest import IngestFile
+
+logger = logging.getLogger(__name__)
+
+# Папка временных файлов внутри BLOB_FOLDER (та же файловая система,
+# поэтому переименование в хранилище атомарно)
+TEMP_DIR = "tmp"
+
+# Временные файлы старше (сек) считаются брошенными (flask gc-blobs)
+TEMP_MAX_AGE = 60 * 60
+
+# Ключ session.info со списком (sha256, файлы), удаляемых после коммита
+_PENDING_REMOVAL = "blob_files_to_remove"
+
+# Расширения изображений, для которых миниатюра создается через PIL
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "bmp", "tiff"}
+
+
+def _shard(sha256: str) -> str:
+    """Подпапка файла: два уровня по первым байтам хэша."""
+    return os.path.join(sha256[:2], sha256[2:4])
+
+
+class BlobStore:
+    """Хранилище файлов с дедупликацией по SHA-256"""
+
+    # === ПУТИ ===
+
+    @staticmethod
+    def folder() -> str:
+        """Корневая папка хранилища."""
+        return current_app.config["BLOB_FOLDER"]
+
+    @staticmethod
+    def path_for(blob: Blob) -> str:
+        """
+        Возвращает путь к файлу хранилища.
+
+        Args:
+            blob: файл хранилища
+
+        Returns:
+            str: путь (его же получает Document.file_path)
+        """
+        return os.path.join(BlobStore.folder(), blob.storage_path)
+
+    @staticmethod
+    def thumbnail_url_path(blob: Blob) -> Optional[str]:
+        """
+        Возвращает путь миниатюры для Document.thumbnail_path
+        (раздается маршрутом /thumbnails/).
+
+        Args:
+            blob: файл хранилища
+
+        Returns:
+            str или None, если миниатюры нет
+        """
+        if not blob.thumbnail_path:
+            return None
+        return "thumbnails/" + blob.thumbnail_path.replace(os.sep, "/")
+
+    # === ЗАПИСЬ ===
+
+    @staticmethod
+    def temp_folder() -> str:
+        """Папка временных файлов загрузок."""
+        return os.path.join(BlobStore.folder(), TEMP_DIR)
+
+    @staticmethod
+    def write_temp(stream, max_size: Optional[int] = None) -> IngestFile:
+        """
+        Записывает поток во временный файл, вычисляя SHA-256.
+
+        Args:
+            stream: поток с методом read (например, BytesIO)
+            max_size: максимальный размер в байтах (None - без ограничения)
+
+        Returns:
+            IngestFile: закрытый временный файл (name, hexdigest(), size)
+
+        Raises:
+            RequestEntityTooLarge: поток больше max_size
+        """
+        chunk_size = current_app.config["BLOB_CHUNK_SIZE"]
+
+        temp = IngestFile(BlobStore.temp_folder(), max_size=max_size)
+        try:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                temp.write(chunk)
+            temp.finish()
+        except Exception:
+            temp.discard()
+            raise
+
+        return temp
+
+    @staticmethod
+    def add_file(temp_path: str, sha256: str, size: int, extension: str) -> Blob:
+        """
+        Помещает временный файл в хранилище. Если такой файл уже есть,
+        временный файл удаляется. Ссылку на файл создает документ
+        с content_hash = sha256 (коммит выполняет вызывающий код).
+
+        Args:
+            temp_path: путь к временному файлу
+            sha256: хэш содержимого
+            size: размер в байтах
+            extension: расширение файла (с точкой или без)
+
+        Returns:
+            Blob
+        """
+        blob = Blob.query.filter_by(sha256=sha256).first()
+        if blob is not None and os.path.exists(BlobStore.path_for(blob)):
+            os.remove(temp_path)
+            logger.info(f"Файл уже есть в хранилище: {sha256[:12]}")
+            return blob
+
+        extension = extension.lower().lstrip(".")
+        storage_path = os.path.join(_shard(sha256), f"{sha256}.{extension}")
+        if blob is not None:
+            # Запись есть, а файл потерян - восстанавливаем его
+            storage_path = blob.storage_path
+
+        full_path = os.path.join(BlobStore.folder(), storage_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(temp_path, full_path)
+
+        if blob is not None:
+            return blob
+
+        # Параллельная загрузка того же файла могла уже создать запись
+        values = {"sha256": sha256, "size": size, "storage_path": storage_path}
+        connection = db.session.connection()
+        dialect_name = connection.dialect.name
+        if dialect_name in ("sqlite", "postgresql"):
+            if dialect_name == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            connection.execute(
+                insert(Blob.__table__)
+                .values(ref_count=0, **values)
+                .on_conflict_do_nothing(index_elements=["sha256"])
+            )
+            blob = Blob.query.filter_by(sha256=sha256).one()
+        else:
+            blob = Blob(**values)
+            db.session.add(blob)
+            db.session.flush()
+
+        logger.info(f"Файл добавлен в хранилище: {storage_path}")
+        return blob
+
+    @staticmethod
+    def store(stream, extension: str) -> Blob:
+        """
+        Записывает поток в хранилище.
+
+        Args:
+            stream: поток с методом read
+            extension: расширение файла
+
+        Returns:
+            Blob
+        """
+        return BlobStore.store_ingested(BlobStore.write_temp(stream), extension)
+
+    @staticmethod
+    def store_upload(file, extension: str) -> Blob:
+        """
+        Помещает загруженный файл в хранилище. Файл, принятый IngestRequest,
+        уже записан во временный файл и только переименовывается.
+
+        Args:
+            file: файл из запроса (werkzeug FileStorage)
+            extension: расширение файла
+
+        Returns:
+            Blob
+
+        Raises:
+            UnsupportedMediaType: содержимое не соответствует расширению
+        """
+        if isinstance(file.stream, IngestFile):
+            file.stream.finish()
+            return BlobStore.store_ingested(file.stream, extension)
+        return BlobStore.store(file.stream, extension)
+
+    @staticmethod
+    def store_ingested(temp: IngestFile, extension: str) -> Blob:
+        """
+        Переносит записанный временный файл в хранилище.
+
+        Args:
+            temp: закрытый временный файл
+            extension: расширение файла
+
+        Returns:
+            Blob
+        """
+        temp.claim()
+        return BlobStore.add_file(temp.name, temp.hexdigest(), temp.size, extension)
+
+    @staticmethod
+    def attach(document: Document, blob: Blob):
+        """
+        Связывает документ с файлом хранилища: путь, размер, хэш
+        и миниатюра (создается один раз на файл).
+
+        Args:
+            document: документ (еще не сохраненный или без файла)
+            blob: файл хранилища
+        """
+        document.content_hash = blob.sha256
+        document.file_path = BlobStore.path_for(blob)
+        document.file_size = blob.size
+
+        try:
+            BlobStore.ensure_thumbnail(blob, document.file_extension)
+        except Exception as e:
+            logger.warning(f"Не удалось создать миниатюру: {e}")
+
+        document.thumbnail_path = BlobStore.thumbnail_url_path(blob)
+
+    @staticmethod
+    def ensure_thumbnail(blob: Blob, extension: str) -> Optional[str]:
+        """
+        Создает миниатюру файла, если ее еще нет.
+
+        Args:
+            blob: файл хранилища
+            extension: расширение файла
+
+        Returns:
+            str: путь миниатюры относительно THUMBNAIL_FOLDER или None
+        """
+        thumbnail_folder = current_app.config["THUMBNAIL_FOLDER"]
+        if blob.thumbnail_path and os.path.exists(
+            os.path.join(thumbnail_folder, blob.thumbnail_path)
+        ):
+            return blob.thumbnail_path
+
+        relative_path = os.path.join("blobs", _shard(blob.sha256), f"{blob.sha256}.jpg")
+        thumbnail_path = os.path.join(thumbnail_folder, relative_path)
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+
+        size = current_app.config["THUMBNAIL_SIZE"]
+        extension = extension.lower().lstrip(".")
+
+        if extension in IMAGE_EXTENSIONS:
+            with Image.open(BlobStore.path_for(blob)) as img:
+                img.thumbnail(size, Image.Resampling.LANCZOS)
+                img.convert("RGB").save(thumbnail_path, "JPEG", quality=85)
+        elif extension == "pdf":
+            from services.pdf_service import PDFService
+
+            if not PDFService.create_thumbnail(
+                BlobStore.path_for(blob), thumbnail_path, size=size
+            ):
+                return None
+        else:
+            return None
+
+        blob.thumbnail_path = relative_path
+        return relative_path
+
+    # === ОБСЛУЖИВАНИЕ ===
+
+    @staticmethod
+    def collect_garbage() -> dict:
+        """
+        Удаляет записи без ссылок, файлы без записей и старые временные файлы.
+
+        Returns:
+            dict: количество удаленных записей и файлов
+        """
+        removed = {"blobs": 0, "files": 0}
+
+        for blob in Blob.query.filter(Blob.ref_count <= 0).all():
+            _remove_files(_blob_files(blob.storage_path, blob.thumbnail_path))
+            db.session.delete(blob)
+            removed["blobs"] += 1
+        db.session.commit()
+
+        known = {
+            os.path.normpath(path)
+            for (path,) in db.session.query(Blob.storage_path).all()
+        }
+        root = BlobStore.folder()
+        temp_folder = BlobStore.temp_folder()
+        now = time.time()
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if dirpath == temp_folder:
+                    # Загрузка может быть еще в процессе
+                    if now - os.path.getmtime(path) < TEMP_MAX_AGE:
+                        continue
+                elif os.path.normpath(os.path.relpath(path, root)) in known:
+                    continue
+                os.remove(path)
+                removed["files"] += 1
+
+        logger.info(f"Очистка хранилища: {removed}")
+        return removed
+
+
+def _blob_files(storage_path: str, thumbnail_path: Optional[str]) -> list:
+    """Пути файла хранилища и его миниатюры."""
+    files = [os.path.join(current_app.config["BLOB_FOLDER"], storage_path)]
+    if thumbnail_path:
+        files.append(
+            os.path.join(current_app.config["THUMBNAIL_FOLDER"], thumbnail_path)
+        )
+    return files
+
+
+def _remove_files(paths: list):
+    """Удаляет файлы, пропуская уже удаленные."""
+    for path in paths:
+        try:
+            os.remove(path)
+            logger.info(f"Удален файл хранилища: {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Не удалось удалить файл {path}: {e}")
+
+
+def _add(connection, sha256: str):
+    """
+    Увеличивает количество ссылок на файл.
+
+    Raises:
+        RuntimeError: запись файла удалена параллельной транзакцией
+            (последняя ссылка снята) - документ не сохраняется
+    """
+    result = connection.execute(
+        text("UPDATE blobs SET ref_count = ref_count + 1 WHERE sha256 = :sha256"),
+        {"sha256": sha256},
+    )
+    if result.rowcount == 0:
+        raise RuntimeError(
+            f"Файл хранилища {sha256[:12]} удален, повторите загрузку"
+        )
+
+
+def _release(connection, sha256: str, document: Document):
+    """
+    Снимает ссылку документа на файл. Запись файла без ссылок удаляется
+    в той же транзакции, сами файлы - после коммита.
+    """
+    params = {"sha256": sha256}
+    connection.execute(
+        text("UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = :sha256"),
+        params,
+    )
+    row = connection.execute(
+        text(
+            "SELECT storage_path, thumbnail_path FROM blobs "
+            "WHERE sha256 = :sha256 AND ref_count <= 0"
+        ),
+        params,
+    ).first()
+    if row is None:
+        return
+
+    # Ссылка могла появиться после SELECT - удаляем только запись без ссылок
+    deleted = connection.execute(
+        text("DELETE FROM blobs WHERE sha256 = :sha256 AND ref_count <= 0"), params
+    )
+    if deleted.rowcount == 0:
+        return
+
+    session = object_session(document)
+    if session is not None:
+        session.info.setdefault(_PENDING_REMOVAL, []).append(
+            (sha256, _blob_files(row.storage_path, row.thumbnail_path))
+        )
+
+
+# Без прежнего content_hash ссылка на прежний файл не снималась бы
+track_previous_values()
+
+
+@event.listens_for(Document, "after_insert")
+def _add_reference(mapper, connection, document):
+    """Учитывает ссылку нового документа на файл."""
+    if document.content_hash:
+        _add(connection, document.content_hash)
+
+
+@event.listens_for(Document, "after_update")
+def _move_reference(mapper, connection, document):
+    """
+    Документ получил другой файл (например, собранный PDF многостраничной
+    съемки): ссылка переносится со старого файла на новый.
+    """
+    history = inspect(document).attrs.content_hash.history
+    if not history.has_changes():
+        return
+
+    for sha256 in history.deleted:
+        if sha256:
+            _release(connection, sha256, document)
+    if document.content_hash:
+        _add(connection, document.content_hash)
+
+
+@event.listens_for(Document, "after_delete")
+def _release_reference(mapper, connection, document):
+    """Снимает ссылку удаленного документа."""
+    if document.content_hash:
+        _release(connection, document.content_hash, document)
+
+
+@event.listens_for(Session, "after_commit")
+def _remove_released_files(session):
+    """
+    Удаляет файлы, на которые больше нет ссылок. Если тот же файл уже
+    загружен заново (запись с этим хэшем снова есть), файлы остаются.
+    """
+    released = session.info.pop(_PENDING_REMOVAL, None)
+    if not released:
+        return
+
+    with db.engine.connect() as connection:
+        for sha256, paths in released:
+            restored = connection.execute(
+                text("SELECT 1 FROM blobs WHERE sha256 = :sha256"),
+                {"sha256": sha256},
+            ).first()
+            if restored is None:
+                _remove_files(paths)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _keep_released_files(session, previous_transaction):
+    """Откат транзакции: файлы остаются."""
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING_REMOVAL, None)
@@ -0,0 +1,616 @@
+# services/capture_sessions.py
+"""
+Многостраничная съемка камерой.
+
+Протокол (маршруты в routes/scanner.py):
+    POST   /scanner/captures                 - начать съемку (название, папка)
+    POST   /scanner/captures/<id>/pages      - добавить снимок страницы
+    GET    /scanner/captures/<id>            - состояние съемки
+    POST   /scanner/captures/<id>/finish     - закончить съемку
+    DELETE /scanner/captures/<id>            - отменить
+
+Документ создается при начале съемки. Каждый снимок сразу дописывается
+в PDF документа (инкрементальное сохранение PyMuPDF - дописываются только
+новые объекты, JPEG вставляется без перекодирования) и ставится в очередь
+OCR отдельным заданием страницы (OCRJob.page_number). Результат страницы
+сохраняется рядом со снимком в CAPTURE_FOLDER/<id>/. Когда съемка закончена
+и все страницы распознаны, текст и разметка страниц собираются в документ,
+а PDF переносится в хранилище (BlobStore).
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from io import BytesIO
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from PIL import Image
+from werkzeug.exceptions import UnsupportedMediaType
+
+from models import db
+from models.document import Document
+from models.ocr_job import OCRJob
+from models.capture_session import CaptureSession
+from services.blob_store import BlobStore
+from services.upload_ingest import IngestFile
+
+logger = logging.getLogger(__name__)
+
+# Форматы снимков с камеры (см. services/upload_ingest.FILE_SIGNATURES)
+CAPTURE_FILE_TYPES = ("jpg", "png")
+
+
+def prepare_capture_image(temp: IngestFile) -> IngestFile:
+    """
+    Приводит снимок к JPEG не больше IMAGE_MAX_SIZE. JPEG подходящего
+    размера возвращается как есть; остальные уменьшаются и перекодируются.
+
+    Args:
+        temp: временный файл со снимком
+
+    Returns:
+        IngestFile: временный файл с JPEG (тот же или новый)
+
+    Raises:
+        UnsupportedMediaType: содержимое не является изображением
+    """
+    if temp.file_type not in CAPTURE_FILE_TYPES:
+        raise UnsupportedMediaType("Снимок должен быть изображением JPEG или PNG")
+
+    max_size = current_app.config["IMAGE_MAX_SIZE"]
+
+    with Image.open(temp.name) as image:
+        if (
+            image.format == "JPEG"
+            and image.width <= max_size[0]
+            and image.height <= max_size[1]
+        ):
+            return temp
+
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft("RGB", max_size)
+        image.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+        buffer = BytesIO()
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=current_app.config["JPEG_QUALITY"]
+        )
+
+    temp.discard()
+    buffer.seek(0)
+    return BlobStore.write_temp(buffer)
+
+
+class CaptureError(Exception):
+    """
+    Ошибка многостраничной съемки.
+
+    Attributes:
+        status: HTTP статус ответа
+    """
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class CaptureSessionService:
+    """Сервис многостраничной съемки"""
+
+    # === ПУТИ ===
+
+    @staticmethod
+    def folder(session: CaptureSession) -> str:
+        """Папка снимков и результатов OCR страниц сеанса."""
+        return os.path.join(current_app.config["CAPTURE_FOLDER"], session.id)
+
+    @staticmethod
+    def pdf_path(session: CaptureSession) -> str:
+        """Путь к собираемому PDF."""
+        return os.path.join(CaptureSessionService.folder(session), "document.pdf")
+
+    @staticmethod
+    def page_image_path(session: CaptureSession, page_number: int) -> str:
+        """Путь к снимку страницы."""
+        return os.path.join(
+            CaptureSessionService.folder(session), f"{page_number:04d}.jpg"
+        )
+
+    @staticmethod
+    def page_result_path(session: CaptureSession, page_number: int) -> str:
+        """Путь к результату OCR страницы (текст и разметка, JSON)."""
+        return os.path.join(
+            CaptureSessionService.folder(session), f"{page_number:04d}.json"
+        )
+
+    @staticmethod
+    def _extend(session: CaptureSession):
+        """Продлевает срок сеанса."""
+        session.expires_at = datetime.utcnow() + timedelta(
+            seconds=current_app.config["CAPTURE_SESSION_TTL"]
+        )
+
+    # === СЪЕМКА ===
+
+    @staticmethod
+    def create(
+        user_id: int,
+        title: Optional[str] = None,
+        folder_id: Optional[int] = None,
+        auto_ocr: bool = True,
+    ) -> CaptureSession:
+        """
+        Начинает съемку: создает документ и сеанс.
+
+        Args:
+            user_id: ID пользователя
+            title: название документа
+            folder_id: папка документа
+            auto_ocr: распознавать страницы
+
+        Returns:
+            CaptureSession
+        """
+        session = CaptureSession(id=uuid.uuid4().hex, user_id=user_id, auto_ocr=auto_ocr)
+        CaptureSessionService._extend(session)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        document = Document(
+            user_id=user_id,
+            title=title or "Скан с камеры",
+            original_filename=f"camera_{timestamp}.pdf",
+            file_path=CaptureSessionService.pdf_path(session),
+            file_extension=".pdf",
+            mime_type="application/pdf",
+            folder_id=folder_id if folder_id else None,
+            page_count=0,
+            ocr_status="processing" if auto_ocr else "pending",
+        )
+        db.session.add(document)
+        db.session.flush()  # Получаем ID
+
+        session.document_id = document.id
+        db.session.add(session)
+
+        os.makedirs(CaptureSessionService.folder(session), exist_ok=True)
+        db.session.commit()
+
+        logger.info(f"Съемка начата: {session.id}, doc_id={document.id}")
+        return session
+
+    @staticmethod
+    def get(capture_id: str, user_id: int) -> Optional[CaptureSession]:
+        """
+        Возвращает сеанс пользователя, если он не истек.
+
+        Args:
+            capture_id: ID сеанса
+            user_id: ID пользователя
+
+        Returns:
+            CaptureSession или None
+        """
+        session = CaptureSession.query.filter_by(id=capture_id, user_id=user_id).first()
+        if session is None or session.is_expired():
+            return None
+        return session
+
+    @staticmethod
+    def add_page(session: CaptureSession, temp: IngestFile) -> int:
+        """
+        Добавляет снимок страницы в PDF и ставит страницу в очередь OCR.
+
+        Args:
+            session: активный сеанс
+            temp: временный файл со снимком (JPEG или PNG)
+
+        Returns:
+            int: номер добавленной страницы (с 0)
+
+        Raises:
+            CaptureError: съемка завершена, страница уже добавляется
+                или страниц слишком много
+            UnsupportedMediaType: снимок не является изображением
+        """
+        from services.ocr_queue import OCRQueue
+
+        if session.status in ("finishing", "completed"):
+            raise CaptureError("Съемка уже завершена", status=409)
+
+        max_pages = current_app.config["CAPTURE_MAX_PAGES"]
+        if session.page_count >= max_pages:
+            raise CaptureError(f"Не больше {max_pages} страниц", status=413)
+
+        # Страницы дописываются в PDF по одной: сеанс захватывается
+        # условным UPDATE, параллельный запрос получит 409
+        page_number = session.page_count
+        claimed = CaptureSession.query.filter_by(
+            id=session.id, status="active", page_count=page_number
+        ).update({"status": "appending"})
+        db.session.commit()
+
+        if not claimed:
+            raise CaptureError("Предыдущая страница еще добавляется", status=409)
+
+        image_path = CaptureSessionService.page_image_path(session, page_number)
+        try:
+            image = prepare_capture_image(temp)
+            os.replace(image.name, image_path)
+            image.claim()
+
+            CaptureSessionService._append_pdf_page(session, image_path)
+
+        except Exception:
+            db.session.rollback()
+            if os.path.exists(image_path):
+                os.remove(image_path)
+            CaptureSession.query.filter_by(id=session.id, status="appending").update(
+                {"status": "active"}
+            )
+            db.session.commit()
+            raise
+
+        document = session.document
+        document.page_count = page_number + 1
+        document.file_size = os.path.getsize(CaptureSessionService.pdf_path(session))
+
+        session.status = "active"
+        session.page_count = page_number + 1
+        CaptureSessionService._extend(session)
+
+        if session.auto_ocr:
+            OCRQueue.enqueue_page(document, page_number)
+
+        db.session.commit()
+
+        logger.info(f"Страница {page_number + 1} добавлена в съемку {session.id}")
+        return page_number
+
+    @staticmethod
+    def _append_pdf_page(session: CaptureSession, image_path: str):
+        """
+        Дописывает страницу со снимком в PDF. Первая страница создает файл,
+        следующие сохраняются инкрементально (в конец файла).
+
+        Args:
+            session: сеанс
+            image_path: путь к JPEG снимку
+        """
+        import fitz  # PyMuPDF
+
+        with Image.open(image_path) as image:
+            width, height = image.size
+
+        scale = 72 / current_app.config["CAPTURE_PAGE_DPI"]
+        rect = fitz.Rect(0, 0, width * scale, height * scale)
+
+        path = CaptureSessionService.pdf_path(session)
+        incremental = os.path.exists(path)
+        pdf = fitz.open(path) if incremental else fitz.open()
+
+        try:
+            page = pdf.new_page(width=rect.width, height=rect.height)
+            page.insert_image(rect, filename=image_path)
+
+            if incremental:
+                pdf.saveIncr()
+            else:
+                pdf.save(path)
+        finally:
+            pdf.close()
+
+    # === РАСПОЗНАВАНИЕ СТРАНИЦ ===
+
+    @staticmethod
+    def recognize_page(document_id: int, page_number: int) -> str:
+        """
+        Распознает снимок страницы и сохраняет текст и разметку страницы
+        (в точках PDF) рядом со снимком. Выполняется обработчиком очереди
+        OCR (OCRQueue.run_page_job).
+
+        Args:
+            document_id: ID документа съемки
+            page_number: номер страницы (с 0)
+
+        Returns:
+            str: распознанный текст страницы
+
+        Raises:
+            FileNotFoundError: сеанс или снимок не найден
+        """
+        from services.ocr_layout import make_layout_page
+        from services.ocr_service import OCRService
+
+        session = CaptureSession.query.filter_by(document_id=document_id).first()
+        if session is None:
+            raise FileNotFoundError("Съемка не найдена")
+
+        image_path = CaptureSessionService.page_image_path(session, page_number)
+        if not os.path.exists(image_path):
+            raise FileNotFoundError("Снимок страницы не найден")
+
+        result = OCRService.recognize(image_path)
+        with Image.open(image_path) as image:
+            width, height = image.size
+
+        scale = 72 / current_app.config["CAPTURE_PAGE_DPI"]
+        page = make_layout_page(
+            width * scale,
+            height * scale,
+            result["words"],
+            result["boxes"],
+            result["confidences"],
+            scale=scale,
+        )
+
+        path = CaptureSessionService.page_result_path(session, page_number)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"text": result["text"], "layout": page}, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+        return result["text"]
+
+    # === ЗАВЕРШЕНИЕ ===
+
+    @staticmethod
+    def finish(session: CaptureSession) -> Document:
+        """
+        Заканчивает съемку: PDF переносится в хранилище, текст страниц
+        собирается в документ сразу или после распознавания последней
+        страницы. Повторный вызов возвращает тот же документ.
+
+        Args:
+            session: сеанс
+
+        Returns:
+            Document
+
+        Raises:
+            CaptureError: нет страниц или страница еще добавляется
+        """
+        if session.status in ("finishing", "completed"):
+            return session.document
+        if session.page_count == 0:
+            raise CaptureError("Не снято ни одной страницы")
+
+        claimed = CaptureSession.query.filter_by(
+            id=session.id, status="active"
+        ).update({"status": "finishing"})
+        if not claimed:
+            db.session.rollback()
+            db.session.refresh(session)
+            if session.status in ("finishing", "completed"):
+                return session.document
+            raise CaptureError("Страница еще добавляется", status=409)
+
+        try:
+            document = session.document
+            path = CaptureSessionService.pdf_path(session)
+
+            chunk_size = current_app.config["BLOB_CHUNK_SIZE"]
+            digest = hashlib.sha256()
+            with open(path, "rb") as pdf:
+                for data in iter(lambda: pdf.read(chunk_size), b""):
+                    digest.update(data)
+
+            # Хранилище забирает или удаляет переданный файл еще до коммита,
+            # поэтому передаем ему жесткую ссылку (или копию) - PDF сеанса
+            # остается, пока завершение не закоммичено, и съемку можно
+            # продолжить, если оно не удалось
+            temp_path = os.path.join(
+                BlobStore.temp_folder(), f"capture_{session.id}_{uuid.uuid4().hex}"
+            )
+            os.makedirs(BlobStore.temp_folder(), exist_ok=True)
+            try:
+                os.link(path, temp_path)
+            except OSError:
+                shutil.copyfile(path, temp_path)
+
+            try:
+                blob = BlobStore.add_file(
+                    temp_path, digest.hexdigest(), os.path.getsize(path), ".pdf"
+                )
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            BlobStore.attach(document, blob)
+            CaptureSessionService._extend(session)
+            db.session.commit()
+
+        except Exception:
+            db.session.rollback()
+            CaptureSession.query.filter_by(id=session.id, status="finishing").update(
+                {"status": "active"}
+            )
+            db.session.commit()
+            raise
+
+        if os.path.exists(path):
+            os.remove(path)
+
+        logger.info(
+            f"Съемка закончена: {session.id}, doc_id={document.id}, "
+            f"страниц {session.page_count}"
+        )
+
+        CaptureSessionService.try_assemble(session.document_id)
+        return document
+
+    @staticmethod
+    def try_assemble(document_id: int) -> bool:
+        """
+        Собирает текст и разметку страниц в документ, если съемка закончена
+        и ни одна страница не ждет распознавания. Вызывается после
+        завершения съемки и после каждой распознанной страницы - собирает
+        тот вызов, который застал последнюю страницу.
+
+        Args:
+            document_id: ID документа съемки
+
+        Returns:
+            bool: True если документ собран этим вызовом
+        """
+        import fitz  # PyMuPDF
+        from services.ocr_layout import OCRLayout, make_layout_page
+
+        session = CaptureSession.query.filter_by(document_id=document_id).first()
+        if session is None or session.status != "finishing":
+            return False
+
+        pending_pages = OCRJob.query.filter(
+            OCRJob.document_id == document_id,
+            OCRJob.page_number.isnot(None),
+            OCRJob.status.in_(["pending", "processing"]),
+        ).count()
+        if pending_pages:
+            return False
+
+        claimed = CaptureSession.query.filter_by(
+            id=session.id, status="finishing"
+        ).update({"status": "completed"})
+        if not claimed:
+            db.session.rollback()
+            return False
+
+        document = session.document
+        document.page_count = session.page_count
+        document.ocr_pages_done = session.page_count
+
+        if session.auto_ocr:
+            with fitz.open(document.file_path) as pdf:
+                page_sizes = [(page.rect.width, page.rect.height) for page in pdf]
+
+            texts, layout = [], []
+            for page_number, (width, height) in enumerate(page_sizes):
+                path = CaptureSessionService.page_result_path(session, page_number)
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        result = json.load(f)
+                    texts.append(result["text"].strip())
+                    layout.append(result["layout"])
+                else:
+                    # Страница не распознана
+                    layout.append(make_layout_page(width, height))
+
+            text = "\n\n".join(page_text for page_text in texts if page_text)
+            OCRLayout.save_for(document.id, layout)
+            # Нераспознанные страницы не считаются распознанными
+            document.ocr_pages_done = len(texts)
+
+            if text:
+                document.ocr_text = text
+                document.content = text
+                document.ocr_status = "completed"
+                document.ocr_error = None
+            else:
+                document.ocr_status = "failed"
+                document.ocr_error = "Текст не найден"
+
+        db.session.commit()
+        shutil.rmtree(CaptureSessionService.folder(session), ignore_errors=True)
+
+        logger.info(f"Документ съемки собран: doc_id={document.id}")
+        return True
+
+    @staticmethod
+    def failed_page_count(session: CaptureSession) -> int:
+        """
+        Количество страниц, распознать которые не удалось.
+
+        Args:
+            session: сеанс
+
+        Returns:
+            int
+        """
+        return OCRJob.query.filter(
+            OCRJob.document_id == session.document_id,
+            OCRJob.page_number.isnot(None),
+            OCRJob.status == "failed",
+        ).count()
+
+    @staticmethod
+    def cancel(session: CaptureSession):
+        """
+        Отменяет съемку: удаляет документ, снимки и PDF.
+
+        Args:
+            session: активный сеанс
+
+        Raises:
+            CaptureError: съемка уже закончена
+        """
+        if session.status in ("finishing", "completed"):
+            raise CaptureError("Съемка уже завершена", status=409)
+
+        # Сеанс и задания OCR удаляются вместе с документом
+        db.session.delete(session.document)
+        db.session.commit()
+        shutil.rmtree(CaptureSessionService.folder(session), ignore_errors=True)
+
+        logger.info(f"Съемка отменена: {session.id}")
+
+    # === ОБСЛУЖИВАНИЕ ===
+
+    @staticmethod
+    def expire() -> int:
+        """
+        Обрабатывает просроченные сеансы: брошенная съемка со страницами
+        завершается (снятое не пропадает), пустая - отменяется, записи
+        собранных сеансов удаляются. Папки без сеансов удаляются.
+
+        Returns:
+            int: количество обработанных сеансов
+        """
+        expired = CaptureSession.query.filter(
+            CaptureSession.expires_at <= datetime.utcnow()
+        ).all()
+
+        for session in expired:
+            try:
+                if session.status == "completed":
+                    db.session.delete(session)
+                    db.session.commit()
+                elif session.status == "finishing":
+                    # Задание страницы не выполнено (например, превышено
+                    # количество попыток) - собираем то, что есть
+                    OCRJob.query.filter(
+                        OCRJob.document_id == session.document_id,
+                        OCRJob.page_number.isnot(None),
+                        OCRJob.status == "pending",
+                    ).update({"status": "failed", "error": "Съемка просрочена"})
+                    db.session.commit()
+                    CaptureSessionService.try_assemble(session.document_id)
+                elif session.page_count:
+                    session.status = "active"
+                    db.session.commit()
+                    CaptureSessionService.finish(session)
+                else:
+                    session.status = "active"
+                    CaptureSessionService.cancel(session)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Ошибка обработки просроченной съемки {session.id}: {e}")
+
+        # Папки без сеансов (сеанс удален вместе с документом);
+        # свежие папки не трогаем - сеанс может создаваться прямо сейчас
+        folder = current_app.config["CAPTURE_FOLDER"]
+        if os.path.isdir(folder):
+            known = {capture_id for (capture_id,) in db.session.query(CaptureSession.id)}
+            stale_before = time.time() - current_app.config["CAPTURE_SESSION_TTL"]
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if name not in known and os.path.getmtime(path) < stale_before:
+                    shutil.rmtree(path, ignore_errors=True)
+
+        if expired:
+            logger.info(f"Обработано просроченных съемок: {len(expired)}")
+        return len(expired)
@@ -0,0 +1,256 @@
+# services/counter_service.py
+"""
+Счетчики документов папок и пользователей.
+Количество документов, количество документов не в архиве и общий размер
+хранятся в колонках folders и users и обновляются событиями модели
+Document в той же транзакции, что и сам документ (создание, перемещение,
+архивирование, изменение размера, удаление). Страницы со списками папок
+и пользователей читают готовые значения, а не считают документы.
+
+Изменения в обход ORM (SQL напрямую) счетчики не обновляют - для этого
+есть команда flask repair-counters.
+"""
+
+import logging
+
+from sqlalchemy import event, inspect, text
+
+from models import db
+from models.document import Document, track_previous_values
+
+logger = logging.getLogger(__name__)
+
+# Поля документа, от которых зависят счетчики
+COUNTED_FIELDS = ("user_id", "folder_id", "is_archived", "file_size")
+
+# Таблицы со счетчиками и колонка документа, которая на них ссылается
+COUNTER_TABLES = {"users": "user_id", "folders": "folder_id"}
+
+# Колонки счетчиков
+COUNTER_COLUMNS = (
+    "document_count",
+    "active_document_count",
+    "total_size",
+    "active_total_size",
+)
+
+
+def _contribution(values: dict) -> tuple:
+    """
+    Вклад документа в счетчики:
+    (документов, не в архиве, байт, байт не в архиве).
+    """
+    size = values["file_size"] or 0
+    if values["is_archived"]:
+        return 1, 0, size, 0
+    return 1, 1, size, size
+
+
+class CounterService:
+    """Сервис счетчиков документов"""
+
+    @staticmethod
+    def apply_delta(connection, table: str, row_id: int, delta: tuple):
+        """
+        Изменяет счетчики строки папки или пользователя.
+
+        Args:
+            connection: соединение текущей транзакции
+            table: таблица (users или folders)
+            row_id: ID строки
+            delta: изменение (документов, не в архиве, байт, байт не в архиве)
+        """
+        if row_id is None or not any(delta):
+            return
+
+        connection.execute(
+            text(
+                f"UPDATE {table} SET "
+                "document_count = document_count + :documents, "
+                "active_document_count = active_document_count + :active, "
+                "total_size = total_size + :size, "
+                "active_total_size = active_total_size + :active_size "
+                "WHERE id = :id"
+            ),
+            {
+                "documents": delta[0],
+                "active": delta[1],
+                "size": delta[2],
+                "active_size": delta[3],
+                "id": row_id,
+            },
+        )
+
+    @staticmethod
+    def apply_change(connection, old_values, new_values):
+        """
+        Переносит вклад документа из старого состояния в новое.
+
+        Args:
+            connection: соединение текущей транзакции
+            old_values: поля COUNTED_FIELDS до изменения (None - документ создан)
+            new_values: поля после изменения (None - документ удален)
+        """
+        for table, field in COUNTER_TABLES.items():
+            changes = {}
+
+            if old_values is not None:
+                row_id = old_values[field]
+                changes[row_id] = tuple(
+                    -value for value in _contribution(old_values)
+                )
+
+            if new_values is not None:
+                row_id = new_values[field]
+                old_delta = changes.get(row_id, (0, 0, 0, 0))
+                changes[row_id] = tuple(
+                    a + b for a, b in zip(old_delta, _contribution(new_values))
+                )
+
+            for row_id, delta in changes.items():
+                CounterService.apply_delta(connection, table, row_id, delta)
+
+    @staticmethod
+    def _recount_sql(table: str, field: str) -> dict:
+        """SQL подзапросов, считающих значения счетчиков по документам."""
+        source = f"FROM documents d WHERE d.{field} = {table}.id"
+        return {
+            "document_count": f"(SELECT COUNT(*) {source})",
+            "active_document_count": (
+                f"(SELECT COUNT(*) {source} AND d.is_archived = :archived)"
+            ),
+            "total_size": f"(SELECT COALESCE(SUM(d.file_size), 0) {source})",
+            "active_total_size": (
+                f"(SELECT COALESCE(SUM(d.file_size), 0) {source} "
+                "AND d.is_archived = :archived)"
+            ),
+        }
+
+    @staticmethod
+    def _mismatch_sql(table: str, field: str) -> str:
+        """Условие SQL: счетчики строки не совпадают с документами."""
+        expected = CounterService._recount_sql(table, field)
+        return " OR ".join(
+            f"{column} != {expected[column]}" for column in COUNTER_COLUMNS
+        )
+
+    @staticmethod
+    def check() -> dict:
+        """
+        Сравнивает счетчики с таблицей документов, ничего не исправляя
+        (проверка, что события модели держат счетчики точными).
+
+        Returns:
+            dict: таблица -> количество строк с неверными счетчиками
+        """
+        connection = db.session.connection()
+        return {
+            table: connection.execute(
+                text(
+                    f"SELECT COUNT(*) FROM {table} "
+                    f"WHERE {CounterService._mismatch_sql(table, field)}"
+                ),
+                {"archived": False},
+            ).scalar()
+            for table, field in COUNTER_TABLES.items()
+        }
+
+    @staticmethod
+    def repair() -> dict:
+        """
+        Пересчитывает все счетчики по таблице документов.
+
+        Returns:
+            dict: таблица -> количество исправленных строк
+        """
+        connection = db.session.connection()
+        fixed = CounterService.check()
+
+        for table, field in COUNTER_TABLES.items():
+            expected = CounterService._recount_sql(table, field)
+            params = {"archived": False}
+            mismatch = CounterService._mismatch_sql(table, field)
+
+            if fixed[table]:
+                assignments = ", ".join(
+                    f"{column} = {expected[column]}" for column in COUNTER_COLUMNS
+                )
+                connection.execute(
+                    text(f"UPDATE {table} SET {assignments} WHERE {mismatch}"),
+                    params,
+                )
+
+        db.session.commit()
+
+        if any(fixed.values()):
+            logger.info(f"Счетчики документов исправлены: {fixed}")
+        return fixed
+
+    @staticmethod
+    def needs_repair(schema_changes: list) -> bool:
+        """
+        Проверяет, были ли колонки счетчиков только что добавлены
+        в существующую базу (их нужно заполнить).
+
+        Args:
+            schema_changes: результат upgrade_schema()
+
+        Returns:
+            bool
+        """
+        added = {
+            f"{table}.{column}" for table in COUNTER_TABLES for column in COUNTER_COLUMNS
+        }
+        return bool(added.intersection(schema_changes))
+
+
+def _current_values(document: Document) -> dict:
+    """Текущие значения полей счетчиков."""
+    return {field: getattr(document, field) for field in COUNTED_FIELDS}
+
+
+def _previous_values(document: Document):
+    """
+    Значения полей счетчиков до изменения.
+
+    Returns:
+        dict или None, если поля счетчиков не менялись
+    """
+    state = inspect(document)
+    values = {}
+    changed = False
+
+    for field in COUNTED_FIELDS:
+        history = state.attrs[field].history
+        if history.deleted:
+            values[field] = history.deleted[0]
+            changed = True
+        else:
+            values[field] = getattr(document, field)
+
+    return values if changed else None
+
+
+# Без прежних значений счетчики не обновлялись бы при изменении полей,
+# не загруженных после коммита
+track_previous_values()
+
+
+@event.listens_for(Document, "after_insert")
+def _count_after_insert(mapper, connection, document):
+    """Учитывает новый документ."""
+    CounterService.apply_change(connection, None, _current_values(document))
+
+
+@event.listens_for(Document, "after_update")
+def _count_after_update(mapper, connection, document):
+    """Переносит документ между папками/пользователями, учитывает архив и размер."""
+    old_values = _previous_values(document)
+    if old_values is not None:
+        CounterService.apply_change(connection, old_values, _current_values(document))
+
+
+@event.listens_for(Document, "after_delete")
+def _count_after_delete(mapper, connection, document):
+    """Исключает удаленный документ."""
+    CounterService.apply_change(connection, _current_values(document), None)
@@ -6,7 +6,6 @@
 
 import os
 import shutil
-import uuid
 from datetime import datetime
 from typing import Optional, List, Tuple
 from werkzeug.utils import secure_filename
@@ -15,6 +14,8 @@ import logging
 from models import db
 from models.document import Document
 from models.folder import Folder
+from models.blob import Blob
+from services.blob_store import BlobStore
 
 # Настраиваем логирование
 logger = logging.getLogger(__name__)
@@ -55,55 +56,43 @@ class DocumentService:
 
     def save_uploaded_file(
         self, file, user_id: int
-    ) -> Tuple[Optional[str], Optional[str]]:
+    ) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """
-        Сохраняет загруженный файл на сервер.
+        Сохраняет загруженный файл в хранилище (services/blob_store.py).
+        Файл с таким же содержимым хранится один раз.
 
         Args:
             file: файл из запроса (werkzeug FileStorage)
             user_id: ID пользователя, загружающего файл
 
         Returns:
-            Кортеж (относительный_путь, расширение) или (None, None) при ошибке
+            Кортеж (путь, расширение, sha256) или (None, None, None) при ошибке
         """
         try:
             # Проверяем, что файл предоставлен
             if not file or file.filename == "":
                 logger.error("Файл не предоставлен")
-                return None, None
+                return None, None, None
 
             # Проверяем расширение файла
             if not self.is_allowed_file(file.filename):
                 logger.error(f"Недопустимое расширение файла: {file.filename}")
-                return None, None
+                return None, None, None
 
             # Получаем безопасное имя файла
             original_filename = secure_filename(file.filename)
             file_extension = original_filename.rsplit(".", 1)[1].lower()
 
-            # Генерируем уникальное имя файла
-            unique_filename = f"{user_id}_{uuid.uuid4().hex}.{file_extension}"
+            # Сохраняем файл (хэш считается во время записи)
+            blob = BlobStore.store_upload(file, file_extension)
+            file_path = BlobStore.path_for(blob)
 
-            # Формируем путь для сохранения
-            user_folder = os.path.join(self.upload_folder, "originals", str(user_id))
-            os.makedirs(user_folder, exist_ok=True)
-
-            file_path = os.path.join(user_folder, unique_filename)
-
-            # Сохраняем файл
-            file.save(file_path)
-
-            # Формируем относительный путь (от базовой директории проекта)
-            relative_path = os.path.join(
-                "uploads", "originals", str(user_id), unique_filename
-            )
-
-            logger.info(f"Файл сохранен: {relative_path}")
-            return relative_path, file_extension
+            logger.info(f"Файл сохранен: {file_path} (пользователь {user_id})")
+            return file_path, file_extension, blob.sha256
 
         except Exception as e:
             logger.error(f"Ошибка при сохранении файла: {str(e)}", exc_info=True)
-            return None, None
+            return None, None, None
 
     def create_document(
         self,
@@ -114,6 +103,7 @@ class DocumentService:
         file_extension: str,
         folder_id: Optional[int] = None,
         description: Optional[str] = None,
+        content_hash: Optional[str] = None,
     ) -> Optional[Document]:
         """
         Создает новый документ в базе данных.
@@ -126,6 +116,7 @@ class DocumentService:
             file_extension: расширение файла
             folder_id: ID папки (опционально)
             description: описание документа (опционально)
+            content_hash: SHA-256 файла в хранилище (из save_uploaded_file)
 
         Returns:
             Объект Document или None при ошибке
@@ -133,27 +124,35 @@ class DocumentService:
         try:
             logger.info(f"Создание документа: {title} для пользователя {user_id}")
 
-            # Получаем размер файла
-            absolute_path = os.path.join(os.getcwd(), file_path)
-            file_size = (
-                os.path.getsize(absolute_path)
-                if os.path.exists(absolute_path)
-                else None
-            )
-
             # Создаем объект документа
             document = Document(
                 title=title,
                 description=description,
                 original_filename=original_filename,
                 file_path=file_path,
-                file_size=file_size,
                 file_extension=file_extension,
                 user_id=user_id,
                 folder_id=folder_id,
                 ocr_status="pending",
             )
 
+            blob = (
+                Blob.query.filter_by(sha256=content_hash).first()
+                if content_hash
+                else None
+            )
+            if blob is not None:
+                # Путь, размер и миниатюра - из хранилища
+                BlobStore.attach(document, blob)
+            else:
+                # Получаем размер файла
+                absolute_path = os.path.join(os.getcwd(), file_path)
+                document.file_size = (
+                    os.path.getsize(absolute_path)
+                    if os.path.exists(absolute_path)
+                    else None
+                )
+
             # Сохраняем в базу данных
             db.session.add(document)
             db.session.commit()
@@ -235,17 +234,27 @@ class DocumentService:
                 logger.error(f"Документ не найден или нет прав: {document_id}")
                 return False
 
-            # Удаляем файлы с диска
+            # Удаляем файлы с диска. Файлы из хранилища общие для документов
+            # с одинаковым содержимым - их удаляет BlobStore, когда ссылок
+            # не остается
             try:
-                # Удаляем оригинал
-                if document.file_path and os.path.exists(document.file_path):
-                    os.remove(document.file_path)
-                    logger.info(f"Удален файл: {document.file_path}")
-
-                # Удаляем миниатюру
-                if document.thumbnail_path and os.path.exists(document.thumbnail_path):
-                    os.remove(document.thumbnail_path)
-                    logger.info(f"Удалена миниатюра: {document.thumbnail_path}")
+                if not document.content_hash:
+                    # Удаляем оригинал
+                    if document.file_path and os.path.exists(document.file_path):
+                        os.remove(document.file_path)
+                        logger.info(f"Удален файл: {document.file_path}")
+
+                    # Удаляем миниатюру
+                    if document.thumbnail_path and os.path.exists(
+                        document.thumbnail_path
+                    ):
+                        os.remove(document.thumbnail_path)
+                        logger.info(f"Удалена миниатюра: {document.thumbnail_path}")
+
+                # Удаляем разметку OCR
+                from services.ocr_layout import OCRLayout
+
+                OCRLayout.delete_for(document.id)
 
             except OSError as e:
                 logger.warning(f"Ошибка при удалении файлов с диска: {str(e)}")
@@ -5,7 +5,6 @@
 """
 
 from PIL import Image, ImageEnhance, ImageFilter
-import cv2
 import numpy as np
 import os
 import logging
@@ -92,6 +91,9 @@ class ImageProcessor:
         Returns:
             Путь к улучшенному изображению или None при ошибке
         """
+        # OpenCV загружается только при использовании (долгий импорт)
+        import cv2
+
         try:
             logger.info(f"Улучшение изображения для OCR: {image_path}")
 
@@ -155,6 +157,8 @@ class ImageProcessor:
         Returns:
             Массив numpy с координатами углов документа или None при ошибке
         """
+        import cv2
+
         try:
             logger.info(f"Определение границ документа: {image_path}")
 
@@ -210,6 +214,8 @@ class ImageProcessor:
         Returns:
             Путь к обработанному изображению или None при ошибке
         """
+        import cv2
+
         try:
             logger.info(f"Коррекция перспективы документа: {image_path}")
 
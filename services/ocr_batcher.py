@@ -0,0 +1,216 @@
+# services/ocr_batcher.py
+"""
+Пакетное распознавание.
+Изображения, отправленные на OCR из разных мест (страницы PDF, массовая
+загрузка), собираются в пакеты: детектор EasyOCR обрабатывает страницы
+одного размера за один проход. Распознаватель по-прежнему работает
+с каждой страницей отдельно - области текста одной страницы идут
+пачками по OCR_BATCH_SIZE, области разных страниц не объединяются.
+Пакет отправляется, когда он заполнен или истекло время ожидания
+OCR_BATCH_MAX_WAIT.
+"""
+
+import queue
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Глобальный сборщик пакетов процесса
+_ocr_batcher = None
+_ocr_batcher_lock = threading.Lock()
+
+
+def chain_future(source: Future, target: Future):
+    """
+    Передает результат (или исключение) одного Future в другой.
+
+    Args:
+        source: исходный Future
+        target: Future, который нужно завершить
+    """
+
+    def resolve(future):
+        if future.cancelled():
+            target.cancel()
+        elif future.exception() is not None:
+            target.set_exception(future.exception())
+        else:
+            target.set_result(future.result())
+
+    source.add_done_callback(resolve)
+
+
+def split_future(batch_future: Future, count: int) -> List[Future]:
+    """
+    Разбивает Future со списком результатов на Future по каждому элементу.
+
+    Args:
+        batch_future: Future, результат которого - список длины count
+        count: количество элементов
+
+    Returns:
+        list: Future по каждому элементу
+    """
+    futures = [Future() for _ in range(count)]
+
+    def resolve(future):
+        error = future.exception() if not future.cancelled() else None
+        for index, item_future in enumerate(futures):
+            if future.cancelled():
+                item_future.cancel()
+            elif error is not None:
+                item_future.set_exception(error)
+            else:
+                item_future.set_result(future.result()[index])
+
+    batch_future.add_done_callback(resolve)
+    return futures
+
+
+class OCRBatcher:
+    """
+    Собирает изображения в пакеты и передает их на распознавание.
+    Отправка пакета выполняется в отдельном потоке, вызывающий код
+    получает Future по каждому изображению.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[list], List[Future]],
+        max_batch: int,
+        max_wait: float,
+    ):
+        """
+        Инициализация сборщика.
+
+        Args:
+            dispatch: функция (изображения) -> список Future с результатами
+            max_batch: максимальное количество изображений в пакете
+            max_wait: сколько секунд ждать заполнения пакета
+        """
+        self._dispatch = dispatch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, image) -> Future:
+        """
+        Добавляет изображение в очередной пакет.
+
+        Args:
+            image: путь к файлу или numpy массив
+
+        Returns:
+            Future с результатом распознавания
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((image, future))
+        return future
+
+    def _ensure_started(self):
+        """Запускает поток сборки пакетов при первом обращении."""
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ocr-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> list:
+        """Ждет первое изображение и добирает пакет до лимита или таймаута."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        """Основной цикл потока сборки пакетов."""
+        while True:
+            batch = self._collect()
+            images = [image for image, _ in batch]
+            futures = [future for _, future in batch]
+
+            logger.debug(f"OCR пакет: {len(images)} изображений")
+
+            try:
+                results = self._dispatch(images)
+            except Exception as e:
+                logger.error(f"Ошибка пакетного OCR: {e}", exc_info=True)
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for result, future in zip(results, futures):
+                chain_future(result, future)
+
+
+def _dispatch_local(images, batch_size) -> List[Future]:
+    """Распознает пакет Reader текущего процесса."""
+    from services.ocr_service import get_ocr_reader, recognize_images
+
+    batch_future = Future()
+    try:
+        batch_future.set_result(
+            recognize_images(get_ocr_reader(), images, batch_size)
+        )
+    except Exception as e:
+        batch_future.set_exception(e)
+
+    return split_future(batch_future, len(images))
+
+
+def get_ocr_batcher() -> OCRBatcher:
+    """
+    Возвращает сборщик пакетов OCR текущего процесса.
+    Пакеты распознаются пулом процессов OCR, если он используется,
+    иначе Reader текущего процесса.
+
+    Returns:
+        OCRBatcher
+    """
+    global _ocr_batcher
+
+    if _ocr_batcher is not None:
+        return _ocr_batcher
+
+    from services.ocr_pool import get_ocr_pool, get_ocr_settings
+
+    settings = get_ocr_settings()
+    batch_size = settings["OCR_BATCH_SIZE"]
+
+    # Пул запрашивается для каждого пакета: после аварийного завершения
+    # процесса пула get_ocr_pool() создает новый
+    def dispatch(images):
+        pool = get_ocr_pool()
+        if pool is None:
+            return _dispatch_local(images, batch_size)
+        return pool.submit_batch(images)
+
+    with _ocr_batcher_lock:
+        if _ocr_batcher is None:
+            _ocr_batcher = OCRBatcher(
+                dispatch,
+                max_batch=settings["OCR_BATCH_PAGES"],
+                max_wait=settings["OCR_BATCH_MAX_WAIT"],
+            )
+
+    return _ocr_batcher
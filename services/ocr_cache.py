@@ -0,0 +1,229 @@
+# services/ocr_cache.py
+"""
+Кэш результатов OCR.
+Ключ - SHA-256 пикселей изображения страницы (или байтов файла) вместе
+с версией движка и настройками распознавания. Результаты (текст, рамки,
+уверенность) хранятся на диске, при превышении размера удаляются
+давно не использованные записи (LRU по времени последнего обращения).
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Версия формата записей кэша (увеличить при изменении формата результата)
+CACHE_FORMAT_VERSION = 1
+
+# Глобальный кэш процесса
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def engine_version() -> str:
+    """
+    Возвращает версию EasyOCR без импорта самой библиотеки (и torch).
+
+    Returns:
+        str: версия или 'unknown'
+    """
+    try:
+        from importlib.metadata import version
+
+        return version("easyocr")
+    except Exception:
+        return "unknown"
+
+
+class OCRCache:
+    """Дисковый кэш результатов OCR с вытеснением по размеру"""
+
+    def __init__(self, folder: str, max_size: int, namespace: str):
+        """
+        Инициализация кэша.
+
+        Args:
+            folder: папка для хранения записей
+            max_size: максимальный размер кэша в байтах
+            namespace: версия движка и настройки OCR (входит в ключ)
+        """
+        self.folder = folder
+        self.max_size = max_size
+        self.namespace = namespace
+        self._size = None
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+
+    def make_key(self, image) -> str:
+        """
+        Вычисляет ключ кэша для изображения.
+
+        Args:
+            image: путь к файлу или numpy массив
+
+        Returns:
+            str: hex SHA-256
+        """
+        digest = hashlib.sha256(self.namespace.encode("utf-8"))
+
+        if isinstance(image, str):
+            with open(image, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        else:
+            # Форма массива входит в ключ: одинаковые байты могут быть разными кадрами
+            digest.update(f"{image.shape}{image.dtype}".encode("ascii"))
+            digest.update(image if image.flags.c_contiguous else image.tobytes())
+
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Путь к файлу записи (записи разложены по подпапкам)."""
+        return os.path.join(self.folder, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Возвращает результат OCR из кэша.
+
+        Args:
+            key: ключ записи
+
+        Returns:
+            dict или None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Обновляем время обращения для LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return result
+
+    def put(self, key: str, result: dict):
+        """
+        Сохраняет результат OCR в кэш.
+
+        Args:
+            key: ключ записи
+            result: результат распознавания
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Не удалось записать кэш OCR: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+
+            if self._size > self.max_size:
+                self._evict()
+
+    def _scan_size(self) -> int:
+        """Подсчитывает текущий размер кэша на диске."""
+        total = 0
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict(self):
+        """
+        Удаляет давно не использованные записи,
+        пока размер кэша не станет меньше 90% от максимального.
+        """
+        entries = []
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_size * 0.9)
+        removed = 0
+
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+
+        self._size = total
+        logger.info(f"Кэш OCR: удалено записей {removed}, размер {total} байт")
+
+
+def create_ocr_cache(settings) -> Optional[OCRCache]:
+    """
+    Создает кэш по настройкам приложения.
+
+    Args:
+        settings: словарь конфигурации (app.config)
+
+    Returns:
+        OCRCache или None, если кэш отключен
+    """
+    if not settings.get("OCR_CACHE_ENABLED"):
+        return None
+
+    languages = ",".join(settings["OCR_LANGUAGES"])
+    namespace = f"easyocr={engine_version()};lang={languages};v={CACHE_FORMAT_VERSION}"
+
+    return OCRCache(
+        folder=settings["OCR_CACHE_FOLDER"],
+        max_size=settings["OCR_CACHE_MAX_SIZE"],
+        namespace=namespace,
+    )
+
+
+def get_ocr_cache() -> Optional[OCRCache]:
+    """
+    Возвращает кэш OCR текущего процесса (создается при первом обращении).
+
+    Returns:
+        OCRCache или None, если кэш отключен
+    """
+    global _ocr_cache
+
+    if _ocr_cache is None:
+        from services.ocr_pool import get_ocr_settings
+
+        with _ocr_cache_lock:
+            if _ocr_cache is None:
+                _ocr_cache = create_ocr_cache(get_ocr_settings()) or False
+
+    return _ocr_cache or None
@@ -0,0 +1,335 @@
+# services/ocr_layout.py
+"""
+Разметка распознанного текста документа.
+Слова, их рамки, уверенность и номера страниц хранятся в отдельном файле
+на документ (сжатый .npz со столбцами numpy), а не в базе данных.
+Файл загружается только при обращении - например, для подсветки
+найденного текста или экспорта PDF с текстовым слоем.
+"""
+
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Версия формата файла разметки
+LAYOUT_FORMAT_VERSION = 1
+
+
+def make_layout_page(width, height, words=(), boxes=(), confidences=None, scale=1.0):
+    """
+    Формирует описание страницы для разметки.
+
+    Args:
+        width: ширина страницы (точки PDF или пиксели изображения)
+        height: высота страницы
+        words: слова
+        boxes: рамки слов - 4 точки [x, y] (EasyOCR) или [x0, y0, x1, y1]
+        confidences: уверенность по словам (None - 1.0 для всех)
+        scale: множитель координат рамок (например, 72 / dpi для страниц PDF)
+
+    Returns:
+        dict: страница разметки
+    """
+    rects = []
+    for box in boxes:
+        if isinstance(box[0], (list, tuple)):
+            xs = [point[0] for point in box]
+            ys = [point[1] for point in box]
+            box = (min(xs), min(ys), max(xs), max(ys))
+        rects.append([coordinate * scale for coordinate in box[:4]])
+
+    if confidences is None:
+        confidences = [1.0] * len(rects)
+
+    return {
+        "width": float(width),
+        "height": float(height),
+        "words": [str(word) for word in words],
+        "boxes": rects,
+        "confidences": list(confidences),
+    }
+
+
+class OCRLayout:
+    """
+    Разметка документа: слова с рамками и уверенностью по страницам.
+    Данные хранятся столбцами: номера страниц, рамки (x0, y0, x1, y1),
+    уверенность и слова одной UTF-8 строкой со смещениями.
+    """
+
+    def __init__(self, pages, boxes, confidences, text, offsets, page_sizes):
+        """
+        Инициализация разметки из массивов.
+
+        Args:
+            pages: номер страницы каждого слова (int32)
+            boxes: рамки слов (float32, N x 4)
+            confidences: уверенность (float16)
+            text: слова подряд в UTF-8 (uint8)
+            offsets: границы слов в text (int64, N + 1)
+            page_sizes: размеры страниц (float32, P x 2)
+        """
+        self.pages = pages
+        self.boxes = boxes
+        self.confidences = confidences
+        self.text = text
+        self.offsets = offsets
+        self.page_sizes = page_sizes
+        self._words = None
+
+    # === СОЗДАНИЕ И ХРАНЕНИЕ ===
+
+    @classmethod
+    def from_pages(cls, layout_pages: List[dict]) -> "OCRLayout":
+        """
+        Собирает разметку из описаний страниц (см. make_layout_page).
+
+        Args:
+            layout_pages: страницы документа по порядку
+
+        Returns:
+            OCRLayout
+        """
+        pages, boxes, confidences, encoded = [], [], [], []
+
+        for page_number, page in enumerate(layout_pages):
+            for word, box, confidence in zip(
+                page["words"], page["boxes"], page["confidences"]
+            ):
+                pages.append(page_number)
+                boxes.append(box)
+                confidences.append(confidence)
+                encoded.append(word.encode("utf-8"))
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(word) for word in encoded], dtype=np.int64)
+
+        return cls(
+            pages=np.array(pages, dtype=np.int32),
+            boxes=np.array(boxes, dtype=np.float32).reshape(-1, 4),
+            confidences=np.array(confidences, dtype=np.float16),
+            text=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            offsets=offsets,
+            page_sizes=np.array(
+                [[page["width"], page["height"]] for page in layout_pages],
+                dtype=np.float32,
+            ).reshape(-1, 2),
+        )
+
+    def save(self, path: str):
+        """
+        Сохраняет разметку в файл (атомарно).
+
+        Args:
+            path: путь к файлу .npz
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                version=np.array(LAYOUT_FORMAT_VERSION),
+                pages=self.pages,
+                boxes=self.boxes,
+                confidences=self.confidences,
+                text=self.text,
+                offsets=self.offsets,
+                page_sizes=self.page_sizes,
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "OCRLayout":
+        """
+        Загружает разметку из файла.
+
+        Args:
+            path: путь к файлу .npz
+
+        Returns:
+            OCRLayout
+        """
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != LAYOUT_FORMAT_VERSION:
+                raise ValueError(f"Неподдерживаемая версия разметки: {path}")
+
+            return cls(
+                pages=data["pages"],
+                boxes=data["boxes"],
+                confidences=data["confidences"],
+                text=data["text"],
+                offsets=data["offsets"],
+                page_sizes=data["page_sizes"],
+            )
+
+    @staticmethod
+    def path_for(document_id: int) -> str:
+        """
+        Возвращает путь к файлу разметки документа.
+
+        Args:
+            document_id: ID документа
+
+        Returns:
+            str: путь к файлу
+        """
+        from flask import current_app, has_app_context
+
+        if has_app_context():
+            folder = current_app.config["OCR_LAYOUT_FOLDER"]
+        else:
+            from config import Config
+
+            folder = Config.OCR_LAYOUT_FOLDER
+
+        return os.path.join(folder, f"{document_id}.npz")
+
+    @classmethod
+    def save_for(cls, document_id: int, layout_pages: List[dict]) -> "OCRLayout":
+        """
+        Сохраняет разметку документа.
+
+        Args:
+            document_id: ID документа
+            layout_pages: страницы документа (см. make_layout_page)
+
+        Returns:
+            OCRLayout
+        """
+        layout = cls.from_pages(layout_pages)
+        layout.save(cls.path_for(document_id))
+        logger.info(
+            f"Разметка OCR сохранена: doc_id={document_id}, "
+            f"страниц {layout.page_count}, слов {len(layout)}"
+        )
+        return layout
+
+    @classmethod
+    def load_for(cls, document_id: int) -> Optional["OCRLayout"]:
+        """
+        Загружает разметку документа.
+
+        Args:
+            document_id: ID документа
+
+        Returns:
+            OCRLayout или None, если разметки нет
+        """
+        path = cls.path_for(document_id)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            return cls.load(path)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки разметки OCR {path}: {e}")
+            return None
+
+    @classmethod
+    def delete_for(cls, document_id: int):
+        """
+        Удаляет файл разметки документа.
+
+        Args:
+            document_id: ID документа
+        """
+        path = cls.path_for(document_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # === ДОСТУП К ДАННЫМ ===
+
+    def __len__(self):
+        return len(self.pages)
+
+    @property
+    def page_count(self) -> int:
+        """Количество страниц в разметке."""
+        return len(self.page_sizes)
+
+    @property
+    def words(self) -> List[str]:
+        """Все слова документа (декодируются при первом обращении)."""
+        if self._words is None:
+            data = self.text.tobytes()
+            self._words = [
+                data[start:end].decode("utf-8")
+                for start, end in zip(self.offsets[:-1], self.offsets[1:])
+            ]
+        return self._words
+
+    def page_words(self, page_number: int) -> List[dict]:
+        """
+        Возвращает слова страницы.
+
+        Args:
+            page_number: номер страницы (с 0)
+
+        Returns:
+            list: слова с рамками и уверенностью
+        """
+        indexes = np.flatnonzero(self.pages == page_number)
+        return [self._word_dict(index) for index in indexes]
+
+    def find(self, query: str) -> List[dict]:
+        """
+        Ищет слова, содержащие строку (без учета регистра).
+        Используется для подсветки найденного текста.
+
+        Args:
+            query: искомая строка
+
+        Returns:
+            list: найденные слова с номерами страниц и рамками
+        """
+        query = query.lower().strip()
+        if not query:
+            return []
+
+        return [
+            self._word_dict(index)
+            for index, word in enumerate(self.words)
+            if query in word.lower()
+        ]
+
+    def _word_dict(self, index) -> dict:
+        """Описание слова для API."""
+        return {
+            "page": int(self.pages[index]),
+            "text": self.words[index],
+            "box": [round(float(value), 2) for value in self.boxes[index]],
+            "confidence": round(float(self.confidences[index]), 3),
+        }
+
+    def to_dict(self, page_number: Optional[int] = None) -> dict:
+        """
+        Преобразует разметку (или одну страницу) в словарь для API.
+
+        Args:
+            page_number: номер страницы (None - все страницы)
+
+        Returns:
+            dict: размеры страниц и слова
+        """
+        page_numbers = (
+            range(self.page_count) if page_number is None else [page_number]
+        )
+
+        return {
+            "page_count": self.page_count,
+            "pages": [
+                {
+                    "page": number,
+                    "width": float(self.page_sizes[number][0]),
+                    "height": float(self.page_sizes[number][1]),
+                    "words": self.page_words(number),
+                }
+                for number in page_numbers
+                if 0 <= number < self.page_count
+            ],
+        }
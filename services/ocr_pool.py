@@ -0,0 +1,335 @@
+# services/ocr_pool.py
+"""
+Пул процессов для OCR.
+Каждый процесс держит собственный прогретый EasyOCR Reader,
+поэтому страницы распознаются параллельно на всех ядрах.
+"""
+
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from services.ocr_batcher import split_future
+
+logger = logging.getLogger(__name__)
+
+# Reader и кэш OCR внутри процесса пула (создаются инициализатором процесса)
+_worker_reader = None
+_worker_cache = None
+_worker_batch_size = 1
+
+# Глобальный пул веб-приложения / обработчика очереди
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def physical_cpu_count() -> int:
+    """
+    Возвращает количество физических ядер процессора.
+    Использует psutil, если он установлен, иначе - количество логических ядер.
+
+    Returns:
+        int: количество ядер
+    """
+    try:
+        import psutil
+
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    except ImportError:
+        pass
+
+    return os.cpu_count() or 1
+
+
+def resolve_worker_count(configured: int, threads_per_reader: int) -> int:
+    """
+    Определяет количество процессов пула.
+
+    Args:
+        configured: значение из конфигурации (0 - автоматически)
+        threads_per_reader: потоков torch на один Reader
+
+    Returns:
+        int: количество процессов (не меньше 1)
+    """
+    if configured and configured > 0:
+        return configured
+    return max(1, physical_cpu_count() // max(1, threads_per_reader))
+
+
+def _init_worker(languages, gpu, threads_per_reader, cache_settings, batch_size):
+    """
+    Инициализатор процесса пула: ограничивает потоки torch
+    и создает EasyOCR Reader один раз на весь срок жизни процесса.
+    """
+    global _worker_reader, _worker_cache, _worker_batch_size
+
+    # Ограничиваем потоки до импорта torch, чтобы процессы не конкурировали за ядра
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_reader)
+
+    import torch
+    import easyocr
+    from services.ocr_cache import create_ocr_cache
+
+    torch.set_num_threads(threads_per_reader)
+    _worker_reader = easyocr.Reader(languages, gpu=gpu)
+    _worker_cache = create_ocr_cache(cache_settings)
+    _worker_batch_size = batch_size
+    logger.info(f"✓ EasyOCR готов в процессе пула {os.getpid()}")
+
+
+def _recognize_batch(images):
+    """
+    Распознает пакет изображений прогретым Reader процесса пула.
+    Кэш здесь не используется - его проверяет вызывающий процесс.
+    """
+    from services.ocr_service import recognize_images
+
+    return recognize_images(_worker_reader, images, _worker_batch_size)
+
+
+def _recognize_pdf_pages(pdf_path, page_numbers, dpi, grayscale):
+    """
+    Рендерит страницы PDF и распознает их одним пакетом в процессе пула.
+    Рендеринг выполняется здесь же: PyMuPDF не потокобезопасен,
+    а передавать между процессами готовые изображения страниц дорого.
+    По той же причине кэш OCR для страниц проверяется в процессе пула.
+    """
+    import fitz
+    from services.pdf_service import PDFService
+    from services.ocr_service import recognize_images
+
+    pdf = fitz.open(pdf_path)
+    try:
+        images = [
+            PDFService.render_page(pdf, page_number, dpi, grayscale)
+            for page_number in page_numbers
+        ]
+    finally:
+        pdf.close()
+
+    results = [None] * len(images)
+    keys = [None] * len(images)
+
+    if _worker_cache is not None:
+        for index, image in enumerate(images):
+            keys[index] = _worker_cache.make_key(image)
+            results[index] = _worker_cache.get(keys[index])
+
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        recognized = recognize_images(
+            _worker_reader, [images[index] for index in missing], _worker_batch_size
+        )
+        for index, result in zip(missing, recognized):
+            results[index] = result
+            if _worker_cache is not None:
+                _worker_cache.put(keys[index], result)
+
+    return results
+
+
+def _ping():
+    """Пустая задача для прогрева процессов пула."""
+    return os.getpid()
+
+
+class OCRPool:
+    """
+    Пул процессов OCR с прогретыми EasyOCR Reader.
+    Распределяет изображения (страницы) по процессам.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        threads_per_reader: int,
+        languages: Optional[List[str]] = None,
+        gpu: bool = False,
+        cache_settings: Optional[dict] = None,
+        batch_size: int = 1,
+    ):
+        """
+        Инициализация пула.
+
+        Args:
+            workers: количество процессов
+            threads_per_reader: потоков torch на один процесс
+            languages: языки распознавания
+            gpu: использовать ли GPU
+            cache_settings: настройки кэша OCR для процессов пула
+            batch_size: размер пакета распознавателя EasyOCR
+        """
+        self.workers = workers
+        self.threads_per_reader = threads_per_reader
+        self.languages = languages or ["ru", "en"]
+
+        # spawn - единственный вариант на Windows/в собранном приложении,
+        # и он не наследует потоки веб-сервера
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.languages,
+                gpu,
+                threads_per_reader,
+                cache_settings or {},
+                batch_size,
+            ),
+        )
+
+        logger.info(
+            f"OCRPool инициализирован: процессов={workers}, "
+            f"потоков на процесс={threads_per_reader}"
+        )
+
+    def submit_batch(self, images) -> List[Future]:
+        """
+        Отправляет пакет изображений на распознавание в один процесс пула.
+
+        Args:
+            images: список путей к файлам или numpy массивов
+
+        Returns:
+            list: Future с результатом распознавания по каждому изображению
+        """
+        batch_future = self._submit(_recognize_batch, images)
+        return split_future(batch_future, len(images))
+
+    def submit_pdf_pages(
+        self, pdf_path, page_numbers, dpi, grayscale=False
+    ) -> List[Future]:
+        """
+        Отправляет страницы PDF на рендеринг и пакетное распознавание
+        в один процесс пула.
+
+        Args:
+            pdf_path: путь к PDF файлу
+            page_numbers: номера страниц (с 0)
+            dpi: разрешение рендеринга
+            grayscale: рендерить в оттенках серого
+
+        Returns:
+            list: Future с результатом распознавания по каждой странице
+        """
+        batch_future = self._submit(
+            _recognize_pdf_pages, pdf_path, list(page_numbers), dpi, grayscale
+        )
+        return split_future(batch_future, len(page_numbers))
+
+    def _submit(self, fn, *args) -> Future:
+        """
+        Отправляет задачу в пул. Если процесс пула аварийно завершился
+        (нехватка памяти, сбой torch), пул становится неработоспособным -
+        он останавливается, и следующий get_ocr_pool() создает новый.
+        """
+        try:
+            future = self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            _discard_ocr_pool(self)
+            raise
+
+        def check_broken(done):
+            if isinstance(done.exception(), BrokenProcessPool):
+                _discard_ocr_pool(self)
+
+        future.add_done_callback(check_broken)
+        return future
+
+    def warm_up(self):
+        """
+        Запускает все процессы пула, чтобы Reader были готовы к первому запросу.
+        """
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+        logger.info(f"✓ OCRPool прогрет: {self.workers} процессов")
+
+    def shutdown(self):
+        """
+        Останавливает процессы пула.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _discard_ocr_pool(pool: OCRPool):
+    """
+    Останавливает неработоспособный пул и сбрасывает глобальный пул,
+    если это он.
+
+    Args:
+        pool: пул, процесс которого аварийно завершился
+    """
+    global _ocr_pool
+
+    with _ocr_pool_lock:
+        if _ocr_pool is not pool:
+            return
+        _ocr_pool = None
+
+    logger.error("Процесс пула OCR аварийно завершился - пул будет создан заново")
+    pool.shutdown()
+
+
+def get_ocr_settings():
+    """Возвращает настройки OCR из конфигурации приложения."""
+    from flask import current_app, has_app_context
+
+    if has_app_context():
+        return current_app.config
+
+    from config import Config
+
+    return {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+
+
+def get_ocr_pool() -> Optional[OCRPool]:
+    """
+    Возвращает глобальный пул процессов OCR.
+    Пул создается при первом обращении. Если по конфигурации нужен только
+    один процесс, пул не создается и распознавание идет в текущем процессе.
+
+    Returns:
+        OCRPool или None
+    """
+    global _ocr_pool
+
+    if _ocr_pool is not None:
+        return _ocr_pool
+
+    settings = get_ocr_settings()
+    threads_per_reader = settings["OCR_THREADS_PER_READER"]
+    workers = resolve_worker_count(settings["OCR_POOL_WORKERS"], threads_per_reader)
+
+    if workers <= 1:
+        return None
+
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = OCRPool(
+                workers=workers,
+                threads_per_reader=threads_per_reader,
+                languages=settings["OCR_LANGUAGES"],
+                gpu=settings["OCR_GPU"],
+                batch_size=settings["OCR_BATCH_SIZE"],
+                cache_settings={
+                    key: settings[key]
+                    for key in (
+                        "OCR_CACHE_ENABLED",
+                        "OCR_CACHE_FOLDER",
+                        "OCR_CACHE_MAX_SIZE",
+                        "OCR_LANGUAGES",
+                    )
+                },
+            )
+            atexit.register(_ocr_pool.shutdown)
+
+    return _ocr_pool
@@ -0,0 +1,558 @@
+# services/ocr_queue.py
+"""
+Очередь заданий OCR.
+Задания хранятся в таблице ocr_jobs и выполняются фоновым обработчиком:
+потоком внутри веб-приложения или отдельным процессом (ocr_worker.py).
+"""
+
+import os
+import time
+import shutil
+import socket
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import and_, or_
+
+from models import db
+from models.document import Document
+from models.ocr_job import OCRJob
+from services.stats_service import StatsService
+
+logger = logging.getLogger(__name__)
+
+
+class OCRQueue:
+    """Очередь заданий на распознавание текста"""
+
+    @staticmethod
+    def enqueue(document: Document) -> OCRJob:
+        """
+        Ставит документ в очередь на OCR.
+        Если для документа уже есть незавершенное задание, новое не создается.
+        Зависшее задание (в обработке дольше OCR_JOB_TIMEOUT) незавершенным
+        не считается - его обработчик, скорее всего, аварийно завершился;
+        такое задание отмечается неудачным, чтобы requeue_stale
+        не вернуло его в очередь вместе с новым.
+        Коммит выполняет вызывающий код.
+
+        Args:
+            document: документ для распознавания
+
+        Returns:
+            OCRJob: задание в очереди
+        """
+        deadline = datetime.utcnow() - timedelta(
+            seconds=current_app.config["OCR_JOB_TIMEOUT"]
+        )
+        job = (
+            OCRJob.query.filter(
+                OCRJob.document_id == document.id,
+                OCRJob.page_number.is_(None),
+                or_(
+                    OCRJob.status == "pending",
+                    and_(
+                        OCRJob.status == "processing",
+                        OCRJob.started_at >= deadline,
+                    ),
+                ),
+            )
+            .order_by(OCRJob.id.desc())
+            .first()
+        )
+
+        document.ocr_status = "pending"
+        document.ocr_error = None
+
+        if job is None:
+            OCRJob.query.filter(
+                OCRJob.document_id == document.id,
+                OCRJob.page_number.is_(None),
+                OCRJob.status == "processing",
+                OCRJob.started_at < deadline,
+            ).update(
+                {
+                    "status": "failed",
+                    "error": "Задание зависло и заменено новым",
+                    "finished_at": datetime.utcnow(),
+                },
+                synchronize_session=False,
+            )
+
+            job = OCRJob(document_id=document.id)
+            db.session.add(job)
+            logger.info(f"OCR задание поставлено в очередь: doc_id={document.id}")
+
+        return job
+
+    @staticmethod
+    def enqueue_page(document: Document, page_number: int) -> OCRJob:
+        """
+        Ставит в очередь одну страницу многостраничной съемки
+        (services/capture_sessions.py). Коммит выполняет вызывающий код.
+
+        Args:
+            document: документ съемки
+            page_number: номер страницы (с 0)
+
+        Returns:
+            OCRJob: задание в очереди
+        """
+        job = OCRJob(document_id=document.id, page_number=page_number)
+        db.session.add(job)
+        logger.info(
+            f"OCR задание страницы поставлено в очередь: doc_id={document.id}, "
+            f"страница {page_number + 1}"
+        )
+        return job
+
+    @staticmethod
+    def reuse_result(document: Document) -> bool:
+        """
+        Копирует результат OCR из уже распознанного документа с тем же
+        содержимым (Document.content_hash), чтобы не распознавать файл
+        повторно. Берется распознанный текст, а не отредактированный.
+        Коммит выполняет вызывающий код.
+
+        Args:
+            document: новый документ (должен иметь ID)
+
+        Returns:
+            bool: True если результат скопирован
+        """
+        from services.ocr_layout import OCRLayout
+
+        if not document.content_hash:
+            return False
+
+        source = (
+            Document.query.filter(
+                Document.content_hash == document.content_hash,
+                Document.ocr_status == "completed",
+                Document.id != document.id,
+            )
+            .order_by(Document.id.desc())
+            .first()
+        )
+        if source is None:
+            return False
+
+        layout_path = OCRLayout.path_for(source.id)
+        if os.path.exists(layout_path):
+            shutil.copyfile(layout_path, OCRLayout.path_for(document.id))
+
+        document.ocr_text = source.ocr_text
+        document.content = source.ocr_text
+        document.language = source.language
+        document.page_count = source.page_count
+        document.ocr_pages_done = source.ocr_pages_done
+        document.ocr_status = "completed"
+        document.ocr_error = None
+
+        logger.info(
+            f"Результат OCR скопирован: doc_id={source.id} -> doc_id={document.id}"
+        )
+        return True
+
+    @staticmethod
+    def get_active_job(document_id: int) -> Optional[OCRJob]:
+        """
+        Возвращает незавершенное задание документа.
+
+        Args:
+            document_id: ID документа
+
+        Returns:
+            OCRJob или None
+        """
+        return (
+            OCRJob.query.filter(
+                OCRJob.document_id == document_id,
+                OCRJob.status.in_(["pending", "processing"]),
+            )
+            .order_by(OCRJob.id.desc())
+            .first()
+        )
+
+    @staticmethod
+    def claim_next(worker_id: str) -> Optional[OCRJob]:
+        """
+        Забирает следующее задание из очереди.
+        Захват выполняется условным UPDATE, поэтому несколько обработчиков
+        могут безопасно работать с одной базой данных.
+
+        Args:
+            worker_id: идентификатор обработчика
+
+        Returns:
+            OCRJob или None, если очередь пуста
+        """
+        while True:
+            job_id = (
+                db.session.query(OCRJob.id)
+                .filter_by(status="pending")
+                .order_by(OCRJob.id)
+                .limit(1)
+                .scalar()
+            )
+
+            if job_id is None:
+                db.session.commit()
+                return None
+
+            claimed = (
+                OCRJob.query.filter_by(id=job_id, status="pending").update(
+                    {
+                        "status": "processing",
+                        "worker_id": worker_id,
+                        "started_at": datetime.utcnow(),
+                        "attempts": OCRJob.attempts + 1,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.session.commit()
+
+            if claimed:
+                return db.session.get(OCRJob, job_id)
+
+            # Задание забрал другой обработчик - пробуем следующее
+
+    @staticmethod
+    def requeue_stale(timeout: int, max_attempts: int) -> int:
+        """
+        Возвращает в очередь задания, зависшие в обработке
+        (например, после аварийного завершения обработчика).
+
+        Args:
+            timeout: время в секундах, после которого задание считается зависшим
+            max_attempts: максимальное количество попыток
+
+        Returns:
+            int: количество восстановленных заданий
+        """
+        deadline = datetime.utcnow() - timedelta(seconds=timeout)
+        stale_jobs = OCRJob.query.filter(
+            OCRJob.status == "processing", OCRJob.started_at < deadline
+        ).all()
+
+        for job in stale_jobs:
+            if job.attempts < max_attempts:
+                job.status = "pending"
+                job.worker_id = None
+            else:
+                job.status = "failed"
+                job.error = "Превышено количество попыток"
+                job.finished_at = datetime.utcnow()
+                if job.document and job.page_number is None:
+                    job.document.ocr_status = "failed"
+                    job.document.ocr_error = job.error
+
+        db.session.commit()
+
+        if stale_jobs:
+            logger.warning(f"Восстановлено зависших OCR заданий: {len(stale_jobs)}")
+
+        return len(stale_jobs)
+
+    @staticmethod
+    def extract_document_content(document: Document) -> dict:
+        """
+        Распознает текст документа (PDF или изображение).
+        Прогресс по страницам сохраняется в документ по мере распознавания.
+
+        Args:
+            document: документ
+
+        Returns:
+            dict: text - распознанный текст,
+                layout - страницы разметки слов (см. make_layout_page),
+                ocr_pages - сколько страниц прошло через OCR
+        """
+        from PIL import Image
+        from services.ocr_layout import make_layout_page
+        from services.ocr_service import OCRService
+        from services.pdf_service import PDFService
+
+        def save_progress(pages_done, page_count):
+            document.ocr_pages_done = pages_done
+            document.page_count = page_count
+            db.session.commit()
+
+        if document.is_pdf():
+            return PDFService.extract_pdf_content(
+                document.file_path, progress_callback=save_progress
+            )
+
+        result = OCRService.recognize(document.file_path)
+        with Image.open(document.file_path) as image:
+            width, height = image.size
+        save_progress(1, 1)
+
+        return {
+            "text": result["text"],
+            "layout": [
+                make_layout_page(
+                    width,
+                    height,
+                    result["words"],
+                    result["boxes"],
+                    result["confidences"],
+                )
+            ],
+            "ocr_pages": 1,
+        }
+
+    @staticmethod
+    def run_job(job: OCRJob) -> bool:
+        """
+        Выполняет задание OCR и сохраняет результат в документ.
+
+        Args:
+            job: захваченное задание
+
+        Returns:
+            bool: True если текст распознан
+        """
+        from services.ocr_layout import OCRLayout
+
+        if job.page_number is not None:
+            return OCRQueue.run_page_job(job)
+
+        document = db.session.get(Document, job.document_id)
+
+        if document is None:
+            job.status = "failed"
+            job.error = "Документ не найден"
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            return False
+
+        document.ocr_status = "processing"
+        document.ocr_pages_done = 0
+        db.session.commit()
+
+        started = time.perf_counter()
+        pages = 0
+
+        try:
+            if not os.path.exists(document.file_path):
+                raise FileNotFoundError("Файл не найден")
+
+            content = OCRQueue.extract_document_content(document)
+            text = content["text"]
+
+            if text and text.strip():
+                # Страницы из текстового слоя PDF не распознавались
+                pages = content["ocr_pages"]
+                OCRLayout.save_for(document.id, content["layout"])
+                document.ocr_text = text
+                document.content = text
+                document.ocr_status = "completed"
+                document.ocr_error = None
+                job.status = "completed"
+                logger.info(
+                    f"OCR завершен: doc_id={document.id}, {len(text)} символов"
+                )
+            else:
+                document.ocr_status = "failed"
+                document.ocr_error = "Текст не найден"
+                job.status = "failed"
+                job.error = document.ocr_error
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Ошибка OCR задания {job.id}: {e}", exc_info=True)
+            document.ocr_status = "failed"
+            document.ocr_error = str(e)
+            job.status = "failed"
+            job.error = str(e)
+
+        job.finished_at = datetime.utcnow()
+
+        # Дневная статистика - в той же транзакции, что и результат
+        StatsService.record_daily(
+            db.session.connection(),
+            document.user_id,
+            ocr_pages=pages,
+            ocr_seconds=round(time.perf_counter() - started, 3),
+            ocr_failures=0 if job.status == "completed" else 1,
+        )
+        db.session.commit()
+
+        return job.status == "completed"
+
+    @staticmethod
+    def run_page_job(job: OCRJob) -> bool:
+        """
+        Распознает страницу многостраничной съемки. Текст документа
+        собирается, когда распознана последняя страница законченной съемки
+        (CaptureSessionService.try_assemble).
+
+        Args:
+            job: захваченное задание страницы
+
+        Returns:
+            bool: True если страница распознана
+        """
+        from services.capture_sessions import CaptureSessionService
+
+        document = db.session.get(Document, job.document_id)
+
+        if document is None:
+            job.status = "failed"
+            job.error = "Документ не найден"
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            return False
+
+        started = time.perf_counter()
+
+        try:
+            CaptureSessionService.recognize_page(document.id, job.page_number)
+            job.status = "completed"
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Ошибка OCR задания {job.id}: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+
+        job.finished_at = datetime.utcnow()
+
+        # Страницы распознаются параллельно - счетчик увеличивается в базе.
+        # Нераспознанные страницы не считаются (capture_status сообщает
+        # о них отдельно)
+        if job.status == "completed":
+            Document.query.filter_by(id=document.id).update(
+                {"ocr_pages_done": Document.ocr_pages_done + 1},
+                synchronize_session=False,
+            )
+        StatsService.record_daily(
+            db.session.connection(),
+            document.user_id,
+            ocr_pages=1 if job.status == "completed" else 0,
+            ocr_seconds=round(time.perf_counter() - started, 3),
+            ocr_failures=0 if job.status == "completed" else 1,
+        )
+        db.session.commit()
+
+        CaptureSessionService.try_assemble(document.id)
+        return job.status == "completed"
+
+
+class OCRWorker:
+    """
+    Фоновый обработчик очереди OCR.
+    Периодически забирает задания из базы данных и выполняет их.
+    """
+
+    def __init__(self, app, poll_interval: Optional[float] = None):
+        """
+        Инициализация обработчика.
+
+        Args:
+            app: экземпляр Flask приложения
+            poll_interval: интервал опроса очереди в секундах
+        """
+        self.app = app
+        self.poll_interval = poll_interval or app.config["OCR_WORKER_POLL_INTERVAL"]
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def run(self):
+        """
+        Основной цикл обработчика. Работает до вызова stop().
+        """
+        logger.info(f"OCR обработчик запущен: {self.worker_id}")
+
+        # Зависшие задания ищутся при запуске и затем периодически: задание
+        # обработчика, который аварийно завершился и был перезапущен раньше
+        # OCR_JOB_TIMEOUT, иначе осталось бы в обработке навсегда
+        next_requeue = 0.0
+
+        # Просроченные загрузки и съемки уже обработаны при создании
+        # приложения - следующая проверка через интервал
+        next_expire = time.monotonic() + self.app.config["SESSION_EXPIRE_INTERVAL"]
+
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    if time.monotonic() >= next_requeue:
+                        OCRQueue.requeue_stale(
+                            self.app.config["OCR_JOB_TIMEOUT"],
+                            self.app.config["OCR_JOB_MAX_ATTEMPTS"],
+                        )
+                        next_requeue = (
+                            time.monotonic() + self.app.config["OCR_REQUEUE_INTERVAL"]
+                        )
+
+                    job = OCRQueue.claim_next(self.worker_id)
+                    if job is not None:
+                        OCRQueue.run_job(job)
+                        continue
+
+                    # Очередь пуста - удаляем брошенные загрузки и съемки
+                    if time.monotonic() >= next_expire:
+                        next_expire = (
+                            time.monotonic()
+                            + self.app.config["SESSION_EXPIRE_INTERVAL"]
+                        )
+                        self._expire_sessions()
+            except Exception as e:
+                logger.error(f"Ошибка обработчика OCR: {e}", exc_info=True)
+
+            self._stop_event.wait(self.poll_interval)
+
+        logger.info(f"OCR обработчик остановлен: {self.worker_id}")
+
+    @staticmethod
+    def _expire_sessions():
+        """
+        Удаляет брошенные загрузки по частям (файлы частей до
+        UPLOAD_RESUMABLE_MAX_SIZE каждый) и завершает брошенные съемки.
+        """
+        from services.upload_sessions import UploadSessionService
+        from services.capture_sessions import CaptureSessionService
+
+        UploadSessionService.expire()
+        CaptureSessionService.expire()
+
+    def start(self):
+        """
+        Запускает обработчик в фоновом потоке.
+        """
+        self._thread = threading.Thread(
+            target=self.run, name="ocr-worker", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Останавливает обработчик после завершения текущего задания.
+        """
+        self._stop_event.set()
+
+
+def start_background_worker(app) -> Optional[OCRWorker]:
+    """
+    Запускает обработчик очереди OCR в потоке веб-приложения,
+    если это разрешено конфигурацией (OCR_WORKER_MODE = 'thread').
+
+    Args:
+        app: экземпляр Flask приложения
+
+    Returns:
+        OCRWorker или None
+    """
+    if app.testing or app.config["OCR_WORKER_MODE"] != "thread":
+        return None
+
+    worker = OCRWorker(app)
+    worker.start()
+    app.extensions["ocr_worker"] = worker
+    return worker
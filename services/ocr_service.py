@@ -20,9 +20,15 @@ def get_ocr_reader():
     if _ocr_reader is None:
         try:
             import easyocr
+            from services.ocr_pool import get_ocr_settings
+
+            # Те же языки, что у процессов пула и в ключе кэша OCR
+            settings = get_ocr_settings()
 
             logger.info("Инициализация EasyOCR...")
-            _ocr_reader = easyocr.Reader(["ru", "en"], gpu=False)
+            _ocr_reader = easyocr.Reader(
+                settings["OCR_LANGUAGES"], gpu=settings["OCR_GPU"]
+            )
             logger.info("✓ EasyOCR готов")
         except Exception as e:
             logger.error(f"Ошибка инициализации EasyOCR: {e}")
@@ -30,33 +36,191 @@ def get_ocr_reader():
     return _ocr_reader
 
 
+def compose_text(boxes, words) -> str:
+    """
+    Собирает текст из распознанных слов: слова группируются в строки
+    по вертикальному положению рамок и упорядочиваются слева направо
+
+    Args:
+        boxes: рамки слов (4 точки [x, y])
+        words: распознанные слова
+
+    Returns:
+        str: текст, строки разделены переводом строки
+    """
+    items = []
+    for box, word in zip(boxes, words):
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        items.append((min(ys), max(ys), min(xs), word))
+
+    lines = []
+    for top, bottom, left, word in sorted(items):
+        center = (top + bottom) / 2
+        line = lines[-1] if lines else None
+
+        # Слово в той же строке, если его центр попадает в высоту строки
+        if line and line["top"] <= center <= line["bottom"]:
+            line["words"].append((left, word))
+            line["bottom"] = max(line["bottom"], bottom)
+        else:
+            lines.append({"top": top, "bottom": bottom, "words": [(left, word)]})
+
+    return "\n".join(
+        " ".join(word for _, word in sorted(line["words"])) for line in lines
+    )
+
+
+def _build_result(raw) -> dict:
+    """
+    Приводит результат EasyOCR (detail=1) к виду,
+    пригодному для кэша и передачи между процессами
+    """
+    boxes = [
+        [[int(round(float(x))), int(round(float(y)))] for x, y in box]
+        for box, _, _ in raw
+    ]
+    words = [str(word) for _, word, _ in raw]
+    confidences = [round(float(conf), 4) for _, _, conf in raw]
+
+    return {
+        "text": compose_text(boxes, words),
+        "words": words,
+        "boxes": boxes,
+        "confidences": confidences,
+    }
+
+
+def recognize_image(reader, image, batch_size=1) -> dict:
+    """
+    Распознает одно изображение
+
+    Args:
+        reader: EasyOCR Reader
+        image: путь к изображению или numpy массив
+        batch_size: сколько областей текста распознавать за один проход
+
+    Returns:
+        dict: text - текст, words - слова, boxes - рамки слов,
+            confidences - уверенность по словам (0..1)
+    """
+    raw = reader.readtext(image, detail=1, paragraph=False, batch_size=batch_size)
+    return _build_result(raw)
+
+
+def recognize_images(reader, images, batch_size=1) -> list:
+    """
+    Распознает несколько изображений.
+    Изображения одного размера (обычно страницы одного PDF) проходят
+    через детектор одним пакетом (readtext_batched). Распознаватель
+    EasyOCR вызывается для каждой страницы отдельно: области текста
+    разных страниц в один проход не объединяются
+
+    Args:
+        reader: EasyOCR Reader
+        images: список путей к изображениям или numpy массивов
+        batch_size: сколько областей текста одной страницы распознавать
+            за один проход
+
+    Returns:
+        list: результаты в порядке входных изображений (см. recognize_image)
+    """
+    results = [None] * len(images)
+
+    # Пакетный детектор требует одинаковый размер изображений
+    groups = {}
+    for index, image in enumerate(images):
+        key = image.shape if hasattr(image, "shape") else ("path", index)
+        groups.setdefault(key, []).append(index)
+
+    for indexes in groups.values():
+        if len(indexes) == 1:
+            index = indexes[0]
+            results[index] = recognize_image(reader, images[index], batch_size)
+            continue
+
+        raw_results = reader.readtext_batched(
+            [images[index] for index in indexes],
+            detail=1,
+            paragraph=False,
+            batch_size=batch_size,
+        )
+        for index, raw in zip(indexes, raw_results):
+            results[index] = _build_result(raw)
+
+    return results
+
+
 class OCRService:
     """Сервис для распознавания текста (совместимость со старым кодом)"""
 
+    @staticmethod
+    def submit(image):
+        """
+        Отправляет изображение на распознавание с учетом кэша OCR.
+        Изображения собираются в пакеты (см. OCRBatcher) и распознаются
+        пулом процессов OCR или Reader текущего процесса
+
+        Args:
+            image: путь к изображению, PIL Image или numpy массив
+
+        Returns:
+            Future с результатом распознавания (см. recognize_image)
+        """
+        from concurrent.futures import Future
+        from services.ocr_batcher import get_ocr_batcher
+        from services.ocr_cache import get_ocr_cache
+
+        if isinstance(image, Image.Image):
+            image = np.array(image)
+
+        cache = get_ocr_cache()
+        if cache is None:
+            return get_ocr_batcher().submit(image)
+
+        key = cache.make_key(image)
+        result = cache.get(key)
+        if result is not None:
+            future = Future()
+            future.set_result(result)
+            return future
+
+        future = get_ocr_batcher().submit(image)
+
+        def store(done):
+            if not done.cancelled() and done.exception() is None:
+                cache.put(key, done.result())
+
+        future.add_done_callback(store)
+        return future
+
+    @staticmethod
+    def recognize(image):
+        """
+        Распознает изображение (см. OCRService.submit) и ждет результат
+
+        Args:
+            image: путь к изображению, PIL Image или numpy массив
+
+        Returns:
+            dict: результат распознавания (см. recognize_image)
+        """
+        return OCRService.submit(image).result()
+
     @staticmethod
     def extract_text(image_path, languages=["ru", "en"]):
         """
         Извлекает текст из изображения
 
         Args:
-            image_path: путь к изображению или PIL Image
+            image_path: путь к изображению, PIL Image или numpy массив
             languages: языки (не используется, EasyOCR использует ['ru', 'en'])
 
         Returns:
             str: распознанный текст
         """
         try:
-            reader = get_ocr_reader()
-
-            # Если PIL Image
-            if isinstance(image_path, Image.Image):
-                img_array = np.array(image_path)
-                result = reader.readtext(img_array, detail=0, paragraph=True)
-            else:
-                # Если путь
-                result = reader.readtext(image_path, detail=0, paragraph=True)
-
-            text = "\n".join(result)
+            text = OCRService.recognize(image_path)["text"]
             logger.info(f"OCR: извлечено {len(text)} символов")
             return text
 
@@ -77,38 +241,53 @@ class OCRService:
             dict: результаты OCR
         """
         try:
-            reader = get_ocr_reader()
+            image = OCRService.prepare_image(image_path, preprocess)
+            return OCRService.summarize(OCRService.recognize(image))
 
-            if preprocess:
-                image = Image.open(image_path)
-                image = OCRService.enhance_image(image)
-                img_array = np.array(image)
-            else:
-                img_array = image_path
+        except Exception as e:
+            logger.error(f"Ошибка обработки: {e}")
+            return {"text": "", "confidence": 0, "language": "unknown"}
 
-            # OCR с уверенностью
-            result = reader.readtext(img_array, detail=1)
+    @staticmethod
+    def prepare_image(image_path, preprocess=True):
+        """
+        Подготавливает изображение к распознаванию
 
-            texts = []
-            confidences = []
+        Args:
+            image_path: путь к изображению
+            preprocess: применять ли улучшения
 
-            for bbox, text, conf in result:
-                texts.append(text)
-                confidences.append(conf)
+        Returns:
+            numpy массив или исходный путь (без предобработки)
+        """
+        if not preprocess:
+            return image_path
 
-            avg_confidence = (
-                sum(confidences) / len(confidences) * 100 if confidences else 0
-            )
+        image = Image.open(image_path)
+        image = OCRService.enhance_image(image)
+        return np.array(image)
 
-            return {
-                "text": "\n".join(texts),
-                "confidence": round(avg_confidence, 2),
-                "language": "mixed",
-            }
+    @staticmethod
+    def summarize(result):
+        """
+        Формирует ответ process_image из результата распознавания
 
-        except Exception as e:
-            logger.error(f"Ошибка обработки: {e}")
-            return {"text": "", "confidence": 0, "language": "unknown"}
+        Args:
+            result: результат распознавания (см. recognize_image)
+
+        Returns:
+            dict: текст, средняя уверенность (%), язык
+        """
+        confidences = result["confidences"]
+        avg_confidence = (
+            sum(confidences) / len(confidences) * 100 if confidences else 0
+        )
+
+        return {
+            "text": result["text"],
+            "confidence": round(avg_confidence, 2),
+            "language": "mixed",
+        }
 
     @staticmethod
     def enhance_image(image):
@@ -132,11 +311,34 @@ class OCRService:
 
     @staticmethod
     def batch_ocr(image_paths):
-        """Массовое распознавание"""
+        """
+        Массовое распознавание
+        Все изображения отправляются сразу и распознаются пакетами
+        (см. OCRBatcher), результаты возвращаются в исходном порядке
+
+        Args:
+            image_paths: пути к изображениям
+
+        Returns:
+            list: результаты OCR (см. process_image)
+        """
+        futures = []
+        for path in image_paths:
+            try:
+                futures.append(OCRService.submit(OCRService.prepare_image(path)))
+            except Exception as e:
+                logger.error(f"Ошибка обработки {path}: {e}")
+                futures.append(None)
+
         results = []
-        for i, path in enumerate(image_paths):
-            logger.info(f"OCR {i+1}/{len(image_paths)}")
-            result = OCRService.process_image(path)
+        for i, future in enumerate(futures):
+            logger.info(f"OCR {i+1}/{len(futures)}")
+            result = {"text": "", "confidence": 0, "language": "unknown"}
+            if future is not None:
+                try:
+                    result = OCRService.summarize(future.result())
+                except Exception as e:
+                    logger.error(f"Ошибка обработки: {e}")
             results.append(result)
         return results
 
@@ -4,22 +4,117 @@
 """
 
 import os
-import io
+import queue
 import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
 import fitz  # PyMuPDF
+import numpy as np
 from PIL import Image
 from services.ocr_service import OCRService
 
 logger = logging.getLogger(__name__)
 
 
+def _prefetch(generator, lookahead):
+    """
+    Выполняет генератор в фоновом потоке, опережая потребителя
+    не более чем на lookahead элементов.
+
+    Args:
+        generator: исходный генератор
+        lookahead: максимальное количество готовых элементов в очереди
+
+    Yields:
+        элементы исходного генератора
+    """
+    buffer = queue.Queue(maxsize=lookahead)
+    stop_event = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in generator:
+                # Ждем места в очереди, пока потребитель не остановился
+                while not stop_event.is_set():
+                    try:
+                        buffer.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop_event.is_set():
+                    break
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            generator.close()
+            buffer.put(done)
+
+    thread = threading.Thread(target=produce, name="pdf-prefetch", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop_event.set()
+        # Освобождаем место, если поток ждет в put()
+        while thread.is_alive():
+            try:
+                buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
 class PDFService:
     """Сервис для обработки PDF документов"""
 
+    @staticmethod
+    def iter_pdf_images(
+        pdf_path, dpi=300, page_numbers=None, lookahead=0, grayscale=False
+    ):
+        """
+        Рендерит страницы PDF по одной (генератор).
+        В памяти одновременно находятся только текущая страница
+        и не более lookahead подготовленных заранее
+
+        Args:
+            pdf_path: путь к PDF файлу
+            dpi: качество изображений (default 300)
+            page_numbers: номера страниц (с 0), по умолчанию - все
+            lookahead: сколько страниц рендерить заранее в фоновом потоке
+                (0 - рендерить по запросу)
+            grayscale: рендерить в оттенках серого
+
+        Yields:
+            tuple: (номер страницы, numpy.ndarray изображения)
+        """
+
+        def render():
+            pdf = fitz.open(pdf_path)
+            try:
+                numbers = range(len(pdf)) if page_numbers is None else page_numbers
+                for page_number in numbers:
+                    yield page_number, PDFService.render_page(
+                        pdf, page_number, dpi, grayscale
+                    )
+            finally:
+                pdf.close()
+
+        if lookahead > 0:
+            return _prefetch(render(), lookahead)
+        return render()
+
     @staticmethod
     def pdf_to_images(pdf_path, dpi=300):
         """
         Конвертирует PDF в изображения (БЕЗ Poppler)
+        Держит в памяти все страницы - для OCR используйте iter_pdf_images
 
         Args:
             pdf_path: путь к PDF файлу
@@ -31,24 +126,10 @@ class PDFService:
         images = []
 
         try:
-            pdf = fitz.open(pdf_path)
-            zoom = dpi / 72  # 72 DPI - стандарт PDF
-            matrix = fitz.Matrix(zoom, zoom)
-
-            logger.info(f"Конвертирую PDF: {len(pdf)} страниц...")
-
-            for page_num in range(len(pdf)):
-                page = pdf[page_num]
-                pix = page.get_pixmap(matrix=matrix)
-
-                # Конвертируем в PIL Image
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                images.append(img)
+            for page_number, image in PDFService.iter_pdf_images(pdf_path, dpi):
+                images.append(Image.fromarray(image))
+                logger.info(f"Страница {page_number + 1} конвертирована")
 
-                logger.info(f"Страница {page_num + 1}/{len(pdf)} конвертирована")
-
-            pdf.close()
             logger.info(f"✓ PDF конвертирован: {len(images)} страниц")
 
         except Exception as e:
@@ -57,51 +138,311 @@ class PDFService:
         return images
 
     @staticmethod
-    def extract_text_from_pdf(pdf_path):
+    def pixmap_to_array(pix):
         """
-        Извлекает текст из PDF
-        Сначала пробует текстовый слой, потом OCR
+        Оборачивает пиксели PyMuPDF pixmap в numpy массив без кодирования в PNG
 
         Args:
-            pdf_path: путь к PDF файлу
+            pix: fitz.Pixmap без альфа-канала
 
         Returns:
-            str: извлеченный текст
+            numpy.ndarray: (высота, ширина) для оттенков серого
+                или (высота, ширина, каналы) для цветного изображения
         """
-        try:
-            # Пробуем извлечь текст напрямую
-            pdf = fitz.open(pdf_path)
-            text = ""
+        # pix.samples - единственное копирование из буфера MuPDF;
+        # samples_mv не держит ссылку на pixmap, поэтому массив на нем небезопасен
+        array = np.frombuffer(pix.samples, dtype=np.uint8)
 
-            for page in pdf:
-                text += page.get_text()
+        if pix.n == 1:
+            return array.reshape(pix.height, pix.width)
+        return array.reshape(pix.height, pix.width, pix.n)
 
-            pdf.close()
+    @staticmethod
+    def render_page(pdf, page_number, dpi=300, grayscale=False):
+        """
+        Рендерит одну страницу PDF в изображение для OCR
 
-            # Если есть текст - возвращаем
-            if text.strip():
-                logger.info(f"Текст извлечен напрямую: {len(text)} символов")
-                return text
+        Args:
+            pdf: открытый PDF документ (fitz.Document)
+            page_number: номер страницы (с 0)
+            dpi: качество изображения
+            grayscale: рендерить в оттенках серого (OCR не нужен цвет,
+                а объем данных втрое меньше)
 
-            # Иначе используем OCR
-            logger.info("Текстовый слой не найден, запускаю OCR...")
-            images = PDFService.pdf_to_images(pdf_path)
+        Returns:
+            numpy.ndarray: изображение страницы
+        """
+        zoom = dpi / 72  # 72 DPI - стандарт PDF
+        colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        pix = pdf[page_number].get_pixmap(
+            matrix=fitz.Matrix(zoom, zoom), colorspace=colorspace, alpha=False
+        )
 
-            all_text = []
-            for i, img in enumerate(images):
-                logger.info(f"OCR страницы {i + 1}/{len(images)}...")
-                page_text = OCRService.extract_text(img)
-                all_text.append(page_text)
+        return PDFService.pixmap_to_array(pix)
 
-            final_text = "\n\n".join(all_text)
-            logger.info(f"✓ OCR завершен: {len(final_text)} символов")
+    @staticmethod
+    def ocr_pages(
+        pdf_path,
+        page_numbers,
+        dpi=300,
+        progress_callback=None,
+        lookahead=2,
+        grayscale=True,
+    ):
+        """
+        Распознает страницы PDF потоково, не загружая все страницы в память.
+        Страницы распознаются пакетами по OCR_BATCH_PAGES (см. OCRBatcher).
+        Если доступен пул процессов OCR, пакеты страниц рендерятся и
+        распознаются в процессах пула параллельно, иначе следующая страница
+        рендерится в фоне, пока распознаются текущие. Результаты собираются
+        в порядке страниц
 
-            return final_text
+        Args:
+            pdf_path: путь к PDF файлу
+            page_numbers: номера страниц (с 0)
+            dpi: качество рендеринга
+            progress_callback: функция (обработано_страниц, всего_страниц)
+            lookahead: сколько страниц рендерить заранее (без пула)
+            grayscale: рендерить страницы в оттенках серого
+
+        Returns:
+            list: результаты распознавания страниц в порядке page_numbers
+                (см. recognize_image)
+        """
+        from services.ocr_pool import get_ocr_pool
+
+        total = len(page_numbers)
+        results = {}
+        done = 0
+        pool = get_ocr_pool()
+        batch_pages = max(1, PDFService._get_setting("OCR_BATCH_PAGES", 4))
+
+        if pool is not None:
+            # Пакет не больше, чем нужно, чтобы занять все процессы пула
+            chunk = max(1, min(batch_pages, -(-total // pool.workers)))
+            max_in_flight = pool.workers * chunk * 2
+
+            def submit_pages():
+                for start in range(0, total, chunk):
+                    group = page_numbers[start : start + chunk]
+                    futures = pool.submit_pdf_pages(pdf_path, group, dpi, grayscale)
+                    yield from zip(group, futures)
+
+        else:
+            max_in_flight = batch_pages + lookahead
+
+            def submit_pages():
+                pages = PDFService.iter_pdf_images(
+                    pdf_path,
+                    dpi,
+                    page_numbers,
+                    lookahead=lookahead,
+                    grayscale=grayscale,
+                )
+                for page_number, image in pages:
+                    yield page_number, OCRService.submit(image)
+
+        pending_pages = submit_pages()
+        in_flight = {}
+
+        while True:
+            # Добираем задания до лимита одновременно обрабатываемых страниц
+            for page_number, future in pending_pages:
+                in_flight[future] = page_number
+                if len(in_flight) >= max_in_flight:
+                    break
+
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                page_number = in_flight.pop(future)
+                try:
+                    results[page_number] = future.result()
+                except Exception as e:
+                    logger.error(f"Ошибка OCR страницы {page_number + 1}: {e}")
+                    results[page_number] = {
+                        "text": "",
+                        "words": [],
+                        "boxes": [],
+                        "confidences": [],
+                    }
+
+                done += 1
+                logger.info(f"OCR страниц: {done}/{total}")
+                if progress_callback:
+                    progress_callback(done, total)
+
+        return [results[page_number] for page_number in page_numbers]
+
+    @staticmethod
+    def classify_page(page, min_text_chars=30, image_coverage_threshold=0.5):
+        """
+        Определяет, нужен ли странице OCR
+
+        Args:
+            page: страница PDF (fitz.Page)
+            min_text_chars: минимум символов, чтобы считать текстовый слой полезным
+            image_coverage_threshold: доля площади страницы под изображениями,
+                начиная с которой страница считается сканом
+
+        Returns:
+            tuple: (тип страницы, текст текстового слоя), где тип:
+                'text' - достаточно текстового слоя,
+                'image' - текстового слоя нет, нужен OCR,
+                'mixed' - есть и текст, и крупные изображения, нужен OCR
+        """
+        text = page.get_text()
+        page_area = abs(page.rect) or 1
+
+        # Доля страницы, занятая изображениями (пересечения не учитываются)
+        image_area = 0
+        for image_info in page.get_image_info():
+            image_rect = fitz.Rect(image_info["bbox"]) & page.rect
+            image_area += abs(image_rect)
+        image_coverage = min(1.0, image_area / page_area)
+
+        if len(text.strip()) < min_text_chars:
+            return "image", text
+        if image_coverage >= image_coverage_threshold:
+            return "mixed", text
+        return "text", text
+
+    @staticmethod
+    def extract_text_from_pdf(pdf_path, progress_callback=None):
+        """
+        Извлекает текст из PDF (см. extract_pdf_content)
+
+        Args:
+            pdf_path: путь к PDF файлу
+            progress_callback: функция (обработано_страниц, всего_страниц)
+
+        Returns:
+            str: извлеченный текст
+        """
+        try:
+            return PDFService.extract_pdf_content(pdf_path, progress_callback)["text"]
 
         except Exception as e:
             logger.error(f"Ошибка обработки PDF: {e}")
             return ""
 
+    @staticmethod
+    def extract_pdf_content(pdf_path, progress_callback=None):
+        """
+        Извлекает текст и разметку слов из PDF
+        Для каждой страницы отдельно: текстовый слой, если его достаточно,
+        иначе OCR. Так смешанные PDF (цифровая обложка + сканы) распознаются
+        полностью, а страницы с текстом не распознаются повторно.
+        Смешанные страницы (текст поверх скана) распознаются целиком
+
+        Args:
+            pdf_path: путь к PDF файлу
+            progress_callback: функция (обработано_страниц, всего_страниц)
+
+        Returns:
+            dict: text - извлеченный текст,
+                layout - страницы разметки в точках PDF (см. make_layout_page),
+                ocr_pages - сколько страниц распознано OCR (остальные
+                    взяты из текстового слоя)
+        """
+        from services.ocr_layout import make_layout_page
+
+        min_text_chars = PDFService._get_setting("PDF_TEXT_MIN_CHARS", 30)
+        coverage_threshold = PDFService._get_setting(
+            "PDF_IMAGE_COVERAGE_THRESHOLD", 0.5
+        )
+        dpi = PDFService._get_setting("PDF_TO_IMAGE_DPI", 300)
+
+        # Классифицируем страницы и забираем текстовый слой
+        pdf = fitz.open(pdf_path)
+        page_count = len(pdf)
+        page_texts = []
+        layout = []
+        ocr_page_numbers = []
+
+        try:
+            for page_number, page in enumerate(pdf):
+                page_type, text = PDFService.classify_page(
+                    page, min_text_chars, coverage_threshold
+                )
+                page_texts.append(text)
+
+                # Слова текстового слоя: (x0, y0, x1, y1, слово, ...)
+                words = page.get_text("words")
+                layout.append(
+                    make_layout_page(
+                        page.rect.width,
+                        page.rect.height,
+                        [word[4] for word in words],
+                        [word[:4] for word in words],
+                    )
+                )
+
+                if page_type != "text":
+                    ocr_page_numbers.append(page_number)
+        finally:
+            pdf.close()
+
+        text_pages = page_count - len(ocr_page_numbers)
+        logger.info(
+            f"PDF: {page_count} страниц, из них текстовых {text_pages}, "
+            f"для OCR {len(ocr_page_numbers)}"
+        )
+
+        if progress_callback:
+            progress_callback(text_pages, page_count)
+
+        if ocr_page_numbers:
+
+            def ocr_progress(done, total):
+                if progress_callback:
+                    progress_callback(text_pages + done, page_count)
+
+            ocr_results = PDFService.ocr_pages(
+                pdf_path,
+                ocr_page_numbers,
+                dpi=dpi,
+                progress_callback=ocr_progress,
+                lookahead=PDFService._get_setting("PDF_RENDER_LOOKAHEAD", 2),
+                grayscale=PDFService._get_setting("PDF_OCR_GRAYSCALE", True),
+            )
+
+            for page_number, result in zip(ocr_page_numbers, ocr_results):
+                # Если OCR ничего не нашел, оставляем то, что есть в текстовом слое
+                if result["text"].strip():
+                    page_texts[page_number] = result["text"]
+                    page_size = layout[page_number]
+                    layout[page_number] = make_layout_page(
+                        page_size["width"],
+                        page_size["height"],
+                        result["words"],
+                        result["boxes"],
+                        result["confidences"],
+                        scale=72 / dpi,
+                    )
+
+        final_text = "\n\n".join(
+            page_text.strip() for page_text in page_texts if page_text.strip()
+        )
+        logger.info(f"✓ Текст PDF извлечен: {len(final_text)} символов")
+
+        return {
+            "text": final_text,
+            "layout": layout,
+            "ocr_pages": len(ocr_page_numbers),
+        }
+
+    @staticmethod
+    def _get_setting(name, default):
+        """Возвращает настройку обработки PDF из конфигурации приложения."""
+        from flask import current_app, has_app_context
+
+        if has_app_context():
+            return current_app.config.get(name, default)
+        return default
+
     @staticmethod
     def get_pdf_info(pdf_path):
         """
@@ -204,11 +545,10 @@ class PDFService:
             # Рендерим в небольшое изображение
             zoom = 0.5  # Меньше чем обычно для миниатюры
             matrix = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=matrix)
+            pix = page.get_pixmap(matrix=matrix, alpha=False)
 
-            # Конвертируем в PIL
-            img_data = pix.tobytes("png")
-            img = Image.open(io.BytesIO(img_data))
+            # Конвертируем в PIL напрямую из пикселей (без PNG)
+            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
 
             # Создаем миниатюру
             img.thumbnail(size, Image.Resampling.LANCZOS)
@@ -0,0 +1,689 @@
+# services/search_service.py
+"""
+Полнотекстовый поиск документов.
+В SQLite используется виртуальная таблица FTS5 documents_fts
+(название, описание, содержимое, текст OCR, теги) с ранжированием bm25.
+Индекс обновляется событиями модели Document в той же транзакции,
+что и сам документ. Для других СУБД используется поиск через LIKE.
+
+Текст в индексе и запросы проходят одинаковую обработку: нижний регистр,
+ё -> е и стемминг (русский/английский, snowballstemmer), поэтому
+"договора" находит "договор", а "ёлка" - "елка".
+
+Нечеткий поиск (для текста с ошибками OCR) использует словарь слов
+из содержимого и текста OCR с индексом триграмм: слова запроса
+сопоставляются с похожими словами словаря по доле общих триграмм,
+а документы с этими словами находятся через FTS5.
+"""
+
+import re
+import logging
+from functools import lru_cache
+
+from sqlalchemy import bindparam, event, inspect, text, Float, Integer
+
+from models import db
+from models.document import Document
+
+logger = logging.getLogger(__name__)
+
+# Индексируемые поля документа (в порядке колонок documents_fts)
+INDEXED_FIELDS = ("title", "description", "content", "ocr_text", "tags")
+
+# Веса полей для bm25: совпадение в названии важнее, чем в тексте
+FIELD_WEIGHTS = (10.0, 3.0, 1.0, 1.0, 5.0)
+
+# Поля, слова которых попадают в словарь нечеткого поиска
+FUZZY_FIELDS = ("content", "ocr_text")
+
+# Версия обработки текста в индексе (при изменении индекс перестраивается)
+INDEX_VERSION = 3
+
+# Слова короче не добавляются в словарь (в запросе ищутся по префиксу)
+MIN_FUZZY_WORD_LENGTH = 3
+
+# Сколько параметров передавать в одном запросе IN (...)
+_SQL_CHUNK = 500
+
+# Слова (буквы и цифры)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Кириллица в слове - русский стеммер, иначе английский
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Стеммеры (None - snowballstemmer не установлен, стемминг не выполняется)
+_stemmers = None
+
+
+def _get_stemmers():
+    """Создает стеммеры при первом обращении."""
+    global _stemmers
+
+    if _stemmers is None:
+        try:
+            import snowballstemmer
+
+            _stemmers = {
+                "ru": snowballstemmer.stemmer("russian"),
+                "en": snowballstemmer.stemmer("english"),
+            }
+        except ImportError:
+            logger.warning("snowballstemmer не установлен, поиск без стемминга")
+            _stemmers = {}
+
+    return _stemmers
+
+
+@lru_cache(maxsize=100000)
+def normalize_word(word: str) -> str:
+    """
+    Приводит слово к форме, в которой оно хранится в индексе.
+
+    Args:
+        word: слово
+
+    Returns:
+        str: нормализованное слово (основа)
+    """
+    word = word.lower().replace("ё", "е")
+
+    if word.isdigit():
+        return word
+
+    stemmers = _get_stemmers()
+    stemmer = stemmers.get("ru" if _CYRILLIC_RE.search(word) else "en")
+    if stemmer is None:
+        return word
+
+    return stemmer.stemWord(word)
+
+
+def analyze(text_value: str) -> list:
+    """
+    Разбивает текст на слова и нормализует их.
+
+    Args:
+        text_value: текст
+
+    Returns:
+        list: нормализованные слова
+    """
+    if not text_value:
+        return []
+    return [normalize_word(token) for token in _TOKEN_RE.findall(text_value)]
+
+
+def trigrams(word: str) -> set:
+    """
+    Возвращает триграммы слова (как в pg_trgm: слово дополняется
+    двумя пробелами в начале и одним в конце).
+
+    Args:
+        word: нормализованное слово
+
+    Returns:
+        set: триграммы
+    """
+    padded = f"  {word} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _chunks(items: list, size: int = _SQL_CHUNK):
+    """Разбивает список на части для запросов IN (...)."""
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class SearchIndex:
+    """Полнотекстовый индекс документов (SQLite FTS5)"""
+
+    TABLE = "documents_fts"
+    META_TABLE = "search_index_meta"
+    TERMS_TABLE = "search_terms"
+    TRIGRAMS_TABLE = "search_term_trigrams"
+
+    @staticmethod
+    def is_enabled(connection=None) -> bool:
+        """
+        Проверяет, используется ли индекс FTS5 (только для SQLite).
+
+        Args:
+            connection: соединение (по умолчанию - движок приложения)
+
+        Returns:
+            bool
+        """
+        bind = connection if connection is not None else db.engine
+        return bind.dialect.name == "sqlite"
+
+    @staticmethod
+    def create_index() -> bool:
+        """
+        Создает таблицу индекса, если ее нет, и заполняет ее документами.
+        Вызывается при запуске приложения после db.create_all().
+
+        Индекс также перестраивается, если изменилась обработка текста
+        (INDEX_VERSION).
+
+        Returns:
+            bool: True если индекс был создан или перестроен
+        """
+        if not SearchIndex.is_enabled():
+            return False
+
+        with db.engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {SearchIndex.META_TABLE} "
+                    "(name VARCHAR(64) PRIMARY KEY, version INTEGER NOT NULL)"
+                )
+            )
+
+            columns = ", ".join(INDEXED_FIELDS)
+            connection.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SearchIndex.TABLE} "
+                    f"USING fts5({columns}, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            )
+
+            # Словарь нечеткого поиска и его индекс триграмм
+            connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {SearchIndex.TERMS_TABLE} "
+                    "(id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, "
+                    "trigram_count INTEGER NOT NULL)"
+                )
+            )
+            connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {SearchIndex.TRIGRAMS_TABLE} "
+                    "(trigram TEXT NOT NULL, term_id INTEGER NOT NULL, "
+                    "PRIMARY KEY (trigram, term_id)) WITHOUT ROWID"
+                )
+            )
+
+            version = connection.execute(
+                text(
+                    f"SELECT version FROM {SearchIndex.META_TABLE} "
+                    "WHERE name = :name"
+                ),
+                {"name": SearchIndex.TABLE},
+            ).scalar()
+
+        if version == INDEX_VERSION:
+            return False
+
+        count = SearchIndex.rebuild()
+        logger.info(f"Поисковый индекс перестроен: {count} документов")
+        return True
+
+    @staticmethod
+    def index_values(document: Document) -> dict:
+        """
+        Возвращает значения индексируемых полей документа.
+
+        Args:
+            document: документ
+
+        Returns:
+            dict: поле -> нормализованный текст (см. analyze)
+        """
+        return {
+            field: " ".join(analyze(getattr(document, field)))
+            for field in INDEXED_FIELDS
+        }
+
+    @staticmethod
+    def index_document(connection, document: Document):
+        """
+        Добавляет или обновляет документ в индексе.
+
+        Args:
+            connection: соединение текущей транзакции
+            document: документ
+        """
+        SearchIndex.remove_document(connection, document.id)
+
+        columns = ", ".join(INDEXED_FIELDS)
+        params = ", ".join(f":{field}" for field in INDEXED_FIELDS)
+        connection.execute(
+            text(
+                f"INSERT INTO {SearchIndex.TABLE} (rowid, {columns}) "
+                f"VALUES (:id, {params})"
+            ),
+            {"id": document.id, **SearchIndex.index_values(document)},
+        )
+
+        SearchIndex.add_terms(connection, SearchIndex.fuzzy_terms(document))
+
+    @staticmethod
+    def fuzzy_terms(document: Document) -> set:
+        """
+        Возвращает слова документа для словаря нечеткого поиска.
+
+        Args:
+            document: документ
+
+        Returns:
+            set: нормализованные слова содержимого и текста OCR
+        """
+        terms = set()
+        for field in FUZZY_FIELDS:
+            terms.update(analyze(getattr(document, field)))
+        return {term for term in terms if len(term) >= MIN_FUZZY_WORD_LENGTH}
+
+    @staticmethod
+    def add_terms(connection, terms: set):
+        """
+        Добавляет в словарь новые слова и их триграммы.
+        Слова из словаря не удаляются: слово, которого больше нет
+        в документах, просто ничего не находит.
+
+        Args:
+            connection: соединение текущей транзакции
+            terms: нормализованные слова
+        """
+        if not terms:
+            return
+
+        select_ids = text(
+            f"SELECT id, term FROM {SearchIndex.TERMS_TABLE} WHERE term IN :terms"
+        ).bindparams(bindparam("terms", expanding=True))
+
+        terms = list(terms)
+        existing = set()
+        for chunk in _chunks(terms):
+            existing.update(
+                term for _, term in connection.execute(select_ids, {"terms": chunk})
+            )
+
+        new_terms = [term for term in terms if term not in existing]
+        if not new_terms:
+            return
+
+        term_trigrams = {term: trigrams(term) for term in new_terms}
+        connection.execute(
+            text(
+                f"INSERT OR IGNORE INTO {SearchIndex.TERMS_TABLE} "
+                "(term, trigram_count) VALUES (:term, :trigram_count)"
+            ),
+            [
+                {"term": term, "trigram_count": len(grams)}
+                for term, grams in term_trigrams.items()
+            ],
+        )
+
+        rows = []
+        for chunk in _chunks(new_terms):
+            for term_id, term in connection.execute(select_ids, {"terms": chunk}):
+                rows.extend(
+                    {"trigram": gram, "term_id": term_id}
+                    for gram in term_trigrams[term]
+                )
+
+        connection.execute(
+            text(
+                f"INSERT OR IGNORE INTO {SearchIndex.TRIGRAMS_TABLE} "
+                "(trigram, term_id) VALUES (:trigram, :term_id)"
+            ),
+            rows,
+        )
+
+    @staticmethod
+    def remove_document(connection, document_id: int):
+        """
+        Удаляет документ из индекса.
+
+        Args:
+            connection: соединение текущей транзакции
+            document_id: ID документа
+        """
+        connection.execute(
+            text(f"DELETE FROM {SearchIndex.TABLE} WHERE rowid = :id"),
+            {"id": document_id},
+        )
+
+    @staticmethod
+    def rebuild(batch_size: int = 500) -> int:
+        """
+        Полностью перестраивает индекс по таблице документов.
+
+        Args:
+            batch_size: сколько документов загружать за раз
+
+        Returns:
+            int: количество проиндексированных документов
+        """
+        if not SearchIndex.is_enabled():
+            return 0
+
+        # Документы читаются через сессию, поэтому индекс пишется
+        # в той же транзакции (SQLite не даст записать из второго соединения)
+        connection = db.session.connection()
+        connection.execute(text(f"DELETE FROM {SearchIndex.TABLE}"))
+        connection.execute(text(f"DELETE FROM {SearchIndex.TRIGRAMS_TABLE}"))
+        connection.execute(text(f"DELETE FROM {SearchIndex.TERMS_TABLE}"))
+
+        count = 0
+        last_id = 0
+        while True:
+            documents = (
+                Document.query.filter(Document.id > last_id)
+                .order_by(Document.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not documents:
+                break
+
+            for document in documents:
+                SearchIndex.index_document(connection, document)
+
+            count += len(documents)
+            last_id = documents[-1].id
+            db.session.expunge_all()
+
+        connection.execute(
+            text(
+                f"INSERT OR REPLACE INTO {SearchIndex.META_TABLE} (name, version) "
+                "VALUES (:name, :version)"
+            ),
+            {"name": SearchIndex.TABLE, "version": INDEX_VERSION},
+        )
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def build_match_query(query: str) -> str:
+        """
+        Преобразует строку поиска в запрос FTS5.
+        Слова нормализуются так же, как текст в индексе, и ищутся
+        по префиксу основы; все слова должны встретиться в документе.
+        Спецсимволы FTS5 из запроса не передаются.
+
+        Args:
+            query: строка поиска пользователя
+
+        Returns:
+            str: выражение MATCH (пустое, если слов нет)
+        """
+        return " ".join(f'"{token}"*' for token in analyze(query))
+
+    @staticmethod
+    def ranked_matches(query: str):
+        """
+        Возвращает подзапрос (document_id, rank) найденных документов.
+        Чем меньше rank, тем релевантнее документ.
+
+        Args:
+            query: строка поиска пользователя
+
+        Returns:
+            Подзапрос SQLAlchemy или None, если в запросе нет слов
+        """
+        match = SearchIndex.build_match_query(query)
+        if not match:
+            return None
+
+        weights = ", ".join(str(weight) for weight in FIELD_WEIGHTS)
+        return (
+            text(
+                f"SELECT rowid AS document_id, "
+                f"bm25({SearchIndex.TABLE}, {weights}) AS rank "
+                f"FROM {SearchIndex.TABLE} WHERE {SearchIndex.TABLE} MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(document_id=Integer, rank=Float)
+            .subquery("search_matches")
+        )
+
+    @staticmethod
+    def similar_terms(word: str, threshold: float, limit: int) -> list:
+        """
+        Находит в словаре слова, похожие на слово запроса.
+        Сходство - доля общих триграмм: общие / (триграммы слова запроса +
+        триграммы слова словаря - общие). Считается по индексу триграмм,
+        без перебора документов.
+
+        Args:
+            word: нормализованное слово запроса
+            threshold: минимальное сходство (0..1)
+            limit: сколько самых похожих слов вернуть
+
+        Returns:
+            list: пары (слово, сходство) по убыванию сходства
+        """
+        grams = trigrams(word)
+        count = len(grams)
+
+        # Сходство не может достичь порога, если число триграмм слова
+        # словаря вне [count * threshold, count / threshold]
+        statement = text(
+            f"SELECT t.term, COUNT(*) AS shared, t.trigram_count "
+            f"FROM {SearchIndex.TRIGRAMS_TABLE} g "
+            f"JOIN {SearchIndex.TERMS_TABLE} t ON t.id = g.term_id "
+            "WHERE g.trigram IN :grams "
+            "AND t.trigram_count BETWEEN :min_count AND :max_count "
+            "GROUP BY g.term_id "
+            "HAVING COUNT(*) >= :min_shared"
+        ).bindparams(bindparam("grams", expanding=True))
+
+        rows = db.session.execute(
+            statement,
+            {
+                "grams": sorted(grams),
+                "min_count": int(count * threshold),
+                "max_count": count / threshold if threshold > 0 else 1e9,
+                "min_shared": max(1, int(count * threshold)),
+            },
+        )
+
+        matches = []
+        for term, shared, term_count in rows:
+            similarity = shared / (count + term_count - shared)
+            if similarity >= threshold:
+                matches.append((term, similarity))
+
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches[:limit]
+
+    @staticmethod
+    def fuzzy_search(
+        query: str,
+        user_id: int = None,
+        threshold: float = None,
+        limit: int = None,
+    ) -> list:
+        """
+        Нечеткий поиск по содержимому и тексту OCR.
+        Каждое слово запроса заменяется похожими словами словаря;
+        документ должен содержать похожее слово для каждого слова запроса.
+        Оценка документа - среднее сходство лучших совпадений.
+
+        Args:
+            query: строка поиска пользователя
+            user_id: искать только среди документов пользователя (не в архиве)
+            threshold: минимальное сходство (по умолчанию SEARCH_FUZZY_THRESHOLD)
+            limit: максимум документов (по умолчанию SEARCH_FUZZY_MAX_RESULTS)
+
+        Returns:
+            list: словари {document_id, score, terms} по убыванию оценки
+        """
+        from flask import current_app
+
+        config = current_app.config
+        if threshold is None:
+            threshold = config["SEARCH_FUZZY_THRESHOLD"]
+        if limit is None:
+            limit = config["SEARCH_FUZZY_MAX_RESULTS"]
+
+        words = list(dict.fromkeys(analyze(query)))
+        if not words:
+            return []
+
+        columns = " ".join(FUZZY_FIELDS)
+        statement = f"SELECT f.rowid FROM {SearchIndex.TABLE} f"
+        params = {}
+        if user_id is not None:
+            statement += (
+                " JOIN documents d ON d.id = f.rowid"
+                " AND d.user_id = :user_id AND d.is_archived = 0"
+            )
+            params["user_id"] = user_id
+        statement = text(f"{statement} WHERE {SearchIndex.TABLE} MATCH :match")
+
+        # document_id -> {слово запроса: (сходство, найденное слово)}
+        found = None
+        for word in words:
+            if len(word) < MIN_FUZZY_WORD_LENGTH:
+                candidates = [(word, 1.0)]
+                prefix = "*"
+            else:
+                candidates = SearchIndex.similar_terms(
+                    word, threshold, config["SEARCH_FUZZY_TERMS"]
+                )
+                prefix = ""
+
+            word_matches = {}
+            for term, similarity in candidates:
+                match = f'{{{columns}}} : "{term}"{prefix}'
+                for (document_id,) in db.session.execute(
+                    statement, {**params, "match": match}
+                ):
+                    best = word_matches.get(document_id)
+                    if best is None or similarity > best[0]:
+                        word_matches[document_id] = (similarity, term)
+
+            if found is None:
+                found = {
+                    document_id: {word: match}
+                    for document_id, match in word_matches.items()
+                }
+            else:
+                found = {
+                    document_id: {**matches, word: word_matches[document_id]}
+                    for document_id, matches in found.items()
+                    if document_id in word_matches
+                }
+
+            if not found:
+                return []
+
+        results = [
+            {
+                "document_id": document_id,
+                "score": sum(similarity for similarity, _ in matches.values())
+                / len(words),
+                "terms": sorted({term for _, term in matches.values()}),
+            }
+            for document_id, matches in found.items()
+        ]
+        results.sort(key=lambda result: (-result["score"], -result["document_id"]))
+        return results[:limit]
+
+    @staticmethod
+    def fuzzy_matches(query: str, user_id: int = None):
+        """
+        Возвращает результаты нечеткого поиска как подзапрос
+        (document_id, rank), аналогично ranked_matches.
+
+        Args:
+            query: строка поиска пользователя
+            user_id: ID пользователя
+
+        Returns:
+            Подзапрос SQLAlchemy или None, если ничего не найдено
+        """
+        results = SearchIndex.fuzzy_search(query, user_id=user_id)
+        if not results:
+            return None
+
+        rows = ", ".join(f"(:id{i}, :rank{i})" for i in range(len(results)))
+        params = {}
+        for i, result in enumerate(results):
+            params[f"id{i}"] = result["document_id"]
+            params[f"rank{i}"] = -result["score"]
+
+        return (
+            text(
+                "SELECT column1 AS document_id, column2 AS rank "
+                f"FROM (VALUES {rows})"
+            )
+            .bindparams(**params)
+            .columns(document_id=Integer, rank=Float)
+            .subquery("fuzzy_matches")
+        )
+
+    @staticmethod
+    def apply(
+        query,
+        search_query: str,
+        order_by_rank: bool = True,
+        fuzzy: bool = False,
+        user_id: int = None,
+    ):
+        """
+        Добавляет полнотекстовый поиск к запросу документов.
+
+        Args:
+            query: запрос Document.query
+            search_query: строка поиска пользователя
+            order_by_rank: сортировать ли результаты по релевантности
+            fuzzy: нечеткий поиск (допускает ошибки распознавания)
+            user_id: ID пользователя для нечеткого поиска (отбор до
+                ограничения числа результатов)
+
+        Returns:
+            Запрос с условием поиска
+        """
+        if not SearchIndex.is_enabled():
+            return query.filter(
+                db.or_(
+                    Document.title.contains(search_query),
+                    Document.content.contains(search_query),
+                    Document.description.contains(search_query),
+                    Document.ocr_text.contains(search_query),
+                    Document.tags.contains(search_query),
+                )
+            )
+
+        if fuzzy:
+            matches = SearchIndex.fuzzy_matches(search_query, user_id=user_id)
+        else:
+            matches = SearchIndex.ranked_matches(search_query)
+        if matches is None:
+            return query.filter(db.false())
+
+        query = query.join(matches, matches.c.document_id == Document.id)
+        if order_by_rank:
+            query = query.order_by(matches.c.rank)
+        return query
+
+
+def _indexed_fields_changed(document: Document) -> bool:
+    """Проверяет, изменилось ли хотя бы одно индексируемое поле."""
+    state = inspect(document)
+    return any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS)
+
+
+@event.listens_for(Document, "after_insert")
+def _index_after_insert(mapper, connection, document):
+    """Добавляет новый документ в индекс."""
+    if SearchIndex.is_enabled(connection):
+        SearchIndex.index_document(connection, document)
+
+
+@event.listens_for(Document, "after_update")
+def _index_after_update(mapper, connection, document):
+    """Переиндексирует документ, если изменился его текст или метаданные."""
+    if SearchIndex.is_enabled(connection) and _indexed_fields_changed(document):
+        SearchIndex.index_document(connection, document)
+
+
+@event.listens_for(Document, "after_delete")
+def _index_after_delete(mapper, connection, document):
+    """Удаляет документ из индекса."""
+    if SearchIndex.is_enabled(connection):
+        SearchIndex.remove_document(connection, document.id)
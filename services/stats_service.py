@@ -0,0 +1,410 @@
+# services/stats_service.py
+"""
+Статистика системы для панели администратора.
+Показатели считаются двумя запросами: агрегаты по пользователям
+(количество документов и размер берутся из счетчиков пользователей,
+без чтения таблицы документов) и группировка документов по статусу OCR
+по индексу. Результат кэшируется в процессе на ADMIN_STATS_TTL секунд.
+
+Дневная статистика (таблица daily_stats) пополняется при загрузке
+документов и выполнении OCR и используется для графиков за любой период.
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, event, func, inspect
+
+from models import db
+from models.user import User
+from models.document import Document, track_previous_values
+from models.folder import Folder
+from models.daily_stat import DailyStat
+from models.ocr_job import OCRJob
+
+logger = logging.getLogger(__name__)
+
+# Статусы OCR, которые показываются в статистике
+OCR_STATUSES = ("pending", "processing", "completed", "failed")
+
+# Максимальный период дневной статистики (дней)
+MAX_DAILY_PERIOD = 730
+
+# Кэш: ключ -> (время истечения, значение)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(key: str, compute, force: bool = False):
+    """
+    Возвращает значение из кэша или вычисляет его.
+
+    Args:
+        key: ключ кэша
+        compute: функция без аргументов, вычисляющая значение
+        force: вычислить заново, даже если значение в кэше не устарело
+
+    Returns:
+        Значение
+    """
+    now = time.monotonic()
+
+    if not force:
+        with _cache_lock:
+            entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+    value = compute()
+    ttl = current_app.config["ADMIN_STATS_TTL"]
+    with _cache_lock:
+        _cache[key] = (now + ttl, value)
+    return value
+
+
+class StatsService:
+    """Сервис статистики системы"""
+
+    @staticmethod
+    def get_system_stats(force: bool = False) -> dict:
+        """
+        Возвращает общую статистику системы (с кэшированием).
+
+        Args:
+            force: пересчитать, не используя кэш
+
+        Returns:
+            dict: показатели (пользователи, документы, хранилище, OCR)
+        """
+        return _cached("system", StatsService._compute_system_stats, force)
+
+    @staticmethod
+    def _compute_system_stats() -> dict:
+        """Вычисляет общую статистику системы."""
+        started = time.perf_counter()
+        since = datetime.utcnow() - timedelta(days=30)
+
+        # Агрегаты по пользователям и их счетчикам документов,
+        # количество папок и новых документов - подзапросами
+        folders_count = (
+            db.session.query(func.count(Folder.id)).scalar_subquery()
+        )
+        new_documents = (
+            db.session.query(func.count(Document.id))
+            .filter(Document.created_at >= since)
+            .scalar_subquery()
+        )
+        row = db.session.query(
+            func.count(User.id),
+            func.sum(case((User.is_active.is_(True), 1), else_=0)),
+            func.sum(case((User.is_admin.is_(True), 1), else_=0)),
+            func.sum(case((User.created_at >= since, 1), else_=0)),
+            func.sum(User.document_count),
+            func.sum(User.total_size),
+            folders_count,
+            new_documents,
+        ).one()
+
+        # Документы по статусам OCR (по индексу ix_documents_ocr_status)
+        ocr_counts = dict(
+            db.session.query(Document.ocr_status, func.count(Document.id))
+            .group_by(Document.ocr_status)
+            .all()
+        )
+
+        stats = {
+            "total_users": row[0] or 0,
+            "active_users": row[1] or 0,
+            "admin_users": row[2] or 0,
+            "new_users_30d": row[3] or 0,
+            "total_documents": row[4] or 0,
+            "total_storage": row[5] or 0,
+            "total_folders": row[6] or 0,
+            "new_documents_30d": row[7] or 0,
+            "computed_at": datetime.utcnow(),
+        }
+        for status in OCR_STATUSES:
+            stats[f"ocr_{status}"] = ocr_counts.get(status, 0)
+
+        logger.debug(
+            f"Статистика системы вычислена за "
+            f"{(time.perf_counter() - started) * 1000:.1f} мс"
+        )
+        return stats
+
+    @staticmethod
+    def get_top_users(limit: int = 5) -> list:
+        """
+        Возвращает пользователей с наибольшим количеством документов.
+
+        Args:
+            limit: сколько пользователей вернуть
+
+        Returns:
+            list: пары (пользователь, количество документов)
+        """
+        users = (
+            User.query.filter(User.document_count > 0)
+            .order_by(User.document_count.desc(), User.id)
+            .limit(limit)
+            .all()
+        )
+        return [(user, user.document_count) for user in users]
+
+    @staticmethod
+    def invalidate():
+        """Сбрасывает кэш статистики."""
+        with _cache_lock:
+            _cache.clear()
+
+    # === ДНЕВНАЯ СТАТИСТИКА ===
+
+    @staticmethod
+    def record_daily(connection, user_id: int, day=None, **increments):
+        """
+        Увеличивает показатели пользователя за день (одним INSERT ... ON
+        CONFLICT DO UPDATE для SQLite и PostgreSQL).
+
+        Args:
+            connection: соединение текущей транзакции
+            user_id: ID пользователя
+            day: день (по умолчанию - сегодня, UTC)
+            **increments: приращения показателей (см. DailyStat.COUNTERS)
+        """
+        unknown = set(increments) - set(DailyStat.COUNTERS)
+        if unknown:
+            raise ValueError(f"Неизвестные показатели: {', '.join(sorted(unknown))}")
+
+        table = DailyStat.__table__
+        key = {"day": day or datetime.utcnow().date(), "user_id": user_id}
+        values = {name: increments.get(name, 0) for name in DailyStat.COUNTERS}
+
+        dialect_name = connection.dialect.name
+        if dialect_name in ("sqlite", "postgresql"):
+            if dialect_name == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            statement = insert(table).values(**key, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=["day", "user_id"],
+                set_={
+                    name: table.c[name] + statement.excluded[name]
+                    for name in increments
+                },
+            )
+            connection.execute(statement)
+            return
+
+        # Другие СУБД: обновление, а если строки еще нет - вставка
+        result = connection.execute(
+            table.update()
+            .where(table.c.day == key["day"], table.c.user_id == user_id)
+            .values(
+                {name: table.c[name] + value for name, value in increments.items()}
+            )
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**key, **values))
+
+    @staticmethod
+    def _period_start(days: int):
+        """Первый день периода из days дней, включая сегодня."""
+        days = max(1, min(days, MAX_DAILY_PERIOD))
+        return datetime.utcnow().date() - timedelta(days=days - 1), days
+
+    @staticmethod
+    def get_daily_series(days: int = 30, user_id: int = None) -> dict:
+        """
+        Возвращает показатели по дням за период (дни без событий - нули).
+
+        Args:
+            days: длина периода в днях (включая сегодня)
+            user_id: только для пользователя (None - по всем)
+
+        Returns:
+            dict: days - даты ISO, и по списку значений на каждый показатель
+        """
+        start, days = StatsService._period_start(days)
+
+        query = db.session.query(
+            DailyStat.day,
+            *(func.sum(getattr(DailyStat, name)) for name in DailyStat.COUNTERS),
+        ).filter(DailyStat.day >= start)
+        if user_id is not None:
+            query = query.filter(DailyStat.user_id == user_id)
+
+        rows = {row[0]: row[1:] for row in query.group_by(DailyStat.day).all()}
+
+        series = {"days": []}
+        series.update({name: [] for name in DailyStat.COUNTERS})
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            values = rows.get(day, (0,) * len(DailyStat.COUNTERS))
+            series["days"].append(day.isoformat())
+            for name, value in zip(DailyStat.COUNTERS, values):
+                value = value or 0
+                series[name].append(
+                    round(value, 2) if name == "ocr_seconds" else int(value)
+                )
+
+        return series
+
+    @staticmethod
+    def get_daily_by_user(days: int = 30, limit: int = 10) -> list:
+        """
+        Возвращает суммарные показатели пользователей за период.
+
+        Args:
+            days: длина периода в днях (включая сегодня)
+            limit: сколько пользователей вернуть (по количеству загрузок)
+
+        Returns:
+            list: словари с user_id, username и показателями
+        """
+        start, _ = StatsService._period_start(days)
+
+        totals = [
+            func.sum(getattr(DailyStat, name)).label(name)
+            for name in DailyStat.COUNTERS
+        ]
+        rows = (
+            db.session.query(DailyStat.user_id, User.username, *totals)
+            .outerjoin(User, User.id == DailyStat.user_id)
+            .filter(DailyStat.day >= start)
+            .group_by(DailyStat.user_id, User.username)
+            .order_by(func.sum(DailyStat.uploads).desc(), DailyStat.user_id)
+            .limit(limit)
+            .all()
+        )
+
+        return [
+            {
+                "user_id": row.user_id,
+                "username": row.username,
+                **{
+                    name: round(getattr(row, name) or 0, 2)
+                    for name in DailyStat.COUNTERS
+                },
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def rebuild_daily() -> int:
+        """
+        Пересчитывает дневную статистику по документам и заданиям OCR
+        (для существующих баз). Время OCR берется из времени начала
+        и завершения заданий.
+
+        Returns:
+            int: количество строк статистики
+        """
+        totals = {}
+
+        def add(user_id, day, **increments):
+            row = totals.setdefault(
+                (day, user_id), {name: 0 for name in DailyStat.COUNTERS}
+            )
+            for name, value in increments.items():
+                row[name] += value
+
+        documents = db.session.query(
+            Document.user_id, Document.created_at, Document.file_size
+        ).yield_per(1000)
+        for user_id, created_at, file_size in documents:
+            add(user_id, created_at.date(), uploads=1, upload_bytes=file_size or 0)
+
+        jobs = (
+            db.session.query(
+                Document.user_id,
+                Document.page_count,
+                OCRJob.status,
+                OCRJob.started_at,
+                OCRJob.finished_at,
+            )
+            .join(Document, Document.id == OCRJob.document_id)
+            .filter(
+                OCRJob.finished_at.isnot(None),
+                OCRJob.status.in_(["completed", "failed"]),
+            )
+            .yield_per(1000)
+        )
+        for user_id, page_count, status, started_at, finished_at in jobs:
+            seconds = (
+                (finished_at - started_at).total_seconds() if started_at else 0.0
+            )
+            if status == "completed":
+                increments = {"ocr_pages": page_count or 1}
+            else:
+                increments = {"ocr_failures": 1}
+            add(user_id, finished_at.date(), ocr_seconds=seconds, **increments)
+
+        DailyStat.query.delete()
+        db.session.bulk_insert_mappings(
+            DailyStat,
+            [
+                {"day": day, "user_id": user_id, **values}
+                for (day, user_id), values in totals.items()
+            ],
+        )
+        db.session.commit()
+
+        logger.info(f"Дневная статистика пересчитана: {len(totals)} строк")
+        return len(totals)
+
+    @staticmethod
+    def daily_stats_missing() -> bool:
+        """
+        Проверяет, что дневная статистика пуста, а документы уже есть
+        (база создана до появления статистики).
+
+        Returns:
+            bool
+        """
+        has_stats = db.session.query(DailyStat.id).limit(1).first() is not None
+        if has_stats:
+            return False
+        return db.session.query(Document.id).limit(1).first() is not None
+
+
+@event.listens_for(Document, "after_insert")
+def _record_upload(mapper, connection, document):
+    """Учитывает загрузку документа в дневной статистике."""
+    day = document.created_at.date() if document.created_at else None
+    StatsService.record_daily(
+        connection,
+        document.user_id,
+        day=day,
+        uploads=1,
+        upload_bytes=document.file_size or 0,
+    )
+
+
+# Прежний file_size нужен _record_upload_size
+track_previous_values()
+
+
+@event.listens_for(Document, "after_update")
+def _record_upload_size(mapper, connection, document):
+    """
+    Учитывает размер файла, который стал известен после создания
+    документа (съемка камерой, загрузка по частям). Прежнее значение
+    загружается перед присваиванием (track_previous_values).
+    """
+    history = inspect(document).attrs.file_size.history
+    if not history.has_changes():
+        return
+
+    old_size = (history.deleted[0] if history.deleted else None) or 0
+    new_size = (history.added[0] if history.added else None) or 0
+    if new_size != old_size:
+        # Байты относятся к дню загрузки, как и в _record_upload
+        day = document.created_at.date() if document.created_at else None
+        StatsService.record_daily(
+            connection, document.user_id, day=day, upload_bytes=new_size - old_size
+        )
@@ -0,0 +1,212 @@
+# services/upload_ingest.py
+"""
+Прием загружаемых файлов потоком.
+Werkzeug при разборе multipart-запроса пишет каждый файл в объект,
+который возвращает Request._get_file_stream. IngestRequest возвращает
+IngestFile - временный файл в хранилище (BLOB_FOLDER/tmp), который во время
+записи считает SHA-256 и размер и проверяет сигнатуру файла по первым
+байтам. Слишком большой файл или файл, содержимое которого не совпадает
+с расширением, отклоняется сразу, не дожидаясь конца запроса.
+
+После разбора запроса BlobStore.store_upload переименовывает временный
+файл в хранилище - без повторного копирования.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+from typing import Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+from utils.helpers import format_file_size
+
+logger = logging.getLogger(__name__)
+
+# Сигнатуры (первые байты) поддерживаемых форматов
+FILE_SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "gif": (b"GIF87a", b"GIF89a"),
+    "bmp": (b"BM",),
+    "tiff": (b"II*\x00", b"MM\x00*"),
+}
+
+# Расширения с тем же форматом
+EXTENSION_ALIASES = {"jpeg": "jpg", "tif": "tiff"}
+
+# Сколько первых байтов нужно для определения формата
+HEADER_SIZE = max(len(s) for signatures in FILE_SIGNATURES.values() for s in signatures)
+
+
+def detect_file_type(header: bytes) -> Optional[str]:
+    """
+    Определяет формат файла по первым байтам.
+
+    Args:
+        header: первые байты файла (не меньше HEADER_SIZE, если файл не короче)
+
+    Returns:
+        str: формат (ключ FILE_SIGNATURES) или None
+    """
+    for file_type, signatures in FILE_SIGNATURES.items():
+        if any(header.startswith(signature) for signature in signatures):
+            return file_type
+    return None
+
+
+def expected_file_type(filename: Optional[str]) -> Optional[str]:
+    """
+    Возвращает формат, который должен быть у файла с таким именем.
+
+    Args:
+        filename: имя файла
+
+    Returns:
+        str или None, если формат по расширению не проверяется
+    """
+    if not filename or "." not in filename:
+        return None
+    extension = filename.rsplit(".", 1)[1].lower()
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    return extension if extension in FILE_SIGNATURES else None
+
+
+class IngestFile:
+    """
+    Временный файл загрузки: SHA-256, размер и формат считаются при записи.
+    Если файл не забран в хранилище (claim), он удаляется при закрытии.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        max_size: Optional[int] = None,
+        expected_type: Optional[str] = None,
+    ):
+        """
+        Args:
+            folder: папка временных файлов
+            max_size: максимальный размер файла в байтах (None - без ограничения)
+            expected_type: формат, которому должно соответствовать содержимое
+        """
+        os.makedirs(folder, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(
+            dir=folder, prefix="upload_", delete=False
+        )
+        self.name = self._file.name
+        self.max_size = max_size
+        self.expected_type = expected_type
+        self.size = 0
+        self.file_type = None
+        self._digest = hashlib.sha256()
+        self._header = b""
+        self._claimed = False
+
+    def write(self, data: bytes) -> int:
+        """
+        Записывает блок данных.
+
+        Raises:
+            RequestEntityTooLarge: файл больше max_size
+            UnsupportedMediaType: содержимое не соответствует расширению
+        """
+        if self.max_size is not None and self.size + len(data) > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(
+                f"Файл больше {format_file_size(self.max_size)}"
+            )
+
+        if len(self._header) < HEADER_SIZE:
+            self._header += data[: HEADER_SIZE - len(self._header)]
+            if len(self._header) >= HEADER_SIZE:
+                self._check_type()
+
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def _check_type(self):
+        """Определяет формат по первым байтам и сверяет с ожидаемым."""
+        self.file_type = detect_file_type(self._header)
+        if self.expected_type and self.file_type != self.expected_type:
+            self.discard()
+            raise UnsupportedMediaType(
+                "Содержимое файла не соответствует расширению "
+                f".{self.expected_type}"
+            )
+
+    def finish(self):
+        """
+        Завершает запись (проверяет формат короткого файла) и закрывает файл.
+        """
+        if self.file_type is None:
+            self._check_type()
+        self._file.close()
+
+    def hexdigest(self) -> str:
+        """SHA-256 записанных данных."""
+        return self._digest.hexdigest()
+
+    def claim(self):
+        """Отмечает, что файл перенесен в хранилище и удалять его не нужно."""
+        self._claimed = True
+
+    def discard(self):
+        """Закрывает и удаляет временный файл."""
+        self._file.close()
+        self._claimed = True
+        try:
+            os.remove(self.name)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        """Закрывает файл (незабранный файл удаляется)."""
+        if self._claimed:
+            self._file.close()
+        else:
+            self.discard()
+
+    # Чтение, перемотка и прочее - у временного файла
+    def __getattr__(self, name):
+        if name == "_file":
+            raise AttributeError(name)
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class IngestRequest(Request):
+    """
+    Запрос, файлы которого сразу пишутся в хранилище (см. IngestFile).
+    """
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        """
+        Возвращает объект, в который Werkzeug пишет файл из запроса.
+
+        Raises:
+            RequestEntityTooLarge: объявленный размер файла больше допустимого
+        """
+        max_size = current_app.config["UPLOAD_MAX_FILE_SIZE"]
+        if max_size is not None and content_length and content_length > max_size:
+            raise RequestEntityTooLarge()
+
+        expected_type = None
+        if current_app.config["UPLOAD_CHECK_SIGNATURE"]:
+            expected_type = expected_file_type(filename)
+
+        from services.blob_store import BlobStore
+
+        return IngestFile(
+            BlobStore.temp_folder(),
+            max_size=max_size,
+            expected_type=expected_type,
+        )
@@ -0,0 +1,489 @@
+# services/upload_sessions.py
+"""
+Загрузка больших файлов по частям с продолжением после обрыва.
+
+Протокол (маршруты в routes/scanner.py):
+    POST   /scanner/uploads                 - начать загрузку (имя, размер)
+    PUT    /scanner/uploads/<id>            - часть файла, заголовок
+                                              Upload-Offset - смещение части,
+                                              X-Chunk-SHA256 - хэш части
+    GET    /scanner/uploads/<id>            - сколько байтов уже принято
+    POST   /scanner/uploads/<id>/finalize   - завершить и создать документ
+    DELETE /scanner/uploads/<id>            - отменить
+
+Части дописываются в файл UPLOAD_SESSION_FOLDER/<id>.part. При завершении
+файл переносится в хранилище (BlobStore) без копирования. Сеансы без
+активности дольше UPLOAD_SESSION_TTL удаляются вместе с файлами
+(UploadSessionService.expire, команда flask expire-uploads).
+"""
+
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import and_, or_
+from werkzeug.utils import secure_filename
+
+from models import db
+from models.blob import Blob
+from models.upload_session import UploadSession
+from services.blob_store import BlobStore
+from services.upload_ingest import HEADER_SIZE, detect_file_type, expected_file_type
+from utils.helpers import format_file_size
+
+logger = logging.getLogger(__name__)
+
+# Часть, прием которой не закончен за это время (сек), считается брошенной
+# (обрыв соединения или сбой процесса) - смещение можно захватить снова
+RECEIVING_TIMEOUT = 10 * 60
+
+
+class UploadError(Exception):
+    """
+    Ошибка загрузки по частям.
+
+    Attributes:
+        status: HTTP статус ответа
+        offset: текущее смещение сеанса (для ответа клиенту)
+    """
+
+    def __init__(self, message: str, status: int = 400, offset: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.offset = offset
+
+
+class UploadSessionService:
+    """Сервис загрузки файлов по частям"""
+
+    @staticmethod
+    def part_path(session: UploadSession) -> str:
+        """Путь к файлу принятых частей."""
+        return os.path.join(
+            current_app.config["UPLOAD_SESSION_FOLDER"], f"{session.id}.part"
+        )
+
+    @staticmethod
+    def _extend(session: UploadSession):
+        """Продлевает срок сеанса."""
+        session.expires_at = datetime.utcnow() + timedelta(
+            seconds=current_app.config["UPLOAD_SESSION_TTL"]
+        )
+
+    @staticmethod
+    def create(
+        user_id: int,
+        filename: str,
+        size: int,
+        mime_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        folder_id: Optional[int] = None,
+        auto_ocr: bool = True,
+    ) -> UploadSession:
+        """
+        Начинает загрузку по частям.
+
+        Args:
+            user_id: ID пользователя
+            filename: имя файла
+            size: полный размер файла в байтах
+            mime_type: MIME тип файла
+            sha256: SHA-256 всего файла (необязательно)
+            title: название документа
+            description: описание документа
+            folder_id: папка документа
+            auto_ocr: распознать текст после загрузки
+
+        Returns:
+            UploadSession
+
+        Raises:
+            UploadError: недопустимый файл или размер
+        """
+        filename = secure_filename(filename or "")
+        file_extension = os.path.splitext(filename)[1].lower()
+        if file_extension.lstrip(".") not in current_app.config["ALLOWED_EXTENSIONS"]:
+            raise UploadError(f"Формат {file_extension or 'файла'} не поддерживается")
+
+        max_size = current_app.config["UPLOAD_RESUMABLE_MAX_SIZE"]
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("Не указан размер файла")
+        if size > max_size:
+            raise UploadError(f"Файл больше {format_file_size(max_size)}", status=413)
+
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user_id,
+            filename=filename,
+            file_extension=file_extension,
+            mime_type=mime_type,
+            total_size=size,
+            sha256=sha256.lower() if sha256 else None,
+            title=title,
+            description=description,
+            folder_id=folder_id,
+            auto_ocr=auto_ocr,
+        )
+        UploadSessionService._extend(session)
+
+        os.makedirs(current_app.config["UPLOAD_SESSION_FOLDER"], exist_ok=True)
+        open(UploadSessionService.part_path(session), "wb").close()
+
+        db.session.add(session)
+        db.session.commit()
+
+        logger.info(
+            f"Загрузка по частям начата: {session.id}, {filename}, {size} байт"
+        )
+        return session
+
+    @staticmethod
+    def get(upload_id: str, user_id: int) -> Optional[UploadSession]:
+        """
+        Возвращает сеанс пользователя, если он не истек.
+
+        Args:
+            upload_id: ID сеанса
+            user_id: ID пользователя
+
+        Returns:
+            UploadSession или None
+        """
+        session = UploadSession.query.filter_by(id=upload_id, user_id=user_id).first()
+        if session is None or session.is_expired():
+            return None
+        return session
+
+    @staticmethod
+    def write_chunk(
+        session: UploadSession, offset: int, stream, checksum: Optional[str] = None
+    ) -> int:
+        """
+        Дописывает часть файла.
+
+        Args:
+            session: активный сеанс
+            offset: смещение части (должно совпадать с принятым размером)
+            stream: поток с данными части
+            checksum: SHA-256 части (hex), если передан клиентом
+
+        Returns:
+            int: новое смещение
+
+        Raises:
+            UploadError: неверное смещение, размер или хэш части
+        """
+        if session.status in ("finalizing", "completed"):
+            raise UploadError("Загрузка уже завершена", status=409)
+        if offset != session.received:
+            raise UploadError(
+                "Неверное смещение части", status=409, offset=session.received
+            )
+
+        # Смещение захватывается до записи в файл: параллельный запрос
+        # с тем же смещением получит 409 и не испортит принятые данные
+        now = datetime.utcnow()
+        claimed = UploadSession.query.filter(
+            UploadSession.id == session.id,
+            UploadSession.received == offset,
+            or_(
+                UploadSession.status == "active",
+                and_(
+                    UploadSession.status == "receiving",
+                    UploadSession.updated_at
+                    < now - timedelta(seconds=RECEIVING_TIMEOUT),
+                ),
+            ),
+        ).update({"status": "receiving", "updated_at": now}, synchronize_session=False)
+        db.session.commit()
+
+        if not claimed:
+            db.session.refresh(session)
+            raise UploadError(
+                "Часть с этим смещением уже принимается",
+                status=409,
+                offset=session.received,
+            )
+
+        try:
+            new_offset = UploadSessionService._write_part(
+                session, offset, stream, checksum
+            )
+        except Exception:
+            db.session.rollback()
+            UploadSession.query.filter_by(id=session.id, status="receiving").update(
+                {"status": "active"}, synchronize_session=False
+            )
+            db.session.commit()
+            raise
+
+        UploadSession.query.filter_by(id=session.id, status="receiving").update(
+            {
+                "status": "active",
+                "received": new_offset,
+                "updated_at": datetime.utcnow(),
+                "expires_at": datetime.utcnow()
+                + timedelta(seconds=current_app.config["UPLOAD_SESSION_TTL"]),
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+        db.session.refresh(session)
+
+        return new_offset
+
+    @staticmethod
+    def _write_part(session: UploadSession, offset: int, stream, checksum) -> int:
+        """
+        Записывает часть в файл частей (смещение уже захвачено write_chunk).
+        При ошибке файл обрезается до offset.
+
+        Returns:
+            int: новое смещение
+
+        Raises:
+            UploadError: неверный размер, хэш или формат части
+        """
+        chunk_size = current_app.config["BLOB_CHUNK_SIZE"]
+        path = UploadSessionService.part_path(session)
+        digest = hashlib.sha256()
+        written = 0
+
+        with open(path, "r+b") as part:
+            part.seek(offset)
+            part.truncate()
+
+            for data in iter(lambda: stream.read(chunk_size), b""):
+                if offset + written + len(data) > session.total_size:
+                    part.truncate(offset)
+                    raise UploadError(
+                        "Часть выходит за объявленный размер файла",
+                        status=413,
+                        offset=offset,
+                    )
+
+                digest.update(data)
+                part.write(data)
+                written += len(data)
+
+            if checksum and digest.hexdigest() != checksum.lower():
+                part.truncate(offset)
+                raise UploadError(
+                    "Контрольная сумма части не совпадает", offset=offset
+                )
+
+            # Формат проверяется, как только приняты первые байты файла
+            header_end = min(HEADER_SIZE, session.total_size)
+            if offset < header_end <= offset + written:
+                part.seek(0)
+                if not UploadSessionService._header_matches(
+                    session, part.read(HEADER_SIZE)
+                ):
+                    part.truncate(0)
+                    raise UploadError(
+                        "Содержимое файла не соответствует расширению "
+                        f"{session.file_extension}",
+                        status=415,
+                        offset=0,
+                    )
+
+        return offset + written
+
+    @staticmethod
+    def _header_matches(session: UploadSession, header: bytes) -> bool:
+        """Сверяет первые байты файла с его расширением."""
+        if not current_app.config["UPLOAD_CHECK_SIGNATURE"]:
+            return True
+
+        expected = expected_file_type(session.filename)
+        return expected is None or detect_file_type(header) == expected
+
+    @staticmethod
+    def finish(session: UploadSession) -> Optional[Blob]:
+        """
+        Захватывает сеанс (статус finalizing), проверяет принятый файл
+        и добавляет его в хранилище. Файл частей остается до коммита:
+        если создать документ не удалось, вызывающий код возвращает сеанс
+        через release и завершение можно повторить. После коммита файл
+        удаляет discard_part. Коммит выполняет вызывающий код (вместе
+        с созданием документа и complete).
+
+        Args:
+            session: сеанс, все части которого приняты
+
+        Returns:
+            Blob или None, если сеанс уже завершен параллельным запросом
+
+        Raises:
+            UploadError: файл принят не полностью, хэш не совпадает
+                или сеанс завершается параллельным запросом
+        """
+        if session.status == "completed":
+            return None
+        if session.received != session.total_size:
+            raise UploadError(
+                "Файл принят не полностью", status=409, offset=session.received
+            )
+
+        # Сеанс захватывается до создания документа: повторный запрос
+        # завершения (или двойное нажатие) не создаст второй документ
+        claimed = UploadSession.query.filter_by(
+            id=session.id, status="active"
+        ).update(
+            {"status": "finalizing", "updated_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.session.commit()
+        db.session.refresh(session)
+
+        if not claimed:
+            if session.status == "completed":
+                return None
+            raise UploadError(
+                "Загрузка уже завершается", status=409, offset=session.received
+            )
+
+        try:
+            return UploadSessionService._store_part(session)
+        except Exception:
+            db.session.rollback()
+            UploadSessionService.release(session)
+            raise
+
+    @staticmethod
+    def _store_part(session: UploadSession) -> Blob:
+        """Проверяет хэш файла частей и добавляет файл в хранилище."""
+        path = UploadSessionService.part_path(session)
+        chunk_size = current_app.config["BLOB_CHUNK_SIZE"]
+        digest = hashlib.sha256()
+        with open(path, "rb") as part:
+            for data in iter(lambda: part.read(chunk_size), b""):
+                digest.update(data)
+        sha256 = digest.hexdigest()
+
+        if session.sha256 and session.sha256 != sha256:
+            raise UploadError("Контрольная сумма файла не совпадает")
+
+        # Жесткая ссылка в папке временных файлов хранилища (та же файловая
+        # система) - хранилище забирает ее без копирования данных
+        temp_path = os.path.join(
+            BlobStore.temp_folder(), f"upload_{session.id}_{uuid.uuid4().hex}"
+        )
+        os.makedirs(BlobStore.temp_folder(), exist_ok=True)
+        try:
+            os.link(path, temp_path)
+        except OSError:
+            shutil.copyfile(path, temp_path)
+
+        try:
+            return BlobStore.add_file(
+                temp_path, sha256, session.total_size, session.file_extension
+            )
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def release(session: UploadSession):
+        """
+        Возвращает захваченный finish сеанс в активные, если документ
+        создать не удалось. Вызывается после отката транзакции.
+
+        Args:
+            session: сеанс
+        """
+        UploadSession.query.filter_by(id=session.id, status="finalizing").update(
+            {"status": "active"}, synchronize_session=False
+        )
+        db.session.commit()
+        db.session.refresh(session)
+
+    @staticmethod
+    def complete(session: UploadSession, document_id: int):
+        """
+        Отмечает сеанс завершенным (повторный запрос завершения вернет
+        тот же документ). Коммит выполняет вызывающий код.
+
+        Args:
+            session: сеанс
+            document_id: ID созданного документа
+        """
+        session.status = "completed"
+        session.document_id = document_id
+        UploadSessionService._extend(session)
+
+    @staticmethod
+    def cancel(session: UploadSession):
+        """
+        Отменяет загрузку и удаляет принятые части.
+
+        Args:
+            session: сеанс
+        """
+        UploadSessionService._remove_part(session)
+        db.session.delete(session)
+        db.session.commit()
+        logger.info(f"Загрузка по частям отменена: {session.id}")
+
+    @staticmethod
+    def discard_part(session: UploadSession):
+        """
+        Удаляет файл частей завершенной загрузки (после коммита документа).
+
+        Args:
+            session: сеанс
+        """
+        UploadSessionService._remove_part(session)
+
+    @staticmethod
+    def _remove_part(session: UploadSession):
+        """Удаляет файл принятых частей, если он есть."""
+        try:
+            os.remove(UploadSessionService.part_path(session))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def expire() -> int:
+        """
+        Удаляет просроченные сеансы, их файлы и файлы частей без сеансов.
+
+        Returns:
+            int: количество удаленных сеансов
+        """
+        expired = UploadSession.query.filter(
+            UploadSession.expires_at <= datetime.utcnow()
+        ).all()
+        for session in expired:
+            UploadSessionService._remove_part(session)
+            db.session.delete(session)
+        db.session.commit()
+
+        # Файлы частей без сеансов (сеанс удален вместе с пользователем
+        # или не был сохранен); свежие файлы не трогаем - сеанс может
+        # создаваться прямо сейчас
+        folder = current_app.config["UPLOAD_SESSION_FOLDER"]
+        if os.path.isdir(folder):
+            known = {
+                f"{upload_id}.part"
+                for (upload_id,) in db.session.query(UploadSession.id)
+            }
+            stale_before = time.time() - current_app.config["UPLOAD_SESSION_TTL"]
+            for filename in os.listdir(folder):
+                path = os.path.join(folder, filename)
+                if filename not in known and os.path.getmtime(path) < stale_before:
+                    os.remove(path)
+
+        if expired:
+            logger.info(f"Удалено просроченных загрузок: {len(expired)}")
+        return len(expired)
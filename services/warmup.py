@@ -0,0 +1,124 @@
+# services/warmup.py
+"""
+Отчет о времени запуска и фоновый прогрев.
+Тяжелые библиотеки (torch/EasyOCR, OpenCV, PyMuPDF) не импортируются
+при создании приложения. Чтобы первое распознавание не ждало их загрузки,
+после запуска сервера они загружаются в фоновом потоке.
+"""
+
+import sys
+import time
+import logging
+import importlib
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Библиотеки, загрузку которых отслеживает отчет о запуске
+HEAVY_MODULES = ("torch", "easyocr", "cv2", "fitz", "numpy", "docx")
+
+# Модули, которые загружаются при прогреве
+WARMUP_MODULES = ("numpy", "fitz", "cv2")
+
+
+def loaded_heavy_modules() -> list:
+    """
+    Возвращает тяжелые библиотеки, уже загруженные в процесс.
+
+    Returns:
+        list: имена модулей
+    """
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def record_startup(app, phases: dict) -> dict:
+    """
+    Сохраняет отчет о времени запуска в app.extensions и пишет его в лог.
+
+    Args:
+        app: экземпляр Flask приложения
+        phases: длительность этапов запуска в секундах
+
+    Returns:
+        dict: отчет о запуске
+    """
+    report = {
+        "phases": {name: round(seconds, 3) for name, seconds in phases.items()},
+        "total": round(sum(phases.values()), 3),
+        "heavy_modules": loaded_heavy_modules(),
+        "warmup": None,
+    }
+    app.extensions["startup_report"] = report
+
+    details = ", ".join(f"{name} {seconds:.2f} с" for name, seconds in phases.items())
+    app.logger.info(f"Приложение готово за {report['total']:.2f} с ({details})")
+
+    if report["heavy_modules"]:
+        app.logger.info(
+            f"При запуске загружены: {', '.join(report['heavy_modules'])}"
+        )
+
+    return report
+
+
+def _warm_up(app, delay: float):
+    """
+    Загружает тяжелые библиотеки и OCR в фоне.
+    Задержка дает серверу начать принимать запросы.
+    """
+    time.sleep(delay)
+    started = time.perf_counter()
+
+    try:
+        for module_name in WARMUP_MODULES:
+            importlib.import_module(module_name)
+
+        with app.app_context():
+            from services.ocr_pool import get_ocr_pool
+            from services.ocr_service import get_ocr_reader
+
+            pool = get_ocr_pool()
+            if pool is not None:
+                pool.warm_up()
+            else:
+                get_ocr_reader()
+
+    except Exception as e:
+        logger.warning(f"Прогрев OCR не выполнен: {e}")
+        return
+
+    elapsed = round(time.perf_counter() - started, 3)
+    report = app.extensions.get("startup_report")
+    if report is not None:
+        report["warmup"] = elapsed
+
+    logger.info(f"✓ Прогрев OCR завершен за {elapsed:.2f} с")
+
+
+def start_warmup(app) -> Optional[threading.Thread]:
+    """
+    Запускает фоновый прогрев, если он включен (OCR_WARMUP) и OCR
+    выполняется в этом процессе (OCR_WORKER_MODE = 'thread').
+
+    Args:
+        app: экземпляр Flask приложения
+
+    Returns:
+        threading.Thread или None
+    """
+    if (
+        app.testing
+        or not app.config["OCR_WARMUP"]
+        or app.config["OCR_WORKER_MODE"] != "thread"
+    ):
+        return None
+
+    thread = threading.Thread(
+        target=_warm_up,
+        args=(app, app.config["OCR_WARMUP_DELAY"]),
+        name="ocr-warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
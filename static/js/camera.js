@@ -11,6 +11,8 @@ const captureBtn = document.getElementById('capture-btn');
 const switchBtn = document.getElementById('switch-camera-btn');
 const retakeBtn = document.getElementById('retake-btn');
 const saveBtn = document.getElementById('save-btn');
+const nextPageBtn = document.getElementById('next-page-btn');
+const pageCounter = document.getElementById('page-counter');
 const titleInput = document.getElementById('document-title');
 const folderSelect = document.getElementById('folder-select');
 
@@ -24,7 +26,10 @@ const previewControls = document.getElementById('preview-controls');
 let stream = null;
 let cameraActive = false;
 let cameraFacing = 'environment'; // 'user' или 'environment'
-let capturedImage = null;
+let capturedImage = null; // JPEG (Blob) для отправки на сервер
+let previewUrl = null;
+let captureId = null; // Многостраничная съемка (см. services/capture_sessions.py)
+let pageCount = 0;
 
 /**
  * Инициализация модуля камеры
@@ -41,6 +46,7 @@ function initCamera() {
     if (switchBtn) switchBtn.addEventListener('click', switchCamera);
     if (retakeBtn) retakeBtn.addEventListener('click', retakePhoto);
     if (saveBtn) saveBtn.addEventListener('click', saveDocument);
+    if (nextPageBtn) nextPageBtn.addEventListener('click', addPage);
 
     // Проверяем доступность камеры
     checkCameraAvailability();
@@ -204,7 +210,7 @@ async function switchCamera() {
 /**
  * Захват фото с УЛУЧШЕНИЕМ качества
  */
-function capturePhoto() {
+async function capturePhoto() {
     if (!cameraActive) {
         showError('Камера не активна');
         return;
@@ -233,14 +239,21 @@ function capturePhoto() {
         const enhancedData = enhanceImageForOCR(imageData);
         ctx.putImageData(enhancedData, 0, 0);
 
-        // Получаем base64 с МАКСИМАЛЬНЫМ качеством JPEG (0.95 = 95% качества)
-        const dataUrl = canvas.toDataURL('image/jpeg', 0.95);
+        // JPEG с МАКСИМАЛЬНЫМ качеством (0.95 = 95% качества). Файл
+        // отправляется как есть, без base64 - на треть меньше и без
+        // перекодирования на сервере
+        const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.95));
+        if (!blob) {
+            throw new Error('Не удалось получить JPEG из canvas');
+        }
 
-        console.log(`Размер изображения: ${(dataUrl.length / 1024).toFixed(2)} КБ`);
+        console.log(`Размер изображения: ${(blob.size / 1024).toFixed(2)} КБ`);
 
         // Показываем предпросмотр
-        preview.src = dataUrl;
-        capturedImage = dataUrl;
+        releasePreview();
+        previewUrl = URL.createObjectURL(blob);
+        preview.src = previewUrl;
+        capturedImage = blob;
 
         // Переключаем UI
         cameraView.style.display = 'none';
@@ -297,11 +310,22 @@ function enhanceImageForOCR(imageData) {
     return imageData;
 }
 
+/**
+ * Освобождение адреса предпросмотра
+ */
+function releasePreview() {
+    if (previewUrl) {
+        URL.revokeObjectURL(previewUrl);
+        previewUrl = null;
+    }
+}
+
 /**
  * Повторный снимок
  */
 function retakePhoto() {
     capturedImage = null;
+    releasePreview();
 
     // Переключаем UI
     previewView.style.display = 'none';
@@ -313,10 +337,104 @@ function retakePhoto() {
     startCamera();
 }
 
+/**
+ * Запрос к API съемки
+ */
+async function captureRequest(url, options) {
+    const response = await fetch(url, Object.assign({ method: 'POST' }, options));
+    const result = await response.json().catch(() => ({}));
+    if (!response.ok || !result.success) {
+        throw new Error(result.error || `Ошибка ${response.status}`);
+    }
+    return result;
+}
+
+/**
+ * Отправка снимка страницы в многостраничную съемку.
+ * Съемка начинается при первой странице; страницы распознаются
+ * на сервере, пока снимаются следующие
+ */
+async function uploadPage() {
+    if (!captureId) {
+        const session = await captureRequest('/scanner/captures', {
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                title: titleInput ? titleInput.value.trim() : '',
+                folder_id: (folderSelect ? folderSelect.value : '') || null
+            })
+        });
+        captureId = session.capture_id;
+    }
+
+    const formData = new FormData();
+    formData.append('image', capturedImage, `page_${pageCount + 1}.jpg`);
+
+    const result = await captureRequest(`/scanner/captures/${captureId}/pages`, {
+        body: formData
+    });
+    pageCount = result.page_count;
+
+    if (pageCounter) {
+        pageCounter.textContent = `Снято страниц: ${pageCount}`;
+        pageCounter.style.display = 'block';
+    }
+}
+
+/**
+ * Добавление страницы и переход к следующему снимку
+ */
+async function addPage() {
+    if (!capturedImage) {
+        showError('Нет изображения для сохранения');
+        return;
+    }
+
+    nextPageBtn.disabled = true;
+    try {
+        await uploadPage();
+        retakePhoto();
+    } catch (error) {
+        console.error('Ошибка добавления страницы:', error);
+        showError(error.message || 'Ошибка связи с сервером');
+    } finally {
+        nextPageBtn.disabled = false;
+    }
+}
+
+/**
+ * Завершение многостраничной съемки
+ */
+async function finishCapture() {
+    saveBtn.disabled = true;
+    saveBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Обработка...';
+
+    try {
+        if (capturedImage) {
+            await uploadPage();
+        }
+        const result = await captureRequest(`/scanner/captures/${captureId}/finish`);
+
+        showSuccess(`Документ сохранен (страниц: ${result.page_count})`);
+        setTimeout(() => {
+            window.location.href = result.redirect_url;
+        }, 1000);
+    } catch (error) {
+        console.error('Ошибка завершения съемки:', error);
+        showError(error.message || 'Ошибка связи с сервером');
+        saveBtn.disabled = false;
+        saveBtn.innerHTML = '<i class="bi bi-check-lg"></i> Сохранить';
+    }
+}
+
 /**
  * Сохранение документа
  */
 async function saveDocument() {
+    if (captureId) {
+        await finishCapture();
+        return;
+    }
+
     if (!capturedImage) {
         showError('Нет изображения для сохранения');
         return;
@@ -331,17 +449,18 @@ async function saveDocument() {
     saveBtn.disabled = true;
     saveBtn.innerHTML = '<span class="spinner-border spinner-border-sm me-2"></span>Обработка...';
 
+    // Снимок - файлом в multipart-запросе
+    const formData = new FormData();
+    formData.append('image', capturedImage, 'capture.jpg');
+    formData.append('title', title);
+    if (folderId) {
+        formData.append('folder_id', folderId);
+    }
+
     try {
         const response = await fetch('/scanner/capture', {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                image: capturedImage,
-                title: title,
-                folder_id: folderId
-            })
+            body: formData
         });
 
         const result = await response.json();
@@ -430,6 +549,7 @@ function showSuccess(message) {
  */
 window.addEventListener('beforeunload', () => {
     stopCamera();
+    releasePreview();
 });
 
 // Инициализация при загрузке страницы
@@ -11,6 +11,9 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Инициализация фильтров
     initFilters();
+
+    // Подгрузка следующих страниц при прокрутке
+    initInfiniteScroll();
 });
 
 /**
@@ -72,6 +75,80 @@ function initFilters() {
     });
 }
 
+/**
+ * Бесконечная прокрутка библиотеки.
+ * Следующая страница запрашивается у /documents/api/library с теми же
+ * параметрами фильтров и курсором из предыдущего ответа.
+ */
+function initInfiniteScroll() {
+    const grid = document.getElementById('documents-grid');
+    const more = document.getElementById('documents-more');
+    const moreButton = document.getElementById('documents-more-btn');
+    if (!grid || !more || !grid.dataset.nextCursor) {
+        return;
+    }
+
+    let loading = false;
+
+    function loadNextPage() {
+        const cursor = grid.dataset.nextCursor;
+        if (loading || !cursor) {
+            return;
+        }
+        loading = true;
+        moreButton.disabled = true;
+
+        const url = new URL('/documents/api/library', window.location.origin);
+        new URLSearchParams(window.location.search).forEach((value, key) => {
+            url.searchParams.set(key, value);
+        });
+        url.searchParams.set('cursor', cursor);
+
+        fetch(url.toString())
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.error || 'Ошибка загрузки');
+                }
+
+                grid.insertAdjacentHTML('beforeend', data.html);
+                grid.dataset.nextCursor = data.next_cursor || '';
+
+                if (!data.next_cursor) {
+                    if (observer) {
+                        observer.disconnect();
+                    }
+                    more.remove();
+                } else if (observer) {
+                    // Кнопка может остаться на экране - проверяем заново
+                    observer.unobserve(more);
+                    observer.observe(more);
+                }
+            })
+            .catch(error => {
+                console.error('Ошибка:', error);
+                showNotification('Не удалось загрузить документы', 'error');
+            })
+            .finally(() => {
+                loading = false;
+                moreButton.disabled = false;
+            });
+    }
+
+    moreButton.addEventListener('click', loadNextPage);
+
+    // Автоматическая подгрузка, когда кнопка появляется на экране
+    let observer = null;
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage();
+            }
+        }, { rootMargin: '400px' });
+        observer.observe(more);
+    }
+}
+
 /**
  * Удаление документа
  */
@@ -0,0 +1,163 @@
+/**
+ * Загрузка файла по частям с продолжением после обрыва соединения.
+ * Протокол - см. services/upload_sessions.py.
+ *
+ * Идентификатор незавершенной загрузки хранится в localStorage
+ * (по имени, размеру и дате изменения файла), поэтому после
+ * перезагрузки страницы тот же файл догружается с принятого места.
+ */
+
+class ResumableUpload {
+    /**
+     * @param {File} file - файл
+     * @param {Object} options - baseUrl, fields (title, description,
+     *     folder_id, auto_ocr), onProgress(loaded, total), maxRetries
+     */
+    constructor(file, options = {}) {
+        this.file = file;
+        this.baseUrl = options.baseUrl || '/scanner/uploads';
+        this.fields = options.fields || {};
+        this.onProgress = options.onProgress || (() => { });
+        this.maxRetries = options.maxRetries ?? 5;
+        this.storageKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+        this.uploadId = null;
+        this.chunkSize = 5 * 1024 * 1024;
+    }
+
+    /**
+     * Загружает файл и создает документ.
+     * @returns {Promise<Object>} ответ завершения (document_id, redirect)
+     */
+    async start() {
+        let offset = await this.resume();
+
+        if (offset === null) {
+            const session = await this.request('POST', this.baseUrl, {
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(Object.assign({
+                    filename: this.file.name,
+                    size: this.file.size,
+                    mime_type: this.file.type || null,
+                }, this.fields)),
+            });
+            this.uploadId = session.upload_id;
+            this.chunkSize = session.chunk_size || this.chunkSize;
+            localStorage.setItem(this.storageKey, this.uploadId);
+            offset = 0;
+        }
+
+        while (offset < this.file.size) {
+            this.onProgress(offset, this.file.size);
+            offset = await this.sendChunk(offset);
+        }
+        this.onProgress(this.file.size, this.file.size);
+
+        const result = await this.request('POST', `${this.baseUrl}/${this.uploadId}/finalize`);
+        localStorage.removeItem(this.storageKey);
+        return result;
+    }
+
+    /**
+     * Продолжение прерванной загрузки этого же файла.
+     * @returns {Promise<number|null>} принятое смещение или null
+     */
+    async resume() {
+        const uploadId = localStorage.getItem(this.storageKey);
+        if (!uploadId) {
+            return null;
+        }
+
+        try {
+            const status = await this.request('GET', `${this.baseUrl}/${uploadId}`);
+            if (status.status === 'completed') {
+                throw new Error('Загрузка уже завершена');
+            }
+            this.uploadId = uploadId;
+            return status.offset;
+        } catch (error) {
+            localStorage.removeItem(this.storageKey);
+            return null;
+        }
+    }
+
+    /**
+     * Отправляет часть файла, повторяя при сетевых ошибках.
+     * @returns {Promise<number>} новое смещение
+     */
+    async sendChunk(offset) {
+        const chunk = this.file.slice(offset, offset + this.chunkSize);
+        const headers = { 'Upload-Offset': String(offset) };
+
+        const checksum = await ResumableUpload.sha256(chunk);
+        if (checksum) {
+            headers['X-Chunk-SHA256'] = checksum;
+        }
+
+        for (let attempt = 0; ; attempt++) {
+            try {
+                const result = await this.request('PUT', `${this.baseUrl}/${this.uploadId}`, {
+                    headers: headers,
+                    body: chunk,
+                });
+                return result.offset;
+            } catch (error) {
+                // Сервер принял другое смещение - продолжаем с него
+                if (error.offset !== undefined && error.offset !== offset) {
+                    return error.offset;
+                }
+                if (!error.retryable || attempt >= this.maxRetries) {
+                    throw error;
+                }
+                await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** attempt));
+            }
+        }
+    }
+
+    /**
+     * Отменяет загрузку.
+     */
+    async cancel() {
+        if (this.uploadId) {
+            await fetch(`${this.baseUrl}/${this.uploadId}`, { method: 'DELETE' });
+            localStorage.removeItem(this.storageKey);
+        }
+    }
+
+    /**
+     * Запрос к API загрузки. Ошибка содержит offset (если сервер его вернул)
+     * и retryable (сетевая ошибка или ошибка сервера).
+     */
+    async request(method, url, options = {}) {
+        let response;
+        try {
+            response = await fetch(url, Object.assign({ method: method }, options));
+        } catch (networkError) {
+            const error = new Error('Нет соединения с сервером');
+            error.retryable = true;
+            throw error;
+        }
+
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok || data.success === false) {
+            const error = new Error(data.error || `Ошибка ${response.status}`);
+            error.offset = data.offset;
+            error.retryable = response.status >= 500 || response.status === 408;
+            throw error;
+        }
+        return data;
+    }
+
+    /**
+     * SHA-256 части (hex). Web Crypto доступен только по HTTPS/localhost,
+     * иначе часть отправляется без контрольной суммы.
+     */
+    static async sha256(blob) {
+        if (!window.crypto || !window.crypto.subtle) {
+            return null;
+        }
+        const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+        return Array.from(new Uint8Array(digest))
+            .map(byte => byte.toString(16).padStart(2, '0'))
+            .join('');
+    }
+}
@@ -0,0 +1,131 @@
+# utils/pagination.py
+"""
+Постраничный вывод по ключу (keyset pagination).
+Следующая страница выбирается условием "после последней показанной
+записи" по (значение сортировки, id), а не через OFFSET, поэтому
+запрос страницы не зависит от ее номера и использует индекс.
+Позиция передается клиенту непрозрачным курсором.
+"""
+
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    """Сериализация значений, которых нет в JSON."""
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    raise TypeError(f"Неподдерживаемый тип в курсоре: {type(value).__name__}")
+
+
+def _json_object_hook(data: dict):
+    """Восстановление значений, сохраненных _json_default."""
+    if set(data) == {"$dt"}:
+        return datetime.fromisoformat(data["$dt"])
+    return data
+
+
+def encode_cursor(data: dict) -> str:
+    """
+    Кодирует позицию в курсор для передачи клиенту.
+
+    Args:
+        data: позиция (значения JSON и datetime)
+
+    Returns:
+        str: курсор (base64 без символов '=')
+    """
+    raw = json.dumps(data, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[dict]:
+    """
+    Декодирует курсор.
+
+    Args:
+        cursor: курсор из encode_cursor
+
+    Returns:
+        dict или None, если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        data = json.loads(raw, object_hook=_json_object_hook)
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Некорректный курсор: {e}")
+        return None
+
+    return data if isinstance(data, dict) else None
+
+
+def keyset_query(query, sort_column, id_column, after=None, descending=True):
+    """
+    Добавляет к запросу условие "после позиции" и сортировку
+    по (sort_column, id_column).
+
+    Args:
+        query: запрос SQLAlchemy без сортировки
+        sort_column: колонка или выражение сортировки
+        id_column: уникальная колонка для устойчивого порядка
+        after: позиция [значение, id] последней показанной записи
+        descending: сортировка по убыванию
+
+    Returns:
+        Запрос с условием и сортировкой
+    """
+    if after is not None:
+        sort_value, last_id = after
+        position = tuple_(sort_column, id_column)
+        bound = tuple_(sort_value, last_id)
+        query = query.filter(position < bound if descending else position > bound)
+
+    if descending:
+        return query.order_by(sort_column.desc(), id_column.desc())
+    return query.order_by(sort_column.asc(), id_column.asc())
+
+
+def keyset_paginate(
+    query,
+    sort_column,
+    id_column,
+    key: Callable,
+    after: Optional[list] = None,
+    descending: bool = True,
+    per_page: int = 50,
+) -> Tuple[List, Optional[list]]:
+    """
+    Возвращает одну страницу запроса, упорядоченного по
+    (sort_column, id_column). Порядок id одинаков с основным, поэтому
+    записи с равным значением сортировки не теряются и не повторяются.
+
+    Args:
+        query: запрос SQLAlchemy без сортировки
+        sort_column: колонка или выражение сортировки
+        id_column: уникальная колонка для устойчивого порядка
+        key: функция (запись) -> значение сортировки для следующего курсора
+        after: позиция [значение, id] последней записи предыдущей страницы
+        descending: сортировка по убыванию
+        per_page: размер страницы
+
+    Returns:
+        tuple: (записи страницы, позиция для следующей страницы или None)
+    """
+    query = keyset_query(query, sort_column, id_column, after, descending)
+
+    # Одна лишняя запись показывает, есть ли следующая страница
+    items = query.limit(per_page + 1).all()
+    if len(items) <= per_page:
+        return items, None
+
+    items = items[:per_page]
+    last = items[-1]
+    return items, [key(last), last.id]
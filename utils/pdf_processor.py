@@ -3,34 +3,27 @@ PDF обработка БЕЗ Poppler и Tesseract
 Использует только Python библиотеки
 """
 
-import io
 import fitz  # PyMuPDF
-import easyocr
 from PIL import Image
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Инициализируем EasyOCR один раз (поддержка русского и английского)
-reader = easyocr.Reader(["ru", "en"], gpu=False)
 
-
-def pdf_to_images(pdf_path):
+def iter_pdf_images(pdf_path):
     """
-    Конвертирует PDF в изображения БЕЗ Poppler
+    Конвертирует страницы PDF в изображения по одной (генератор)
 
     Args:
         pdf_path: путь к PDF файлу
 
-    Returns:
-        list: список PIL Image объектов
+    Yields:
+        PIL Image текущей страницы
     """
-    images = []
+    # Открываем PDF
+    pdf_document = fitz.open(pdf_path)
 
     try:
-        # Открываем PDF
-        pdf_document = fitz.open(pdf_path)
-
         # Конвертируем каждую страницу
         for page_num in range(len(pdf_document)):
             page = pdf_document[page_num]
@@ -39,10 +32,26 @@ def pdf_to_images(pdf_path):
             pix = page.get_pixmap(matrix=fitz.Matrix(300 / 72, 300 / 72))
 
             # Конвертируем в PIL Image
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            images.append(img)
-
+            yield Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    finally:
         pdf_document.close()
+
+
+def pdf_to_images(pdf_path):
+    """
+    Конвертирует PDF в изображения БЕЗ Poppler
+    Держит в памяти все страницы - для OCR используйте iter_pdf_images
+
+    Args:
+        pdf_path: путь к PDF файлу
+
+    Returns:
+        list: список PIL Image объектов
+    """
+    images = []
+
+    try:
+        images = list(iter_pdf_images(pdf_path))
         logger.info(f"PDF конвертирован: {len(images)} страниц")
 
     except Exception as e:
@@ -61,29 +70,17 @@ def extract_text_ocr(image):
     Returns:
         str: извлеченный текст
     """
-    try:
-        # EasyOCR работает с путями или numpy массивами
-        if isinstance(image, str):
-            result = reader.readtext(image, detail=0, paragraph=True)
-        else:
-            # Конвертируем PIL Image в numpy
-            import numpy as np
-
-            img_array = np.array(image)
-            result = reader.readtext(img_array, detail=0, paragraph=True)
-
-        # Объединяем результаты
-        text = "\n".join(result)
-        return text
+    # EasyOCR (и torch) загружается при первом распознавании, а не при импорте
+    from services.ocr_service import OCRService
 
-    except Exception as e:
-        logger.error(f"Ошибка OCR: {str(e)}")
-        return ""
+    return OCRService.extract_text(image)
 
 
 def process_pdf(pdf_path):
     """
     Полная обработка PDF: конвертация + OCR
+    Страницы рендерятся и распознаются по одной, поэтому потребление
+    памяти не зависит от количества страниц
 
     Args:
         pdf_path: путь к PDF
@@ -91,56 +88,48 @@ def process_pdf(pdf_path):
     Returns:
         dict: {
             'text': извлеченный текст,
-            'page_count': количество страниц,
-            'images': список изображений
+            'page_count': количество страниц
         }
     """
-    # Конвертируем PDF в изображения
-    images = pdf_to_images(pdf_path)
-
-    if not images:
-        return {"text": "", "page_count": 0, "images": []}
-
-    # Извлекаем текст из каждой страницы
     all_text = []
-    for i, image in enumerate(images):
-        logger.info(f"OCR страницы {i+1}/{len(images)}...")
-        text = extract_text_ocr(image)
-        all_text.append(text)
 
-    result = {
-        "text": "\n\n".join(all_text),
-        "page_count": len(images),
-        "images": images,
-    }
+    try:
+        # Извлекаем текст из каждой страницы
+        for i, image in enumerate(iter_pdf_images(pdf_path)):
+            logger.info(f"OCR страницы {i+1}...")
+            all_text.append(extract_text_ocr(image))
 
-    return result
+    except Exception as e:
+        logger.error(f"Ошибка конвертации PDF: {str(e)}")
 
+    return {"text": "\n\n".join(all_text), "page_count": len(all_text)}
 
-def extract_text_from_pdf(pdf_path):
+
+def extract_text_from_pdf(pdf_path, min_text_chars=30):
     """
     Пробует извлечь текст напрямую из PDF (без OCR)
-    Если не получается - использует OCR
+    Страницы без текстового слоя распознаются через OCR по отдельности
     """
     try:
-        # Сначала пробуем извлечь текст напрямую
         pdf_document = fitz.open(pdf_path)
-        text = ""
+        page_texts = []
 
-        for page in pdf_document:
-            text += page.get_text()
+        try:
+            for page in pdf_document:
+                # Сначала пробуем извлечь текст напрямую
+                text = page.get_text()
 
-        pdf_document.close()
+                # Если текста нет (отсканированная страница) - используем OCR
+                if len(text.strip()) < min_text_chars:
+                    pix = page.get_pixmap(matrix=fitz.Matrix(300 / 72, 300 / 72))
+                    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                    text = extract_text_ocr(image) or text
 
-        # Если текст есть - возвращаем
-        if text.strip():
-            logger.info("Текст извлечен напрямую из PDF")
-            return text
+                page_texts.append(text.strip())
+        finally:
+            pdf_document.close()
 
-        # Если текста нет (отсканированный PDF) - используем OCR
-        logger.info("Текст не найден, использую OCR...")
-        result = process_pdf(pdf_path)
-        return result["text"]
+        return "\n\n".join(text for text in page_texts if text)
 
     except Exception as e:
         logger.error(f"Ошибка обработки PDF: {str(e)}")